@@ -1,6 +1,7 @@
 import numpy as np
 from classes.route import Route
 from classes.simplifier import Simplifier
+from classes.trajectory_buffer import TrajectoryBuffer
 from classes.vessel_log import VesselLog
 
 singleton = None
@@ -20,6 +21,8 @@ def run_dr(route: Route, params: dict) -> Route:
 
 
 class DeadReckoning(Simplifier):
+    param_names = ("tolerance",)
+
     @classmethod
     def from_params(cls, params, math):
         return cls(
@@ -46,37 +49,28 @@ class DeadReckoning(Simplifier):
             predict_sphere_movement=predict_sphere_movement,
         )
         self.tolerance = tolerance
-        self.prediction_startpoint = None
-        self.prediction_endpoint = None
+        # (latlon, timestamp) pairs of the two points the current prediction is based on
+        self.prediction_start = None
+        self.prediction_end = None
         self.mode = "online"
 
     def simplify(self):
         self.trajectory = self.dead_reckoning(self.trajectory)
 
-    def dead_reckoning(self, trajectory: list[VesselLog]) -> list[VesselLog]:
+    def dead_reckoning(self, trajectory: TrajectoryBuffer) -> TrajectoryBuffer:
         if len(trajectory) < 2:  # Need at least two points to make a prediction
             return trajectory
         elif len(trajectory) == 2:  # Initialize prediction points
-            self.prediction_startpoint = trajectory[-2]
-            self.prediction_endpoint = trajectory[-1]
+            self.prediction_start = (trajectory.coords(-2), trajectory.time(-2))
+            self.prediction_end = (trajectory.coords(-1), trajectory.time(-1))
             return trajectory
 
-        reckon(
-            self.prediction_startpoint,
-            self.prediction_endpoint,
-            trajectory[-1],
-            self.point_to_point_distance,
-            self.get_final_bearing,
-            self.predict_sphere_movement,
-        )
-
-        next_newest_point = trajectory[-2]
-        newest_point = trajectory[-1]
+        newest_point = (trajectory.coords(-1), trajectory.time(-1))
 
-        error = reckon(
-            self.prediction_startpoint,
-            self.prediction_endpoint,
-            newest_point,
+        error = reckon_coords(
+            *self.prediction_start,
+            *self.prediction_end,
+            *newest_point,
             self.point_to_point_distance,
             self.get_final_bearing,
             self.predict_sphere_movement,
@@ -84,8 +78,8 @@ class DeadReckoning(Simplifier):
 
         if np.abs(error) > self.tolerance:
             # if the predicted point is further than we tolerate, reset prediction points
-            self.prediction_startpoint = next_newest_point
-            self.prediction_endpoint = newest_point
+            self.prediction_start = (trajectory.coords(-2), trajectory.time(-2))
+            self.prediction_end = newest_point
         else:
             # if the predicted point is close enough, we don't need the next newest point anymore and can safely exclude it
             del trajectory[-2]
@@ -115,12 +109,35 @@ def reckon(
         :param get_final_bearing:
         :param great_circle_distance:
     """
-    latlon_a = point_a.get_coords()
-    latlon_b = point_b.get_coords()
+    return reckon_coords(
+        point_a.get_coords(),
+        point_a.epoch,
+        point_b.get_coords(),
+        point_b.epoch,
+        point_c.get_coords(),
+        point_c.epoch,
+        great_circle_distance,
+        get_final_bearing,
+        predict_sphere_movement,
+    )
+
 
+def reckon_coords(
+    latlon_a: tuple[float, float],
+    time_a: float,
+    latlon_b: tuple[float, float],
+    time_b: float,
+    latlon_c: tuple[float, float],
+    time_c: float,
+    great_circle_distance,
+    get_final_bearing,
+    predict_sphere_movement,
+) -> float:
+    """Same as reckon, but for points given as coordinates in radians and epoch timestamps in seconds,
+    e.g. as read from a TrajectoryBuffer."""
     # find distance from A to B
     distance = great_circle_distance(latlon_a, latlon_b)
-    time_delta = (point_b.ts - point_a.ts).total_seconds()
+    time_delta = time_b - time_a
     velocity = 0  # velocity in m/s
     if time_delta != 0:
         # avoid dividing by 0 when the points have the same timestamp
@@ -128,11 +145,11 @@ def reckon(
     # find bearing at B
     prediction_bearing = get_final_bearing(latlon_a, latlon_b)
     # find time difference between B and C and multiply by the velocity we found
-    prediction_time_delta = (point_c.ts - point_b.ts).total_seconds()
+    prediction_time_delta = time_c - time_b
     prediction_distance = velocity * prediction_time_delta
     # now predict where C should be
     c_predicted = predict_sphere_movement(
         latlon_b, prediction_distance, prediction_bearing
     )
     # return distance from predicted C to actual C
-    return great_circle_distance(c_predicted, point_c.get_coords())
+    return great_circle_distance(c_predicted, latlon_c)
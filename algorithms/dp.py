@@ -1,7 +1,7 @@
 import numpy as np
 from classes.route import Route
 from classes.simplifier import Simplifier
-from classes.vessel_log import VesselLog
+from classes.trajectory_buffer import TrajectoryBuffer
 
 singleton = None
 
@@ -20,56 +20,118 @@ def run_dp(route: Route, params: dict) -> Route:
 
 
 class DouglasPeucker(Simplifier):
+    param_names = ("epsilon",)
+
     @classmethod
     def from_params(cls, params, math):
-        return cls(params["epsilon"], math["point_to_line_distance"])
+        return cls(
+            params["epsilon"],
+            math["point_to_line_distance"],
+            math.get("point_to_line_distance_batch"),
+        )
 
     @property
     def name(self):
         return "DP"
 
-    def __init__(self, epsilon: float, point_to_line_distance=None):
+    def __init__(
+        self,
+        epsilon: float,
+        point_to_line_distance=None,
+        point_to_line_distance_batch=None,
+    ):
         super().__init__(point_to_line_distance=point_to_line_distance)
         self.epsilon = epsilon
-        self.original_trajectory = []
+        # Optional twin of point_to_line_distance that takes arrays of points, e.g. point_to_great_circle_batch.
+        # If it isn't given, the distances are computed one point at a time
+        self.point_to_line_distance_batch = point_to_line_distance_batch
+        self.original_trajectory = TrajectoryBuffer()
         self.mode = "batch"
 
     def append_point(self, point):
         self.original_trajectory.append(point)
 
     def simplify(self):
-        self.trajectory = self.douglas_peucker(self.original_trajectory)
+        if len(self.original_trajectory) <= 2:
+            self.trajectory = self.original_trajectory.take(
+                range(len(self.original_trajectory))
+            )
+            return
+        self.trajectory = self.original_trajectory.take(
+            self.douglas_peucker(
+                self.original_trajectory, 0, len(self.original_trajectory) - 1
+            )
+        )
 
-    def douglas_peucker(self, trajectory: list[VesselLog]) -> list[VesselLog]:
-        """
-        Simplifies a given set of points using the Douglas-Peucker algorithm.
-        """
-        dmax = 0  # Maximum distance
-        index = 0  # Index of the point with maximum distance
-        end = len(trajectory) - 1  # Index of the last point
-        for i in range(1, end):
-            # Calculate the perpendicular distance from point to line segment
-            d = np.abs(
+    def distances_to_lines(
+        self,
+        trajectory: TrajectoryBuffer,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        points: np.ndarray,
+    ) -> np.ndarray:
+        """Return the distance from each point to the line through the corresponding start and end point, all given as indices."""
+        if self.point_to_line_distance_batch is not None:
+            latlon = trajectory.latlon
+            return np.abs(
+                self.point_to_line_distance_batch(
+                    latlon[starts], latlon[ends], latlon[points]
+                )
+            )
+        return np.abs(
+            [
                 self.point_to_line_distance(
-                    trajectory[0].get_coords(),
-                    trajectory[end].get_coords(),
-                    trajectory[i].get_coords(),
+                    trajectory.coords(start), trajectory.coords(end), trajectory.coords(point)
                 )
+                for start, end, point in zip(starts, ends, points)
+            ],
+            dtype=np.float64,
+        )
+
+    def douglas_peucker(
+        self, trajectory: TrajectoryBuffer, start: int, end: int
+    ) -> np.ndarray:
+        """
+        Simplifies the part of the trajectory between the start and end index (both inclusive) using the Douglas-Peucker algorithm.
+        Returns the indices of the points to keep, in order.
+        Instead of recursing, the segments still to be simplified are kept in arrays and handled one level at a time,
+        so the distances for a whole level are computed at once and long routes can't hit the recursion limit.
+        """
+        keep = np.zeros(len(trajectory), dtype=bool)
+        keep[start] = keep[end] = True
+        starts = np.array([start])
+        ends = np.array([end])
+        while True:
+            has_interior = ends - starts >= 2  # Segments without points between start and end are done
+            starts, ends = starts[has_interior], ends[has_interior]
+            if len(starts) == 0:
+                break
+            # Lay out the points between start and end of every segment after each other
+            counts = ends - starts - 1
+            offsets = np.cumsum(counts) - counts  # Where each segment begins in the layout
+            segment = np.repeat(np.arange(len(starts)), counts)
+            points = np.arange(counts.sum()) - offsets[segment] + starts[segment] + 1
+
+            distances = self.distances_to_lines(
+                trajectory, starts[segment], ends[segment], points
+            )
+            # NaN distances are never the maximum, like when comparing them one by one
+            distances = np.nan_to_num(distances, nan=0.0)
+            dmax = np.maximum.reduceat(distances, offsets)
+            # The first point with the maximum distance in each segment
+            first = np.minimum.reduceat(
+                np.where(distances == dmax[segment], np.arange(len(points)), len(points)),
+                offsets,
+            )
+
+            split = dmax > self.epsilon  # If maximum distance is greater than epsilon, simplify both halves
+            index = points[first[split]]
+            keep[index] = True
+            starts, ends = (
+                np.concatenate([starts[split], index]),
+                np.concatenate([index, ends[split]]),
             )
-            if d > dmax:  # Update maximum distance and index
-                index = i
-                dmax = d
-
-        if (
-            dmax > self.epsilon
-        ):  # If maximum distance is greater than epsilon, recursively simplify
-            rec_results1 = self.douglas_peucker(trajectory[: index + 1])
-            rec_results2 = self.douglas_peucker(trajectory[index:])
-
-            return (
-                rec_results1[:-1] + rec_results2
-            )  # Combine results excluding the last point of the first half to avoid duplication
-        return [trajectory[0], trajectory[end]]  # Return start and end points
+        return np.flatnonzero(keep)
 
     def __repr__(self):
         return "DouglasPeucker Instance with " + f"epsilon={self.epsilon}"
@@ -65,9 +65,77 @@ def point_to_geodesic(
     latlon_b: tuple[float, float],
     latlon_p: tuple[float, float],
     tol=1e-6,
+    max_iterations=20,
 ):
     """
-    Robust ellipsoidal point-to-segment distance.
+    Ellipsoidal point-to-segment distance, found by intercept iteration in the gnomonic projection.
+    Inputs: (lat, lon) in radians.
+    Output: distance in meters.
+
+    Starting at A, each iteration takes the current point X on the segment, finds the geodesic XP and
+    projects P onto the gnomonic projection centred at X, where geodesics through X are straight lines.
+    P lands at distance m12 / M12 from X, so the foot of the perpendicular to AB lies (m12 / M12) * cos(angle)
+    along AB in the projection, which is turned back into a distance along AB with a spherical atan step.
+    Each iteration costs one Line.Position and one Inverse, and it typically converges in 2 to 4 iterations,
+    stopping once X moves less than tol meters (clamped to the ends of the segment).
+
+    Error bound: the distance to P changes by at most as much as X moves along AB, so the result is within
+    tol meters of the distance at the closest point the iteration converges to. This is the same closest point
+    point_to_geodesic_golden finds for segments where the distance to P has a single minimum, which holds for
+    segments shorter than a quarter of the Earth's circumference.
+    If P is too far away for the projection (M12 <= 0) or the iteration doesn't converge, point_to_geodesic_golden is used.
+    """
+    # Convert radians → degrees for GeographicLib
+    lat_a, lon_a = np.degrees(latlon_a)
+    lat_b, lon_b = np.degrees(latlon_b)
+    lat_p, lon_p = np.degrees(latlon_p)
+
+    # Degenerate case: A == B
+    if lat_a == lat_b and lon_a == lon_b:
+        return geodesic.Inverse(lat_a, lon_a, lat_p, lon_p)["s12"]
+
+    inv_ab = geodesic.Inverse(lat_a, lon_a, lat_b, lon_b)
+    s_ab = inv_ab["s12"]  # total length of AB (meters)
+    line_ab = geodesic.Line(lat_a, lon_a, inv_ab["azi1"])
+
+    s = 0.0  # distance of X from A along AB
+    for _ in range(max_iterations):
+        pt = line_ab.Position(
+            s, outmask=Geodesic.LATITUDE | Geodesic.LONGITUDE | Geodesic.AZIMUTH
+        )
+        inv_xp = geodesic.Inverse(
+            pt["lat2"],
+            pt["lon2"],
+            lat_p,
+            lon_p,
+            outmask=Geodesic.DISTANCE
+            | Geodesic.AZIMUTH
+            | Geodesic.REDUCEDLENGTH
+            | Geodesic.GEODESICSCALE,
+        )
+        if inv_xp["M12"] <= 0:  # P is 90 degrees or more from X, outside the projection
+            break
+        # angle at X between AB and XP
+        angle = np.radians(inv_xp["azi1"] - pt["azi2"])
+        projected = inv_xp["m12"] / inv_xp["M12"] * np.cos(angle)
+        step = geodesic.a * np.arctan(projected / geodesic.a)
+        next_s = min(max(s + step, 0.0), s_ab)
+        if abs(next_s - s) <= tol:
+            return inv_xp["s12"]
+        s = next_s
+
+    return point_to_geodesic_golden(latlon_a, latlon_b, latlon_p, tol)
+
+
+def point_to_geodesic_golden(
+    latlon_a: tuple[float, float],
+    latlon_b: tuple[float, float],
+    latlon_p: tuple[float, float],
+    tol=1e-6,
+):
+    """
+    Robust ellipsoidal point-to-segment distance, found by a golden-section search along the segment.
+    Needs around 40 calls to geodesic.Inverse, so point_to_geodesic is preferred. Kept as its fallback and for cross-checking.
     Inputs: (lat, lon) in radians.
     Output: distance in meters.
     """
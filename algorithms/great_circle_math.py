@@ -184,6 +184,193 @@ def get_final_bearing(latlon_a: tuple[float, float], latlon_b: tuple[float, floa
     # we reverse the back-azimuth to get the bearing
     return back_azimuth - np.radians(180)
 
+# NOTE: The *_batch functions below are twins of the functions above that take arrays of shape (..., 2) instead of tuples,
+# e.g. a whole route as an (N, 2) array. The arguments are broadcast against each other,
+# so a single (2,) point can be combined with many points. They follow the same formulas step by step,
+# so for each row they give the same result as the corresponding single-point function.
+
+
+def latlon_to_vector_batch(latlon: np.ndarray) -> np.ndarray:
+    '''Batch twin of latlon_to_vector. Given an (..., 2) array of latitudes and longitudes, return an (..., 3) array of unit vectors.
+
+    Parameters
+    ----------
+    latlon : _(..., 2) array_
+        Latitude and longitude-pairs
+    '''
+    latlon = np.asarray(latlon, dtype=np.float64)
+    latitude = latlon[..., 0]
+    longitude = latlon[..., 1]
+    vector = np.stack(
+        [
+            np.cos(latitude) * np.cos(longitude),
+            np.cos(latitude) * np.sin(longitude),
+            np.sin(latitude),
+        ],
+        axis=-1,
+    )
+    return np.divide(vector, np.sqrt(np.sum(vector * vector, axis=-1, keepdims=True)))
+
+
+def point_to_great_circle_batch(latlon_a: np.ndarray, latlon_b: np.ndarray, latlon_c: np.ndarray, radius: float=EARTH_RADIUS_METERS, ignore_sign: bool=True) -> np.ndarray:
+    '''Batch twin of point_to_great_circle. Given (..., 2) arrays of points A, B, and C,
+    return the length of the geodesic from each C to the great circle through the corresponding A and B.
+    Where A and B are equal, the great circle is undefined and the distance between A and B is used instead, like point_to_great_circle does.
+    Points are compared exactly, like the tuples the simplifiers pass to point_to_great_circle.
+
+    Parameters
+    ----------
+    latlon_a : _(..., 2) array_
+        The latitudes and longitudes of the first points on the great circles.
+    latlon_b : _(..., 2) array_
+        The latitudes and longitudes of the second points on the great circles.
+    latlon_c : _(..., 2) array_
+        The latitudes and longitudes of the points whose distance to the great circles we want to know.
+    radius   : _positive float or int_, optional
+        The radius of the sphere where A and B are points.
+    ignore_sign : _Boolean_, optional
+        Forces the results to be nonnegative. Defaults to True.
+    '''
+    latlon_a = np.asarray(latlon_a, dtype=np.float64)
+    latlon_b = np.asarray(latlon_b, dtype=np.float64)
+    equal = np.all(latlon_a == latlon_b, axis=-1)
+
+    normal = np.cross(latlon_to_vector_batch(latlon_a), latlon_to_vector_batch(latlon_b))
+    vector_c = latlon_to_vector_batch(latlon_c)
+    with np.errstate(divide="ignore", invalid="ignore"):  # the equal points are replaced below
+        distance = np.arcsin(
+            np.sum(vector_c * normal, axis=-1)
+            / np.sqrt(np.sum(normal * normal, axis=-1))
+        )
+    distance = np.where(
+        equal, great_circle_distance_batch(latlon_a, latlon_b, radius=radius), distance
+    )
+    if ignore_sign:
+        return np.abs(distance * radius)
+    else:
+        return distance * radius
+
+
+def great_circle_distance_batch(latlon_a: np.ndarray, latlon_b: np.ndarray, radius: float=EARTH_RADIUS_METERS) -> np.ndarray:
+    '''Batch twin of great_circle_distance. Given (..., 2) arrays of points A and B, return the great circle-distance between each pair.
+
+    Parameters
+    ----------
+    latlon_a : _(..., 2) array_
+        The latitudes and longitudes of the first points.
+    latlon_b : _(..., 2) array_
+        The latitudes and longitudes of the second points.
+    radius   : _positive float or int_, optional
+        The radius of the sphere where A and B are points.
+    '''
+    latlon_a = np.asarray(latlon_a, dtype=np.float64)
+    latlon_b = np.asarray(latlon_b, dtype=np.float64)
+    latitude_a, longitude_a = latlon_a[..., 0], latlon_a[..., 1]
+    latitude_b, longitude_b = latlon_b[..., 0], latlon_b[..., 1]
+    longitude_delta = longitude_b - longitude_a
+    y = np.sqrt(
+        np.square(
+            np.cos(latitude_a) * np.sin(latitude_b)
+            - np.sin(latitude_a) * np.cos(latitude_b) * np.cos(longitude_delta)
+        )
+        + np.square(np.cos(latitude_b) * np.sin(longitude_delta))
+    )
+    x = np.sin(latitude_a) * np.sin(latitude_b) + np.cos(latitude_a) * np.cos(
+        latitude_b
+    ) * np.cos(longitude_delta)
+    return np.atan2(y, x) * radius
+
+
+def predict_sphere_movement_batch(latlon: np.ndarray, distance: np.ndarray, bearing: np.ndarray, radius: float=EARTH_RADIUS_METERS) -> np.ndarray:
+    '''Batch twin of predict_sphere_movement. Given an (..., 2) array of starting points, and distances and bearings of shape (...),
+    return an (..., 2) array of the latitudes and longitudes of the destination points.
+
+    Parameters
+    ----------
+    latlon : _(..., 2) array_
+        The latitudes and longitudes of the points where movement begins.
+    distance : _(...) array_
+        The distances travelled during the movements.
+    bearing : _(...) array_
+        The directions of the movements, measured in radians clockwise from the North Pole.
+    radius   : _positive float or int_, optional
+        The radius of the sphere used for calculations.
+    '''
+    latlon = np.asarray(latlon, dtype=np.float64)
+    latitude, longitude = latlon[..., 0], latlon[..., 1]
+    AB = np.asarray(distance, dtype=np.float64) / radius
+    AN = np.radians(90) - latitude  # the colatitude of A
+    angle_NAB = np.asarray(bearing, dtype=np.float64)
+    BN = np.arccos(
+        np.cos(AN) * np.cos(AB) + np.sin(AN) * np.sin(AB) * np.cos(angle_NAB)
+    )  # the colatitudes of B
+    final_latitude = np.radians(90) - BN
+    angle_BNA = np.arcsin((np.sin(angle_NAB) * np.sin(AB)) / np.sin(BN))
+    final_longitude = angle_BNA + longitude
+    return np.stack(np.broadcast_arrays(final_latitude, final_longitude), axis=-1)
+
+
+def get_final_bearing_batch(latlon_a: np.ndarray, latlon_b: np.ndarray) -> np.ndarray:
+    '''Batch twin of get_final_bearing. Given (..., 2) arrays of points A and B, return the bearing at each B of the geodesic from A to B.
+
+    Parameters
+    ----------
+    latlon_a : _(..., 2) array_
+        The starting points of travel.
+    latlon_b : _(..., 2) array_
+        The endpoints of travel, where the bearings are measured.
+    '''
+    # NOTE the points have to be swapped in order to compute back-azimuth i.e. the bearing at the end of the path
+    latlon_a = np.asarray(latlon_a, dtype=np.float64)
+    latlon_b = np.asarray(latlon_b, dtype=np.float64)
+    latitude_a, longitude_a = latlon_b[..., 0], latlon_b[..., 1]
+    latitude_b, longitude_b = latlon_a[..., 0], latlon_a[..., 1]
+    longitude_delta = longitude_b - longitude_a
+    y = np.sin(longitude_delta) * np.cos(latitude_b)
+    x = np.cos(latitude_a) * np.sin(latitude_b) - np.sin(latitude_a) * np.cos(
+        latitude_b
+    ) * np.cos(longitude_delta)
+    back_azimuth = (
+        np.arctan2(y, x) / (np.pi / np.radians(180)) + np.radians(360)
+    ) % np.radians(360)
+    return back_azimuth - np.radians(180)
+
+
+def slerp_batch(latlon_a: np.ndarray, latlon_b: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    '''Given (..., 2) arrays of points A and B and fractions of shape (...), return an (..., 2) array of the points
+    the given fraction of the way along the great circle arc from each A to the corresponding B.
+    It interpolates the unit vectors of A and B (spherical linear interpolation), which gives the same points as moving
+    the fraction of the distance from A in the direction of B with predict_sphere_movement, without computing any bearings.
+    Where A and B are equal, or alpha is 0, A is returned.
+
+    Parameters
+    ----------
+    latlon_a : _(..., 2) array_
+        The points to interpolate from.
+    latlon_b : _(..., 2) array_
+        The points to interpolate to.
+    alpha : _(...) array of floats in range [0,1]_
+        How far to interpolate: 0.0 returns A, and 1.0 returns B, 0.5 returns the point exactly between A and B.
+    '''
+    latlon_a = np.asarray(latlon_a, dtype=np.float64)
+    alpha = np.asarray(alpha, dtype=np.float64)
+    vector_a = latlon_to_vector_batch(latlon_a)
+    vector_b = latlon_to_vector_batch(latlon_b)
+    # the angle between A and B, atan2 keeps it accurate for nearby points
+    normal = np.cross(vector_a, vector_b)
+    angle = np.atan2(np.sqrt(np.sum(normal * normal, axis=-1)), np.sum(vector_a * vector_b, axis=-1))
+    sin_angle = np.sin(angle)
+    moved = (sin_angle != 0) & (alpha != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):  # the points that don't move are replaced below
+        weight_a = np.sin((1 - alpha) * angle) / sin_angle
+        weight_b = np.sin(alpha * angle) / sin_angle
+    vector = weight_a[..., np.newaxis] * vector_a + weight_b[..., np.newaxis] * vector_b
+    latitude = np.atan2(vector[..., 2], np.sqrt(vector[..., 0] ** 2 + vector[..., 1] ** 2))
+    longitude = np.atan2(vector[..., 1], vector[..., 0])
+    result = np.stack([latitude, longitude], axis=-1)
+    return np.where(moved[..., np.newaxis], result, latlon_a)
+
+
 def equal_latlon(a, b):
     """Safe equality check for tuple or numpy latlon pairs.
     Helper function for vectorized operations in error metrics."""
@@ -1,3 +1,5 @@
+import numpy as np
+
 from classes.route import Route
 from classes.vessel_log import VesselLog
 
@@ -23,8 +25,8 @@ def isolate_trajectories(logs: list[VesselLog]) -> list[list[VesselLog]]:
     # Loops through all logs and determines if the time gap between the points is small enough for it to be the same route.
     for i in range(1, len(logs)):
         if (
-            logs[i].ts - logs[i - 1].ts
-        ).total_seconds() > 86400 * 2:  # 86400 seconds in a day
+            logs[i].epoch - logs[i - 1].epoch
+        ) > 86400 * 2:  # 86400 seconds in a day
             trajectories.append(current_trajectory)
             current_trajectory = [logs[i]]
         else:
@@ -45,6 +47,20 @@ def is_vessel_static(vessel_logs: list[VesselLog]) -> bool:
     return False
 
 
+def isolate_trajectory_bounds(timestamps: np.ndarray) -> list[tuple[int, int]]:
+    """Like isolate_trajectories(), for the epoch timestamps of the logs: the (start, end) index range of every trajectory."""
+    if not len(timestamps):
+        return []
+    splits = (np.flatnonzero(np.diff(timestamps) > 86400 * 2) + 1).tolist()  # 86400 seconds in a day
+    return list(zip([0, *splits], [*splits, len(timestamps)]))
+
+
+def is_static_latlon(latlon: np.ndarray) -> bool:
+    """Like is_vessel_static(), for the (N, 2) coordinates of the logs in radians."""
+    extent = np.degrees(latlon.max(axis=0) - latlon.min(axis=0))
+    return bool(extent[0] < 0.001 and extent[1] < 0.001)
+
+
 def isolate_routes(logs: list[VesselLog]) -> list[Route]:
     """
     Divide raw data into dedicated routes, so data points with large time gaps in between are not connected.
@@ -67,8 +83,8 @@ def isolate_routes(logs: list[VesselLog]) -> list[Route]:
     # Loops through all logs and determines if the time gap between the points is small enough for it to be the same route.
     for i in range(1, len(logs)):
         if (
-            logs[i].ts - logs[i - 1].ts
-        ).total_seconds() > 86400 * 2:  # 86400 seconds in a day
+            logs[i].epoch - logs[i - 1].epoch
+        ) > 86400 * 2:  # 86400 seconds in a day
             routes.append(Route(current_route))
             current_route = [logs[i]]
         else:
@@ -79,11 +95,18 @@ def isolate_routes(logs: list[VesselLog]) -> list[Route]:
 
 
 # TODO global variables are yucky but this works. They could be put into a class alongside assign_routes.
-last_time = {}  # maps IMOs to the timestamp of the last log we got from that vessel
+last_time = {}  # maps IMOs to the epoch timestamp of the last log we got from that vessel
 current_route = {}  # maps IMOs to the ID of the route that vessel is currently on
 route_count = 0  # counts how many routes exist
 
 
+def reset_routes():
+    """Forget which route every vessel is on, so the next logs start new routes.
+    route_count is kept, so new routes never reuse the ID of an old one."""
+    last_time.clear()
+    current_route.clear()
+
+
 def assign_routes(
     logs: list[VesselLog], threshold: int | float = 86400 * 2
 ) -> dict[int, list[VesselLog]]:
@@ -111,7 +134,7 @@ def assign_routes(
         imo = log.imo
         if (
             imo not in current_route
-            or (log.ts - last_time[imo]).total_seconds() > threshold
+            or log.epoch - last_time[imo] > threshold
         ):
             # if there's no route registered for the given vessel identifier, prepare one for it and increment the route_count
             current_route[imo] = route_count
@@ -122,5 +145,5 @@ def assign_routes(
             routes[current_route[imo]] = []
         # we have a route registered for the vessel and a list we can append to, so we do that and update when we last heard from that vessel
         routes[current_route[imo]].append(log)
-        last_time[imo] = log.ts
+        last_time[imo] = log.epoch
     return routes
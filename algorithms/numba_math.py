@@ -0,0 +1,158 @@
+import numpy as np
+from numba import njit
+
+from algorithms.great_circle_math import EARTH_RADIUS_METERS
+
+# NOTE: These are compiled versions of the functions in great_circle_math.py, using the same formulas.
+# They plug into the same math dictionary, but skip the Python and NumPy-scalar overhead of every call,
+# which matters for the online algorithms that call them once or more per point.
+# The compiled code is cached on disk (cache=True), so only the first run on a machine pays for compilation.
+
+# NOTE: Points are read by indexing instead of unpacking, so they can be given as tuples or as numpy arrays.
+# As in great_circle_math.py, all latitudes and longitudes are expected to be expressed in radians.
+
+
+@njit(cache=True)
+def latlon_to_vector(latlon) -> np.ndarray:
+    '''Given a latitude and longitude-pair, return a numpy array-representation of a 3D unit vector that corresponds to that latitude and longitude.
+
+    Parameters
+    ----------
+    latlon : _latitude and longitude-tuple_
+        Latitude and longitude-pair
+    '''
+    latitude = latlon[0]
+    longitude = latlon[1]
+    vector = np.empty(3)
+    vector[0] = np.cos(latitude) * np.cos(longitude)
+    vector[1] = np.cos(latitude) * np.sin(longitude)
+    vector[2] = np.sin(latitude)
+    return vector / np.sqrt(vector[0] ** 2 + vector[1] ** 2 + vector[2] ** 2)
+
+
+@njit(cache=True)
+def great_circle_distance(latlon_a, latlon_b, radius: float=EARTH_RADIUS_METERS) -> float:
+    '''Given a pair of latitudes and longitudes describing points on a sphere A and B, computes the great circle-distance between those points
+    i.e. the length of the geodesic connecting those points
+
+    Parameters
+    ----------
+    latlon_a : _latitude and longitude-tuple_
+        The latitude and longitude of the first point on the great circle.
+    latlon_b : _latitude and longitude-tuple_
+        The latitude and longitude of the second point on the great circle.
+    radius   : _positive float or int_, optional
+        The radius of the sphere where A and B are points.
+    '''
+    latitude_a = latlon_a[0]
+    longitude_a = latlon_a[1]
+    latitude_b = latlon_b[0]
+    longitude_b = latlon_b[1]
+    longitude_delta = longitude_b - longitude_a
+    y = np.sqrt(
+        (
+            np.cos(latitude_a) * np.sin(latitude_b)
+            - np.sin(latitude_a) * np.cos(latitude_b) * np.cos(longitude_delta)
+        ) ** 2
+        + (np.cos(latitude_b) * np.sin(longitude_delta)) ** 2
+    )
+    x = np.sin(latitude_a) * np.sin(latitude_b) + np.cos(latitude_a) * np.cos(
+        latitude_b
+    ) * np.cos(longitude_delta)
+    return np.arctan2(y, x) * radius
+
+
+@njit(cache=True)
+def point_to_great_circle(latlon_a, latlon_b, latlon_c, radius: float=EARTH_RADIUS_METERS, ignore_sign: bool=True) -> float:
+    '''Given the latitude and longitudes of three points A, B, and C, where a great circle connects A and B,
+    return the length of the geodesic from C to that great circle.
+    If A and B are equal, the distance between them is used instead, like great_circle_math.point_to_great_circle does for tuples.
+
+    Parameters
+    ----------
+    latlon_a : _latitude and longitude-tuple_
+        The latitude and longitude of the first point on the great circle.
+    latlon_b : _latitude and longitude-tuple_
+        The latitude and longitude of the second point on the great circle.
+    latlon_c : _latitude and longitude-tuple_
+        The latitude and longitude of the point whose distance to the great circle we want to know.
+    radius   : _positive float or int_, optional
+        The radius of the sphere where A and B are points.
+    ignore_sign : _Boolean_, optional
+        Forces the result to be nonnegative. Defaults to True.
+    '''
+    if latlon_a[0] == latlon_b[0] and latlon_a[1] == latlon_b[1]:
+        distance = great_circle_distance(latlon_a, latlon_b, radius)
+    else:
+        vector_a = latlon_to_vector(latlon_a)
+        vector_b = latlon_to_vector(latlon_b)
+        vector_c = latlon_to_vector(latlon_c)
+        # the cross product of A and B is normal to the plane of the great circle
+        normal_x = vector_a[1] * vector_b[2] - vector_a[2] * vector_b[1]
+        normal_y = vector_a[2] * vector_b[0] - vector_a[0] * vector_b[2]
+        normal_z = vector_a[0] * vector_b[1] - vector_a[1] * vector_b[0]
+        distance = np.arcsin(
+            (vector_c[0] * normal_x + vector_c[1] * normal_y + vector_c[2] * normal_z)
+            / np.sqrt(normal_x**2 + normal_y**2 + normal_z**2)
+        )
+    if ignore_sign:
+        return np.abs(distance * radius)
+    else:
+        return distance * radius
+
+
+@njit(cache=True)
+def predict_sphere_movement(latlon, distance: float, bearing: float, radius: float=EARTH_RADIUS_METERS) -> tuple[float, float]:
+    '''Given a position on a sphere described by latitude and longitude, a distance value, and a bearing,
+    return a tuple containing the latitude and longitude of the destination point.
+
+    Parameters
+    ----------
+    latlon : _latitude and longitude-tuple_
+        The latitude and longitude of the point where movement begins.
+    distance : _float_
+        The distance travelled during the movement.
+    bearing : _float_
+        The direction of the movement, measured in radians clockwise from the North Pole.
+    radius   : _positive float or int_, optional
+        The radius of the sphere used for calculations.
+    '''
+    latitude = latlon[0]
+    longitude = latlon[1]
+    AB = distance / radius
+    AN = np.pi / 2 - latitude  # the colatitude of A
+    angle_NAB = bearing
+    BN = np.arccos(
+        np.cos(AN) * np.cos(AB) + np.sin(AN) * np.sin(AB) * np.cos(angle_NAB)
+    )  # the colatitude of B
+    final_latitude = np.pi / 2 - BN
+    angle_BNA = np.arcsin((np.sin(angle_NAB) * np.sin(AB)) / np.sin(BN))
+    final_longitude = angle_BNA + longitude
+    return final_latitude, final_longitude
+
+
+@njit(cache=True)
+def get_final_bearing(latlon_a, latlon_b) -> float:
+    '''Given a pair of latitudes and longitudes describing points on a sphere A and B,
+    computes the direction of the geodesic from A to B at point B i.e. the bearing of some hypothetical vehicle at point B.
+
+    Parameters
+    ----------
+    latlon_a : _latitude and longitude-tuple_
+        The starting point of our hypothetical vehicle's travel.
+    latlon_b : _latitude and longitude-tuple_
+        The endpoint of our hypothetical vehicle's travel. This function returns the vehicle's bearing at this point.
+    '''
+    # NOTE the points have to be swapped in order to compute back-azimuth i.e. the bearing at the end of the path
+    latitude_a = latlon_b[0]
+    longitude_a = latlon_b[1]
+    latitude_b = latlon_a[0]
+    longitude_b = latlon_a[1]
+    longitude_delta = longitude_b - longitude_a
+    y = np.sin(longitude_delta) * np.cos(latitude_b)
+    x = np.cos(latitude_a) * np.sin(latitude_b) - np.sin(latitude_a) * np.cos(
+        latitude_b
+    ) * np.cos(longitude_delta)
+    back_azimuth = (np.arctan2(y, x) + 2 * np.pi) % (2 * np.pi)
+    # we reverse the back-azimuth to get the bearing
+    return back_azimuth - np.pi
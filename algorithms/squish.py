@@ -1,5 +1,6 @@
 from classes.route import Route
 from classes.simplifier import Simplifier
+from classes.trajectory_buffer import TrajectoryBuffer
 from classes.vessel_log import VesselLog
 from classes.priority_queue import PriorityQueue
 import numpy as np
@@ -20,6 +21,8 @@ def run_squish(route: Route, params: dict) -> Route:
 
 
 class Squish(Simplifier):
+    param_names = ("buff_size",)
+
     @classmethod
     def from_params(cls, params, math):
         return cls(params["buff_size"], math["point_to_point_distance"])
@@ -44,7 +47,7 @@ class Squish(Simplifier):
             predecessor = self.buffer.pred[target.id]
             successor = self.buffer.succ[target.id]
 
-            if target.ts - predecessor.ts < successor.ts - target.ts:
+            if target.epoch - predecessor.epoch < successor.epoch - target.epoch:
                 # Closer to predecessor
                 sed = np.abs(
                     self.point_to_point_distance(
@@ -62,22 +65,23 @@ class Squish(Simplifier):
                 target, sed
             )  # Update the SED value in the priority queue
 
-    def squish(self, trajectory: list[VesselLog]):
-        new_point = trajectory[-1]  # Get the newest point
+    def squish(self, trajectory: TrajectoryBuffer) -> TrajectoryBuffer:
+        new_point = trajectory.last()  # Get the newest point without compacting the trajectory
         self.buffer.insert(new_point)  # Insert it into the buffer with infinite SED
 
         if self.buffer.size() > 2:  # After the second point
-            predecessor = trajectory[-2]
+            predecessor = self.buffer.pred[new_point.id]  # Get the predecessor point
             self.update_sed(predecessor)  # Update SED of predecessor
 
         if self.buffer.size() == self.buffer_size + 1:  # Buffer is full
             point, _ = self.buffer.remove_min()  # Remove point with the smallest SED
+            trajectory.discard(point)  # Keep the trajectory in sync with the buffer
 
             if point.id in self.buffer.pred or point.id in self.buffer.succ:
                 self.update_sed(self.buffer.pred[point.id])  # Update SED of predecessor
                 self.update_sed(self.buffer.succ[point.id])  # Update SED of successor
 
-        return self.buffer.to_list()  # Return the points in the buffer as a list
+        return trajectory  # The trajectory holds exactly the points in the buffer, in order
 
     def __repr__(self):
         return "Squish Instance with " + f"buffer_size={self.buffer_size}"
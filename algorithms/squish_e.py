@@ -1,5 +1,6 @@
 from classes.route import Route
 from classes.simplifier import Simplifier
+from classes.trajectory_buffer import TrajectoryBuffer
 from classes.vessel_log import VesselLog
 from classes.priority_queue import PriorityQueue
 import numpy as np
@@ -20,6 +21,8 @@ def run_squish_e(route: Route, params: dict) -> Route:
 
 
 class SquishE(Simplifier):
+    param_names = ("low_comp", "max_sed")
+
     @classmethod
     def from_params(cls, params, math):
         return cls(
@@ -57,6 +60,7 @@ class SquishE(Simplifier):
         point, priority = (
             self.buffer.remove_min()
         )  # Remove point with the lowest priority
+        self.trajectory.discard(point)  # Keep the trajectory in sync with the buffer
         if (
             point.id in self.buffer.pred or point.id in self.buffer.succ
         ):  # Not the first or last point
@@ -86,7 +90,7 @@ class SquishE(Simplifier):
             successor = self.buffer.succ[point.id]
             if predecessor is not None and successor is not None:
                 if (
-                    point.ts - predecessor.ts < successor.ts - point.ts
+                    point.epoch - predecessor.epoch < successor.epoch - point.epoch
                 ):  # Find nearest point in time to compute sed (This is not entirely correct squish-e)
                     # Closer to predecessor
                     priority = self.max_neighbor[point.id] + np.abs(
@@ -105,7 +109,7 @@ class SquishE(Simplifier):
                     point, priority
                 )  # Update priority in the priority queue
 
-    def squish_e(self, trajectory: list[VesselLog]) -> list[VesselLog]:
+    def squish_e(self, trajectory: TrajectoryBuffer) -> TrajectoryBuffer:
         """
         Implementation of the SQUISH-E algorithm, which is a trajectory simplification algorithm that works like SQUISH
         It implements an adaptable buffer and ensures all the points are at least of a certain importance
@@ -115,11 +119,11 @@ class SquishE(Simplifier):
         ):  # Increase buff_size based on lower bound compression rate
             self.buffer_size += 1
 
-        new_point = trajectory[-1]  # Get the newest point
+        new_point = trajectory.last()  # Get the newest point without compacting the trajectory
         self.buffer.insert(new_point)  # Insert point with priority = inf
         self.max_neighbor[new_point.id] = 0  # Initialize max_neighbor for the new point
         if self.buffer.size() > 2:  # After the first point
-            predecessor = trajectory[-2]  # Get the predecessor point
+            predecessor = self.buffer.pred[new_point.id]  # Get the predecessor point
             self.adjust_priority(predecessor)  # Update priority
 
         if self.buffer.size() == self.buffer_size:  # Reduce buffer when full
@@ -129,7 +133,7 @@ class SquishE(Simplifier):
         if self.upper_bound_sed > 0:
             while self.buffer.min_priority() <= self.upper_bound_sed:
                 self.reduce()
-        return self.buffer.to_list()  # Return the points in the buffer as a list
+        return trajectory  # The trajectory holds exactly the points in the buffer, in order
 
     def __repr__(self):
         return (
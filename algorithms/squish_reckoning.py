@@ -2,6 +2,7 @@ from algorithms.dead_reckoning import reckon
 from classes.priority_queue import PriorityQueue
 from classes.route import Route
 from classes.simplifier import Simplifier
+from classes.trajectory_buffer import TrajectoryBuffer
 from classes.vessel_log import VesselLog
 
 """
@@ -37,6 +38,8 @@ def run_sr(route: Route, params: dict) -> Route:
 
 
 class SquishReckoning(Simplifier):
+    param_names = ("buff_size",)
+
     @classmethod
     def from_params(cls, params, math):
         return cls(
@@ -69,12 +72,12 @@ class SquishReckoning(Simplifier):
     def simplify(self):
         self.trajectory = self.squish_reckoning(self.trajectory)
 
-    def squish_reckoning(self, trajectory: list[VesselLog]) -> list[VesselLog]:
-        new_point = trajectory[-1]  # Get the newest point
+    def squish_reckoning(self, trajectory: TrajectoryBuffer) -> TrajectoryBuffer:
+        new_point = trajectory.last()  # Get the newest point without compacting the trajectory
         self.buffer.insert(new_point)  # Insert it into the buffer with infinite score
 
         if self.buffer.size() > 2:  # After the second point
-            predecessor = trajectory[-2]  # Get the predecessor point
+            predecessor = self.buffer.pred[new_point.id]  # Get the predecessor point
             score = reckon(
                 self.buffer.pred[predecessor.id],
                 predecessor,
@@ -91,6 +94,7 @@ class SquishReckoning(Simplifier):
             self.buffer.size() == self.buffer_size + 1
         ):  # Buffer full, need to remove one point
             point, _ = self.buffer.remove_min()  # Remove point with the lowest score
+            trajectory.discard(point)  # Keep the trajectory in sync with the buffer
 
             if point.id in self.buffer.pred:  # Not the first point
                 predecessor = self.buffer.pred[point.id]  # Get predecessor
@@ -119,4 +123,4 @@ class SquishReckoning(Simplifier):
                         self.predict_sphere_movement,
                     ),
                 )  # Recalculate and update score of successor
-        return self.buffer.to_list()  # Return the points in the buffer as a list
+        return trajectory  # The trajectory holds exactly the points in the buffer, in order
@@ -1,6 +1,6 @@
 from classes.route import Route
 from classes.simplifier import Simplifier
-from classes.vessel_log import VesselLog
+from classes.trajectory_buffer import TrajectoryBuffer
 
 singleton = None
 
@@ -19,6 +19,8 @@ def run_uniform_sampling(route: Route, params: dict) -> Route:
 
 
 class UniformSampling(Simplifier):
+    param_names = ("sampling_rate",)
+
     @classmethod
     def from_params(cls, params, math):
         return cls(params["sampling_rate"])
@@ -44,17 +46,17 @@ class UniformSampling(Simplifier):
     def simplify(self):
         self.trajectory = self.uniform_sampling(self.trajectory)
 
-    def uniform_sampling(self, trajectory: list[VesselLog]) -> list[VesselLog]:
+    def uniform_sampling(self, trajectory: TrajectoryBuffer) -> TrajectoryBuffer:
         """
         Simplifies a given set of points using uniform sampling.
 
         Parameters
         ---------
-        points (list of VesselLog): List of VesselLog objects representing the points.
+        points (TrajectoryBuffer): The VesselLog objects representing the points.
 
         Returns
         ---------
-        list of VesselLog: Simplified list of points.
+        TrajectoryBuffer: Simplified trajectory.
         """
         if self.counter == self.sampling_rate:  # If counter reaches sampling rate
             self.counter = 0  # Reset counter
@@ -1,31 +1,56 @@
 import time
+import numpy as np
 from flask import Flask, request
 from flask import render_template
 
 from algorithms.dead_reckoning import DeadReckoning
 from algorithms.dp import DouglasPeucker
-from algorithms.isolate_routes import assign_routes
+from algorithms.isolate_routes import assign_routes, reset_routes
 from algorithms.squish import Squish
 from algorithms.squish_reckoning import SquishReckoning
 from algorithms.squish_e import SquishE
 from algorithms.uniform_sampling import UniformSampling
+from classes.metric_accumulator import MetricAccumulator
 from classes.simplifier import Simplifier
+from classes.trajectory_buffer import TrajectoryBuffer
 from classes.vessel_log import VesselLog
-from data.database import get_all_vessels, get_vessel_logs
+from data.database import get_all_vessels, stream_vessel_logs
 from datetime import datetime
 from typing import Callable
-from error_metrics.comp_ratio import comp_ratio_results
-from error_metrics.newsed import sed_results
-from error_metrics.newped import ped_results
+from error_metrics.comp_ratio import comp_ratio
+from error_metrics.evaluator import RouteEvaluator, combine_route_scores, evaluate_error_metrics
 from algorithms.great_circle_math import (
     great_circle_distance,
     get_final_bearing,
     predict_sphere_movement,
     point_to_great_circle,
+    point_to_great_circle_batch,
+    great_circle_distance_batch,
+    slerp_batch,
 )
+from algorithms import numba_math
 
 app = Flask(__name__)
 
+# the math dictionaries a request can choose between. "numba" uses compiled versions of the circle math
+math_backends = {
+    "circle": {
+        "point_to_point_distance": great_circle_distance,
+        "get_final_bearing": get_final_bearing,
+        "predict_sphere_movement": predict_sphere_movement,
+        "point_to_line_distance": point_to_great_circle,
+        "point_to_line_distance_batch": point_to_great_circle_batch,
+        "point_to_point_distance_batch": great_circle_distance_batch,
+        "interpolate_batch": slerp_batch,
+    },
+    "numba": {
+        "point_to_point_distance": numba_math.great_circle_distance,
+        "get_final_bearing": numba_math.get_final_bearing,
+        "predict_sphere_movement": numba_math.predict_sphere_movement,
+        "point_to_line_distance": numba_math.point_to_great_circle,
+    },
+}
+
 simplifier_classes = {
     "DR": DeadReckoning,
     "DP": DouglasPeucker,
@@ -42,21 +67,145 @@ last_end_time = datetime.fromtimestamp(0)
 last_start_time = datetime.fromtimestamp(0)
 
 simplifiers = {}  # type: dict[int, dict[str, Simplifier]]
+# for each (route ID, algorithm name), the config key of the simplifier and how many logs of the raw route it has been given
+simplifier_configs = {}  # type: dict[tuple[int, str], tuple]
+fed_logs = {}  # type: dict[tuple[int, str], int]
+# for each (route ID, algorithm name), the running error metrics of the simplifier, see get_running_error_metrics()
+metric_accumulators = {}  # type: dict[tuple[int, str], MetricAccumulator]
+# (route ID, algorithm name) of batch mode simplifiers that have been given logs since they last simplified
+unsimplified = set()  # type: set[tuple[int, str]]
 
-# this will accumulate all the points in all the routes over time. For use in error metric computation.
-raw_routes = {}  # type: dict[int, list[VesselLog]]
+# this will accumulate all the points in all the routes over time. For use in error metric computation,
+# which reads the coordinates and timestamps from the buffers instead of converting every log on every request.
+raw_routes = {}  # type: dict[int, TrajectoryBuffer]
+# for each route ID, the raw route prepared for error metrics, shared by the metric accumulators of every algorithm
+route_evaluators = {}  # type: dict[int, RouteEvaluator]
+
+# the version of the last response describing changes. For each client ID, the version of the last response
+# that client got, and what it held after it. If a client sends back its version, we only need to send what
+# changed since then. Each client (e.g. browser tab) has its own baseline, so clients polling alternately
+# don't invalidate each other. The simplifiers themselves are shared, so a start time change resets every client
+response_version = 0
+client_versions = {}  # type: dict[str, int]
+sent_ids = {}  # type: dict[str, dict[tuple[int, str], np.ndarray]]
+sent_raw = {}  # type: dict[str, dict[int, int]]
+# the baselines of the least recently seen clients are dropped beyond this, and those clients start over
+MAX_CLIENTS = 16
 
 
 def get_error_metrics(
-    raw_routes: dict[int, list[VesselLog]],
-    simplified_routes: dict[int, list[VesselLog]],
-    math: dict,
+    raw_routes: dict[int, TrajectoryBuffer],
+    simplified_routes: dict[int, TrajectoryBuffer],
 ) -> list[float]:
+    """Compute [ped_avg, ped_max, sed_avg, sed_max, comp_ratio] of the simplified routes from scratch."""
+    return evaluate_error_metrics(raw_routes, {"simplified": simplified_routes})["simplified"]
+
+
+def get_running_error_metrics(name: str) -> list[float]:
+    """Return the same metrics as get_error_metrics() for the trajectories of the given algorithm, from the running
+    metrics of its simplifiers. Those only measure the raw points whose segment changed since the last request,
+    instead of every raw point of every route. Every raw route is prepared once for all algorithms, see route_evaluators."""
+    route_peds = []
+    route_seds = []
+    total_raw_points = 0
+    total_simplified_points = 0
+    for route_id, simplifier_dict in simplifiers.items():
+        accumulator = metric_accumulators[(route_id, name)]
+        evaluator = route_evaluators.setdefault(route_id, RouteEvaluator())
+        accumulator.update(raw_routes[route_id], simplifier_dict[name], evaluator)
+        if accumulator.ped()[2] > 0:  # ignore empty/invalid routes, like ped_results()
+            route_peds.append(accumulator.ped())
+        route_seds.append(accumulator.sed())
+        total_raw_points += len(raw_routes[route_id])
+        total_simplified_points += len(simplifier_dict[name].trajectory)
+
+    return [
+        *combine_route_scores(route_peds),
+        *combine_route_scores(route_seds),
+        comp_ratio(total_raw_points, total_simplified_points),
+    ]
+
+
+def serialize_log(log: VesselLog) -> tuple[float, float, datetime]:
+    return (log.lat, log.lon, log.ts)
+
+
+def write_trajectories(response: dict):
+    """Write every trajectory to the response in full."""
+    for simplifier_dict in simplifiers.values():
+        for simplifier in simplifier_dict.values():
+            if simplifier.name not in response:
+                response[simplifier.name] = []
+                # append all trajectories simplified by this algorithm to the same part of the response
+            response[simplifier.name].append(
+                [serialize_log(log) for log in simplifier.trajectory]
+            )
+    response["raw"] = [
+        # NOTE that we are using the accumulated raw routes, and not just the logs for this iteration
+        [serialize_log(log) for log in logs]
+        for logs in raw_routes.values()
+    ]
+
+
+def write_changes(
+    response: dict, algorithm_names: list[str], client_version: int, client_id: str = ""
+):
+    """Write only what changed in every trajectory since the response with the given version to the given client.
+    Each trajectory is written as {"route": id, "reset": bool, "changes": [...]}, where the changes are described
+    as at the bottom of classes/simplifier.py. If reset is set, the client must discard what it holds for the route first.
+    If "full" is set in the response, the client must discard every route it holds."""
+    global response_version
+    full = client_version != client_versions.get(client_id)
+    if full:  # The client doesn't hold what we sent it last, so start over
+        sent_ids[client_id] = {}
+        sent_raw[client_id] = {}
+    client_ids = sent_ids.setdefault(client_id, {})
+    client_raw = sent_raw.setdefault(client_id, {})
+    for key in list(client_ids):
+        if key[1] not in algorithm_names:  # The client drops disabled algorithms
+            del client_ids[key]
 
-    ped_avg, ped_max = ped_results(raw_routes, simplified_routes, math)
-    sed_avg, sed_max = sed_results(raw_routes, simplified_routes, math)
-    comp_ratio = comp_ratio_results(raw_routes, simplified_routes)
-    return [ped_avg, ped_max, sed_avg, sed_max, comp_ratio]
+    for route_id, simplifier_dict in simplifiers.items():
+        for name, simplifier in simplifier_dict.items():
+            previous = client_ids.get((route_id, name))
+            changes = None if previous is None else simplifier.changes_since(previous)
+            reset = changes is None
+            if reset:
+                changes = list(simplifier.trajectory)
+            client_ids[(route_id, name)] = simplifier.trajectory.ids.copy()
+            response.setdefault(simplifier.name, []).append(
+                {
+                    "route": route_id,
+                    "reset": reset,
+                    "changes": [
+                        change if isinstance(change, int) else serialize_log(change)
+                        for change in changes
+                    ],
+                }
+            )
+    response["raw"] = []
+    for route_id, logs in raw_routes.items():
+        # raw routes only ever grow, so the changes are the logs we haven't sent yet
+        start = client_raw.get(route_id)
+        response["raw"].append(
+            {
+                "route": route_id,
+                "reset": start is None,
+                "changes": [serialize_log(log) for log in logs[start or 0 :]],
+            }
+        )
+        client_raw[route_id] = len(logs)
+
+    response_version += 1
+    client_versions.pop(client_id, None)  # re-insert, so the dict stays ordered from least to most recently seen
+    client_versions[client_id] = response_version
+    while len(client_versions) > MAX_CLIENTS:
+        oldest = next(iter(client_versions))
+        del client_versions[oldest]
+        sent_ids.pop(oldest, None)
+        sent_raw.pop(oldest, None)
+    response["version"] = response_version
+    response["full"] = full
 
 
 def process_trajectories(
@@ -64,28 +213,67 @@ def process_trajectories(
     algorithm_names: list[str],
     params: dict[str, int],
     math: dict,
+    simplify_batch: bool = True,
 ):
-    """Create the necessary simplifiers according to the given params and append the given logs to them, simplifying each time."""
+    """Create the necessary simplifiers according to the given params and append the given logs to them, simplifying each time.
+    Simplifiers are kept between calls and only given the logs they haven't seen yet.
+    A simplifier is only recreated (and given the whole raw route) if the params or math it uses have changed.
+    If simplify_batch is False, batch mode simplifiers only get the logs, and simplify on a later call where it is True."""
     for id in routes.keys():
         if id not in raw_routes:
-            raw_routes[id] = []
+            raw_routes[id] = TrajectoryBuffer()
 
     for route_id, route_trajectory in routes.items():
-        raw_routes[route_id] += route_trajectory
+        raw_routes[route_id].extend(route_trajectory)
 
     for key in raw_routes.keys():
-        simplifiers[key] = {}
+        route_simplifiers = simplifiers.setdefault(key, {})
+        for name in list(route_simplifiers):
+            if name not in algorithm_names:  # disabled algorithms are dropped
+                del route_simplifiers[name]
+                del simplifier_configs[(key, name)]
+                del fed_logs[(key, name)]
+                del metric_accumulators[(key, name)]
+                unsimplified.discard((key, name))
         for name in algorithm_names:
-            simplifiers[key][name] = simplifier_classes[name].from_params(params, math)
-        for simplifier in simplifiers[key].values():
+            config = simplifier_classes[name].config_key(params, math)
+            if (
+                name not in route_simplifiers
+                or simplifier_configs.get((key, name)) != config
+            ):
+                route_simplifiers[name] = simplifier_classes[name].from_params(params, math)
+                simplifier_configs[(key, name)] = config
+                fed_logs[(key, name)] = 0
+                metric_accumulators[(key, name)] = MetricAccumulator()
+            new_logs = raw_routes[key][fed_logs[(key, name)] :]
+            fed_logs[(key, name)] = len(raw_routes[key])
+            simplifier = route_simplifiers[name]
             if simplifier.mode == "online":
-                for log in raw_routes[key]:
+                for log in new_logs:
                     simplifier.append_point(log)
                     simplifier.simplify()
             else:  # batch mode
-                for log in raw_routes[key]:
+                for log in new_logs:
                     simplifier.append_point(log)
-                simplifier.simplify()
+                if new_logs:
+                    unsimplified.add((key, name))
+                if simplify_batch and (key, name) in unsimplified:
+                    simplifier.simplify()
+                    unsimplified.discard((key, name))
+
+
+def reset_state():
+    """Forget all routes and simplifiers, e.g. when the start time changes."""
+    raw_routes.clear()
+    route_evaluators.clear()
+    simplifiers.clear()
+    simplifier_configs.clear()
+    fed_logs.clear()
+    metric_accumulators.clear()
+    unsimplified.clear()
+    sent_ids.clear()
+    sent_raw.clear()
+    reset_routes()
 
 
 def run_algorithms(
@@ -95,8 +283,11 @@ def run_algorithms(
     params: dict[str, int],
     imos: list[int],
     math: dict,
+    client_version: int | None = None,
+    client_id: str = "",
 ) -> dict[str, list[list[tuple[float, float, datetime]]]]:
-    """Run the selected algorithms and return the resulting trajectories."""
+    """Run the selected algorithms and return the resulting trajectories.
+    If a client version is given, only the changes since that client's version are returned, see write_changes()."""
     global last_start_time
     global last_end_time
     if start_time == last_start_time:
@@ -105,48 +296,35 @@ def run_algorithms(
         # This ensures that we don't grab points we've already processed.
         start_time = last_end_time
     else:
-        # TODO if the start time has changed, we'll probably need to reset our simplifiers and error metrics.
-        # REVIEW how to handle parameters changing? How to handle algorithms being enabled after some points have already been processed?
+        # The start time has changed, so everything we have processed so far is for the wrong time window.
+        # Parameter changes are handled by process_trajectories(), which only recreates the affected simplifiers
+        reset_state()
         last_start_time = start_time
     last_end_time = end_time
-    print("Fetching logs...")
-    vessel_logs = get_vessel_logs(imos, start_time, end_time)
-    print("Assigning routes...")
-    routes = assign_routes(vessel_logs)
     response = {}
 
     # NOTE no multiprocessing for now
     # REVIEW how many calls to simplify() are needed to justify multiprocessing?
-    print("Processing...")
-    process_trajectories(routes, algorithm_names, params, math)
+    print("Fetching and processing logs...")
+    # The logs arrive in batches, which are assigned routes and given to the simplifiers as soon as they arrive.
+    # Batch mode simplifiers only simplify once all batches have arrived
+    for vessel_logs in stream_vessel_logs(imos, start_time, end_time):
+        process_trajectories(
+            assign_routes(vessel_logs), algorithm_names, params, math, simplify_batch=False
+        )
+    process_trajectories({}, algorithm_names, params, math)
 
     # SECTION
     # NOTE this is extremely temporary: We know there's only one vessel, so there will only ever be one active route.
     # Therefore we can simply attribute any trajectory from a given simplifier to that vessel.
     print("Writing response...")
-    for simplifier_dict in simplifiers.values():
-        for simplifier in simplifier_dict.values():
-            if simplifier.name not in response:
-                response[simplifier.name] = []
-                # append all trajectories simplified by this algorithm to the same part of the response
-            response[simplifier.name].append(
-                [(log.lat, log.lon, log.ts) for log in simplifier.trajectory]
-            )
-    response["raw"] = [
-        # NOTE that we are using the accumulated raw routes, and not just the logs for this iteration
-        [(log.lat, log.lon, log.ts) for log in logs]
-        for logs in raw_routes.values()
-    ]
+    if client_version is None:
+        write_trajectories(response)
+    else:
+        write_changes(response, algorithm_names, client_version, client_id)
     print("Calculating error metrics...")
     for name in algorithm_names:
-        response[name + "_error_metrics"] = get_error_metrics(
-            raw_routes,
-            {
-                route_id: simplifier_dict[name].trajectory
-                for route_id, simplifier_dict in simplifiers.items()
-            },
-            math,
-        )
+        response[name + "_error_metrics"] = get_running_error_metrics(name)
     for name in simplifier_classes:
         if name not in response:
             response[name] = []
@@ -175,6 +353,14 @@ def get_algorithms():
     end_date_req = data["end_date"]
 
     algorithms = data["algorithms"]
+    math_name = data.get("math", "circle")
+    if math_name not in math_backends:
+        return {"error": "Unknown math: " + str(math_name)}, 400
+    # Clients that send the version of their last response (null at first) only get the changes since then
+    client_version = None
+    if "version" in data:
+        client_version = -1 if data["version"] is None else data["version"]
+    client_id = str(data.get("client", ""))
     start_time_dt = datetime.strptime(start_date_req, "%Y-%m-%d")
     end_time_dt = datetime.strptime(end_date_req, "%Y-%m-%d %H:%M:%S")
     imos = get_all_vessels()[125].imo
@@ -194,12 +380,9 @@ def get_algorithms():
         end_time_dt,
         params_req,
         imos,
-        {
-            "point_to_point_distance": great_circle_distance,
-            "get_final_bearing": get_final_bearing,
-            "predict_sphere_movement": predict_sphere_movement,
-            "point_to_line_distance": point_to_great_circle,
-        },
+        math_backends[math_name],
+        client_version,
+        client_id,
     )
 
 
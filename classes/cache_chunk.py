@@ -1,17 +1,125 @@
-from classes.vessel_log import VesselLog
+import mmap
+import sys
+from datetime import datetime, tzinfo
+
+import numpy as np
+
+from classes.vessel_log import CompactVesselLog, VesselLog, to_epoch
+
+
+def log_size(log: VesselLog) -> int:
+    # Approximate the memory held by one log: the object itself and the values it refers to
+    size = sys.getsizeof(log)
+    if hasattr(log, '__dict__'):
+        size += sys.getsizeof(log.__dict__)
+        values = log.__dict__.values()
+    else:
+        values = [getattr(log, slot) for slot in log.__slots__ if hasattr(log, slot)]
+    # Time zones and None are shared by many logs, so they aren't counted
+    return size + sum(sys.getsizeof(value) for value in values if value is not None and not isinstance(value, tzinfo))
+
+
+def resident_nbytes(array: np.ndarray) -> int:
+    # Memory held by an array, 0 if it is a view of a memory mapped file, since the OS pages that in and out as it likes
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, 'base', None)
+    return array.nbytes
 
 
 class CacheChunk:
-    def __init__(self, vessel_logs: list[VesselLog]):
-        self.vessel_logs = vessel_logs # A list of VesselLog objects
+    # A time range of the logs of one vessel. The timestamps, ids and coordinates are kept as arrays,
+    # so segments can be found with binary search instead of comparing datetimes.
+    # A chunk built from arrays (e.g. memory mapped from the disk cache) has no list of logs,
+    # and only creates logs for the segments that are asked for.
+
+    def __init__(self, vessel_logs: list[VesselLog], start: float | None = None, end: float | None = None):
+        count = len(vessel_logs)
+        self.vessel_logs = vessel_logs # A list of VesselLog objects, ordered by timestamp (None if built from arrays)
+        self.timestamps = np.fromiter((log.epoch for log in vessel_logs), dtype=np.float64, count=count) # Epoch timestamps
+        self.ids = np.fromiter((log.id for log in vessel_logs), dtype=np.int64, count=count) # Ids of the logs
+        self.latlon = np.empty((count, 2), dtype=np.float64) # Latitudes and longitudes in radians
+        self.latlon[:, 0] = np.fromiter((log.lat_rad for log in vessel_logs), dtype=np.float64, count=count)
+        self.latlon[:, 1] = np.fromiter((log.lon_rad for log in vessel_logs), dtype=np.float64, count=count)
+        self.imo = vessel_logs[0].imo if count else None # IMO of the vessel
+        # Epoch time range the chunk holds every log of, which can be wider than the logs themselves. Defaults to the logs
+        self.start = start if start is not None else float(self.timestamps[0])
+        self.end = end if end is not None else float(self.timestamps[-1])
+        self._nbytes = None  # Approximate memory use, computed on first use
+
+    @classmethod
+    def from_arrays(
+        cls, latlon: np.ndarray, timestamps: np.ndarray, ids: np.ndarray, imo: int, start: float, end: float
+    ) -> 'CacheChunk':
+        # Create a chunk from arrays without copying them or creating any logs
+        chunk = cls.__new__(cls)
+        chunk.vessel_logs = None
+        chunk.timestamps = timestamps
+        chunk.ids = ids
+        chunk.latlon = latlon
+        chunk.imo = imo
+        chunk.start = start
+        chunk.end = end
+        chunk._nbytes = None
+        return chunk
+
+    @classmethod
+    def join(cls, pieces: list['CacheChunk']) -> 'CacheChunk':
+        # Join chunks that follow each other in time into one chunk, reusing their arrays.
+        # Neighbouring chunks can share their boundary, so a log on it can be in both. Only its first occurrence (by id) is kept.
+        # The result only has a list of logs if every piece has one
+        if len(pieces) == 1:
+            return pieces[0]
+        keep = []
+        previous = None  # The last chunk with logs
+        for piece in pieces:
+            mask = np.ones(len(piece), dtype=bool)
+            if previous is not None:
+                # Only the logs of the previous chunk from the start of this one can be duplicates,
+                # and only the logs of this chunk up to the end of the previous one can have them
+                boundary_ids = previous.ids[np.searchsorted(previous.timestamps, piece.start, side='left'):]
+                overlap = np.searchsorted(piece.timestamps, previous.end, side='right')
+                mask[:overlap] = ~np.isin(piece.ids[:overlap], boundary_ids)
+            if len(piece):
+                previous = piece
+            keep.append(mask)
+        chunk = cls.from_arrays(
+            np.concatenate([piece.latlon[mask] for piece, mask in zip(pieces, keep)]),
+            np.concatenate([piece.timestamps[mask] for piece, mask in zip(pieces, keep)]),
+            np.concatenate([piece.ids[mask] for piece, mask in zip(pieces, keep)]),
+            next((piece.imo for piece in pieces if piece.imo is not None), None),
+            min(piece.start for piece in pieces),
+            max(piece.end for piece in pieces),
+        )
+        if all(piece.vessel_logs is not None for piece in pieces):
+            chunk.vessel_logs = []
+            for piece, mask in zip(pieces, keep):
+                if mask.all():
+                    chunk.vessel_logs.extend(piece.vessel_logs)
+                else:
+                    chunk.vessel_logs.extend(log for log, kept in zip(piece.vessel_logs, mask) if kept)
+        return chunk
+
+    def logs(self, start: int, end: int) -> list[VesselLog]:
+        # Return the logs with indices in [start, end), creating them if the chunk was built from arrays
+        if self.vessel_logs is not None:
+            return self.vessel_logs[start:end]
+        return [
+            CompactVesselLog.from_radians(lat, lon, epoch, self.imo, id)
+            for (lat, lon), epoch, id in zip(
+                self.latlon[start:end].tolist(), self.timestamps[start:end].tolist(), self.ids[start:end].tolist()
+            )
+        ]
 
     def first_log(self) -> VesselLog:
         # Return the first VesselLog in the list
-        return self.vessel_logs[0]
+        return self.logs(0, 1)[0]
 
     def last_log(self) -> VesselLog:
         # Return the last VesselLog in the list
-        return self.vessel_logs[-1]
+        return self.logs(len(self) - 1, len(self))[0]
 
     def from_date(self):
         # Return the timestamp of the first VesselLog
@@ -19,4 +127,33 @@ class CacheChunk:
 
     def to_date(self):
         # Return the timestamp of the last VesselLog
-        return self.last_log().ts
\ No newline at end of file
+        return self.last_log().ts
+
+    def bounds(self, start_time: datetime, end_time: datetime) -> tuple[int, int]:
+        # Return the range of indices of the logs between the given timestamps (inclusive), found with two binary searches
+        start = int(np.searchsorted(self.timestamps, to_epoch(start_time), side='left'))
+        end = int(np.searchsorted(self.timestamps, to_epoch(end_time), side='right'))
+        return start, end
+
+    def segment(self, start_time: datetime, end_time: datetime) -> list[VesselLog]:
+        # Return the VesselLogs between the given timestamps (inclusive)
+        return self.logs(*self.bounds(start_time, end_time))
+
+    def segment_arrays(self, start_time: datetime, end_time: datetime) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Return the coordinates, timestamps and ids of the logs between the given timestamps (inclusive) as views of the arrays
+        start, end = self.bounds(start_time, end_time)
+        return self.latlon[start:end], self.timestamps[start:end], self.ids[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        # Approximate memory use of the chunk. The size of every log is estimated from the first one, since they all look alike.
+        # Arrays memory mapped from the disk cache aren't counted, so they don't make the cache evict chunks that are in memory
+        if self._nbytes is None:
+            self._nbytes = sum(resident_nbytes(array) for array in (self.timestamps, self.ids, self.latlon))
+            if self.vessel_logs is not None:
+                self._nbytes += sys.getsizeof(self.vessel_logs)
+                self._nbytes += len(self) * log_size(self.vessel_logs[0]) if len(self) else 0
+        return self._nbytes
+
+    def __len__(self):
+        return len(self.timestamps)
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+from classes.cache_chunk import CacheChunk
+from classes.chunk_index import ChunkIndex
+
+
+class ChunkCache:
+    """Cached chunks of vessel logs, per IMO, bounded by their approximate memory use.
+
+    Every chunk is kept in least recently used order. When the resident bytes exceed the ceiling,
+    the least recently used chunks are evicted until they don't. Evicting whole chunks keeps the
+    per-vessel indexes consistent, since the rest of a vessel's chunks are left untouched.
+    Hits, misses, evictions and resident bytes are counted, see stats().
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes  # Ceiling for the resident bytes
+        self.indexes: dict[int, ChunkIndex] = {}  # The chunks of every vessel, ordered by time
+        self.usage: OrderedDict[int, tuple[int, CacheChunk]] = OrderedDict()  # id(chunk) -> (imo, chunk), least recently used first
+        self.hits = 0  # Requests served from a single cached chunk without querying the database
+        self.disk_hits = 0  # Requests that read the parts not in memory from the disk cache without querying the database
+        self.misses = 0  # Requests that had to query the database
+        self.evictions = 0  # Chunks evicted to stay under the ceiling
+        self.resident_bytes = 0  # Approximate memory use of the cached chunks
+
+    def index(self, imo: int) -> ChunkIndex:
+        """Get the chunks of the given vessel, empty if none are cached."""
+        return self.indexes.get(imo) or ChunkIndex()
+
+    def touch(self, chunk: CacheChunk):
+        """Mark the given chunk as the most recently used."""
+        self.usage.move_to_end(id(chunk))
+
+    def replace(self, imo: int, lo: int, hi: int, chunk: CacheChunk):
+        """Replace the chunks in the range [lo, hi) of the given vessel with the given chunk, see ChunkIndex.replace().
+        The new chunk is the most recently used, and the least recently used chunks are evicted if the cache is too big."""
+        index = self.indexes.setdefault(imo, ChunkIndex())
+        for old in index.chunks[lo:hi]:
+            del self.usage[id(old)]
+            self.resident_bytes -= old.nbytes
+        index.replace(lo, hi, chunk)
+        self.usage[id(chunk)] = (imo, chunk)
+        self.resident_bytes += chunk.nbytes
+        self.evict()
+
+    def evict(self):
+        """Evict the least recently used chunks until the resident bytes are under the ceiling."""
+        while self.resident_bytes > self.max_bytes and self.usage:
+            _, (imo, chunk) = self.usage.popitem(last=False)
+            index = self.indexes[imo]
+            index.remove(chunk)
+            if not len(index):
+                del self.indexes[imo]
+            self.resident_bytes -= chunk.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """Evict every chunk without counting it as an eviction. The counters are kept."""
+        self.indexes.clear()
+        self.usage.clear()
+        self.resident_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Get the hit, disk hit, miss, eviction and resident byte counters, and the number of cached chunks."""
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'resident_bytes': self.resident_bytes,
+            'max_bytes': self.max_bytes,
+            'chunks': len(self.usage),
+        }
+
+    def __contains__(self, imo: int) -> bool:
+        return imo in self.indexes
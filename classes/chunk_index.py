@@ -0,0 +1,52 @@
+from bisect import bisect_left, bisect_right
+
+from classes.cache_chunk import CacheChunk
+
+
+class ChunkIndex:
+    """The cached chunks of one vessel, ordered by time and never overlapping.
+
+    The epoch time range every chunk covers is kept in sorted lists alongside the chunks,
+    so the chunk holding a timestamp, or the chunks overlapping a time range, are found with bisect.
+    """
+
+    def __init__(self):
+        self.chunks: list[CacheChunk] = []
+        self.starts: list[float] = []  # Epoch timestamp where every chunk starts
+        self.ends: list[float] = []  # Epoch timestamp where every chunk ends
+
+    def find(self, epoch: float) -> int | None:
+        """Get the index of the chunk covering the given epoch timestamp, or None if no chunk covers it."""
+        i = bisect_right(self.starts, epoch) - 1
+        if i >= 0 and epoch <= self.ends[i]:
+            return i
+        return None
+
+    def overlapping(self, start: float, end: float) -> tuple[int, int]:
+        """Get the range [lo, hi) of indices of the chunks overlapping the given epoch time range."""
+        return bisect_left(self.ends, start), bisect_right(self.starts, end)
+
+    def replace(self, lo: int, hi: int, chunk: CacheChunk):
+        """Replace the chunks in the range [lo, hi) with the given chunk, which must fit in their place in the order.
+        Empty chunks are stored as well, since they record that there are no logs in their time range."""
+        self.chunks[lo:hi] = [chunk]
+        self.starts[lo:hi] = [chunk.start]
+        self.ends[lo:hi] = [chunk.end]
+
+    def remove(self, chunk: CacheChunk):
+        """Remove the given chunk, looking it up by its start."""
+        i = bisect_left(self.starts, chunk.start)
+        while self.chunks[i] is not chunk:  # Only a chunk with an empty time range can share its start with the next one
+            i += 1
+        del self.chunks[i]
+        del self.starts[i]
+        del self.ends[i]
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __getitem__(self, index: int) -> CacheChunk:
+        return self.chunks[index]
+
+    def __iter__(self):
+        return iter(self.chunks)
@@ -0,0 +1,239 @@
+import heapq
+
+import numpy as np
+
+from classes.simplifier import Simplifier
+from classes.trajectory_buffer import TrajectoryBuffer
+from error_metrics.evaluator import RouteEvaluator
+from error_metrics.newped import ecef_point_to_segment
+from error_metrics.newsed import interpolate_ecef
+
+
+class MetricAccumulator:
+    """Running PED and SED of the trajectory of a simplifier against its raw route, as computed by newped and newsed.
+
+    The raw route is split into spans, one for every point of the simplified trajectory: the raw points measured
+    against the segment from that point to the next one. The raw points measured before the first simplified point,
+    and after the last one, form a head and a tail span, which are measured against the first and last segment.
+    Raw points are assigned to segments by their timestamp, with the same searchsorted() rules as the metrics, so a raw
+    point with the timestamp of a simplified point goes to the segment before it for PED and after it for SED.
+    Every span keeps the count, sum and maximum of its distances. When the simplifier removes a point, only the span
+    around it is measured again, and when it appends one, only the tail is, so an update costs time in
+    the number of raw points whose segment changed rather than in the length of the route.
+    The totals are kept up to date and the maxima are kept in heaps, so reading the metrics takes constant time.
+    The timestamps of the raw route must not decrease, as the metrics assume too.
+    The distances are computed from the ECEF vectors of a RouteEvaluator, which the accumulators of every algorithm
+    on a route can share, so the raw route is only converted once however many algorithms measure it.
+    """
+
+    def __init__(self):
+        self.raw_count = 0  # Number of raw points seen
+        self.raw_index: dict[int, int] = {}  # Maps point id to its index in the raw route
+        self.ids = np.empty(0, dtype=np.int64)  # Ids of the simplified trajectory when it was last seen
+        self.kept = np.empty(0, dtype=np.int64)  # Raw index of every point of the simplified trajectory
+        # Maps the raw index of the simplified point of every span, -1 for the head,
+        # to (ped count, ped sum, ped max, sed count, sed sum, sed max, version)
+        self.spans: dict[int, tuple[int, float, float, int, float, float, int]] = {}
+        self.ped_heap: list[tuple[float, int, int]] = []  # (-ped max, span key, version) of every span
+        self.sed_heap: list[tuple[float, int, int]] = []  # (-sed max, span key, version) of every span
+        self.version = 0  # Distinguishes a span from earlier spans with the same key, see max()
+        self.ped_count = 0
+        self.ped_sum = 0.0
+        self.sed_count = 0
+        self.sed_sum = 0.0
+        self.evaluator = RouteEvaluator()  # Prepares the raw route if no shared evaluator is given, see update()
+
+    def update(self, raw_route: TrajectoryBuffer, simplifier: Simplifier, evaluator: RouteEvaluator | None = None):
+        """Catch up with the raw points appended to the raw route and the changes to the trajectory of the simplifier
+        since the last update. The raw route must only grow. The evaluator is the raw route prepared for scoring,
+        and is brought up to date with it first. Without one, the accumulator prepares the raw route itself."""
+        if evaluator is None:
+            evaluator = self.evaluator
+        evaluator.update(raw_route)
+        old_count = self.raw_count
+        new_ids = raw_route.ids[old_count:]
+        self.raw_index.update(zip(new_ids.tolist(), range(old_count, len(raw_route))))
+        self.raw_count = len(raw_route)
+
+        changes = simplifier.changes_since(self.ids)
+        self.ids = simplifier.trajectory.ids.copy()
+        appended = None
+        if changes is not None:
+            removed = np.array([change for change in changes if isinstance(change, int)], dtype=np.int64)
+            appended = np.array(
+                [self.raw_index[change.id] for change in changes if not isinstance(change, int)], dtype=np.int64
+            )
+            survivors = np.delete(self.kept, removed)
+            if len(appended) and len(survivors) and appended[0] <= survivors[-1]:
+                appended = None  # The points aren't in the order of the raw route
+        if appended is None or not len(survivors) + len(appended):
+            self.rebuild(evaluator)
+            return
+
+        kept = np.concatenate([survivors, appended])
+        # A removed point merges the spans on both sides of it into the span of the surviving point before it
+        dirty = set((np.searchsorted(survivors, self.kept[removed]) - 1).tolist())
+        for index in removed.tolist():
+            self.discard(int(self.kept[index]))
+        if len(appended):
+            # Appended points split the tail, starting with the span of the last surviving point
+            dirty.update(range(len(survivors) - 1, len(kept)))
+        if self.raw_count > old_count:
+            # New raw points go to the tail, and to the spans on both sides of simplified points with the same timestamp
+            first = np.searchsorted(evaluator.times[kept], evaluator.times[old_count], side="left")
+            dirty.update(range(int(first) - 1, len(kept)))
+        # The head is measured against the first segment and the tail against the last one
+        if 0 in dirty:
+            dirty.add(-1)
+        if len(kept) - 2 in dirty:
+            dirty.add(len(kept) - 1)
+        self.kept = kept
+        self.measure(evaluator, sorted(dirty))
+
+    def rebuild(self, evaluator: RouteEvaluator):
+        """Measure every span again, e.g. when a batch simplifier rebuilt its trajectory."""
+        self.kept = np.array([self.raw_index[point_id] for point_id in self.ids.tolist()], dtype=np.int64)
+        self.spans.clear()
+        self.ped_heap.clear()
+        self.sed_heap.clear()
+        self.ped_count = self.sed_count = 0
+        self.ped_sum = self.sed_sum = 0.0
+        if len(self.kept):
+            self.measure(evaluator, range(-1, len(self.kept)))
+
+    def measure(self, evaluator: RouteEvaluator, positions):
+        """Measure the spans of the simplified points at the given positions, -1 being the head, and replace what they held.
+        All spans are measured at once, so measuring many small spans doesn't cost a round of array operations each."""
+        kept = self.kept
+        last = len(kept) - 1
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            return
+        keys = np.where(positions == -1, -1, kept[np.maximum(positions, 0)])
+        for key in keys.tolist():
+            self.discard(key)
+
+        # The head is measured against the first segment, the tail against the last one and a single point against itself
+        segments = np.clip(positions, 0, max(last - 1, 0))
+        a = kept[segments]
+        b = kept[np.minimum(segments + 1, last)]
+        latlon = evaluator.latlon
+        timestamps = evaluator.times
+        ecef = evaluator.ecef
+        same = np.all(np.isclose(latlon[a], latlon[b]), axis=1)
+        # The timestamps the span runs between; the head starts at the first raw point and the tail ends at the last one
+        after = timestamps[kept[np.maximum(positions, 0)]]
+        before = timestamps[kept[np.minimum(positions + 1, last)]]
+        head = positions == -1
+        tail = positions == last
+
+        # PED, like newped.ped_distances(): a raw point belongs to the segment ending at the first point not before it
+        starts = np.where(head, 0, np.searchsorted(timestamps, after, side="right"))
+        ends = np.where(tail, self.raw_count, np.searchsorted(timestamps, before, side="right"))
+        points, offsets, measured = spread_spans(starts, ends)
+        lengths = ends - starts
+        P, A, B = ecef[points], ecef[np.repeat(a, lengths)], ecef[np.repeat(b, lengths)]
+        same_points = np.repeat(same, lengths)
+        ped = ecef_point_to_segment(A, B, P)
+        ped[same_points] = np.linalg.norm(A[same_points] - P[same_points], axis=-1)
+        valid = ~np.isnan(ped) & (ped >= 0)
+        ped_counts = reduce_spans(np.add, valid.astype(np.int64), offsets, measured)
+        ped_sums = reduce_spans(np.add, np.where(valid, ped, 0.0), offsets, measured)
+        ped_maxima = reduce_spans(np.maximum, np.where(valid, ped, 0.0), offsets, measured)
+
+        # SED, like newsed.sed_distances(): a raw point belongs to the segment starting at the last point not after it
+        starts = np.where(head, 0, np.searchsorted(timestamps, after, side="left"))
+        ends = np.where(tail, self.raw_count, np.searchsorted(timestamps, before, side="left"))
+        points, offsets, measured = spread_spans(starts, ends)
+        lengths = ends - starts
+        P, A, B = ecef[points], ecef[np.repeat(a, lengths)], ecef[np.repeat(b, lengths)]
+        t_a, t_b = timestamps[np.repeat(a, lengths)], timestamps[np.repeat(b, lengths)]
+        dt = (t_b - t_a).astype(np.float64)
+        alpha = np.divide(timestamps[points] - t_a, dt, out=np.zeros(len(dt)), where=dt != 0)
+        sed = np.linalg.norm(interpolate_ecef(A, B, np.clip(alpha, 0.0, 1.0)) - P, axis=-1)
+        sed_counts = lengths
+        sed_sums = reduce_spans(np.add, sed, offsets, measured)
+        sed_maxima = reduce_spans(np.maximum, sed, offsets, measured)
+
+        # Store the spans and add them to the totals and the heaps
+        versions = range(self.version + 1, self.version + 1 + len(keys))
+        self.version += len(keys)
+        keys = keys.tolist()
+        self.spans.update(zip(keys, zip(
+            ped_counts.tolist(), ped_sums.tolist(), ped_maxima.tolist(),
+            sed_counts.tolist(), sed_sums.tolist(), sed_maxima.tolist(), versions,
+        )))
+        self.ped_count += int(ped_counts.sum())
+        self.ped_sum += float(ped_sums.sum())
+        self.sed_count += int(sed_counts.sum())
+        self.sed_sum += float(sed_sums.sum())
+        ped_entries = [
+            entry for entry, count in zip(zip((-ped_maxima).tolist(), keys, versions), ped_counts.tolist()) if count
+        ]
+        sed_entries = [
+            entry for entry, count in zip(zip((-sed_maxima).tolist(), keys, versions), sed_counts.tolist()) if count
+        ]
+        for heap, entries in ((self.ped_heap, ped_entries), (self.sed_heap, sed_entries)):
+            if len(entries) > len(heap):  # Cheaper to heapify everything than to push every entry
+                heap += entries
+                heapq.heapify(heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(heap, entry)
+        if len(self.sed_heap) > 2 * len(self.spans) + 64:  # Drop the stale entries before they pile up
+            self.ped_heap[:] = [(-span[2], key, span[6]) for key, span in self.spans.items() if span[0]]
+            self.sed_heap[:] = [(-span[5], key, span[6]) for key, span in self.spans.items() if span[3]]
+            heapq.heapify(self.ped_heap)
+            heapq.heapify(self.sed_heap)
+
+    def discard(self, key: int):
+        """Forget the span with the given key, if there is one. Its heap entries go stale, see max()."""
+        span = self.spans.pop(key, None)
+        if span is None:
+            return
+        ped_count, ped_sum, _, sed_count, sed_sum, _, _ = span
+        self.ped_count -= ped_count
+        self.ped_sum -= ped_sum
+        self.sed_count -= sed_count
+        self.sed_sum -= sed_sum
+        if not self.spans:  # Start over, so the sums don't keep rounding errors around
+            self.ped_sum = self.sed_sum = 0.0
+
+    def max(self, heap: list[tuple[float, int, int]]) -> float:
+        """Get the largest distance in the given heap, dropping the entries of spans that were measured again or discarded."""
+        while heap:
+            value, key, version = heap[0]
+            span = self.spans.get(key)
+            if span is not None and span[6] == version:
+                return -value
+            heapq.heappop(heap)
+        return 0.0
+
+    def ped(self) -> tuple[float, float, int]:
+        """Get the mean and maximum PED and the number of raw points it was measured for, like newped.ped_single_route_vectorized()."""
+        if not self.ped_count:
+            return 0.0, 0.0, 0
+        return self.ped_sum / self.ped_count, self.max(self.ped_heap), self.ped_count
+
+    def sed(self) -> tuple[float, float, int]:
+        """Get the mean and maximum SED and the number of raw points it was measured for, like newsed.sed_single_route_vectorized()."""
+        if not self.sed_count:
+            return 0.0, 0.0, 0
+        return self.sed_sum / self.sed_count, self.max(self.sed_heap), self.sed_count
+
+
+def spread_spans(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get the raw index of every point of the spans from starts to ends (exclusive), one span after another,
+    the offset of every span in them and which spans have any points."""
+    lengths = ends - starts
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    points = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+    return points, offsets, lengths > 0
+
+
+def reduce_spans(ufunc: np.ufunc, values: np.ndarray, offsets: np.ndarray, measured: np.ndarray) -> np.ndarray:
+    """Reduce the values of every span with the given ufunc, giving 0 for spans without points."""
+    result = np.zeros(len(offsets), dtype=values.dtype)
+    if measured.any():
+        result[measured] = ufunc.reduceat(values, offsets[measured])
+    return result
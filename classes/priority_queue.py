@@ -1,15 +1,13 @@
 import itertools
-import heapq
 
 from classes.vessel_log import VesselLog
 
 
 class PriorityQueue:
     def __init__(self):
-        self.heap = []  # The heap list of entries
-        # Maps point id to entries [float, int, VesselLog|string]
-        self.entry_finder: dict[int, list[float | int | VesselLog | str]] = {}
-        self.REMOVED = "<removed>"  # Placeholder for a removed point
+        self.heap = []  # Binary min-heap of entries, ordered by (priority, count)
+        # Maps point id to entries [float, int, VesselLog, int] i.e. [priority, count, point, index in heap]
+        self.entry_finder: dict[int, list[float | int | VesselLog]] = {}
         self.counter = itertools.count()  # Unique sequence count
 
         self.pred: dict[int, VesselLog | None] = {}  # Maps point id to its predecessor
@@ -18,61 +16,111 @@ class PriorityQueue:
 
     def insert(self, point: VesselLog, priority=float('inf')):
         """Equivalent to 'set priority(Pi, priority, Q)'."""
-        if point.id in self.entry_finder:  # Point already in the queue
-            self.remove(point)  # Lazy removal
+        entry = self.entry_finder.get(point.id)
+        if entry is not None:  # Point already in the queue, update its entry in place
+            entry[0] = priority
+            entry[1] = next(self.counter)  # Ties are broken as if the point was reinserted
+            self._sift_up(entry[3])
+            self._sift_down(entry[3])
+            return
+
+        if self.last is None:
+            self.pred[point.id] = None  # No predecessor for the first point
         else:
-            if self.last is None:
-                self.pred[point.id] = None  # No predecessor for the first point
-            else:
-                self.pred[point.id] = self.last  # Set predecessor
-                self.succ[self.last.id] = point  # Set successor of the last point
-                self.succ[point.id] = None  # No successor yet
-            self.last = point
-        count = next(self.counter)  # Unique sequence count
-        entry = [priority, count, point]  # Create new entry
+            self.pred[point.id] = self.last  # Set predecessor
+            self.succ[self.last.id] = point  # Set successor of the last point
+            self.succ[point.id] = None  # No successor yet
+        self.last = point
+        entry = [priority, next(self.counter), point, len(self.heap)]  # Create new entry
         self.entry_finder[point.id] = entry  # Add to entry finder
-        heapq.heappush(self.heap, entry)  # Push onto the heap
+        self.heap.append(entry)  # Add to the bottom of the heap
+        self._sift_up(entry[3])
 
     def remove_min(self) -> tuple[VesselLog, float]:
         """Equivalent to 'remove min(Q)'."""
-        while self.heap:  # While there are entries in the heap
-            priority, _, point = heapq.heappop(self.heap)  # Pop the smallest entry
-            if point != self.REMOVED:  # If it's not a removed point
-                if self.pred[point.id] is None or self.succ[point.id] is None:
-                    raise RuntimeError("Cannot remove endpoint from priority queue")
-                del self.entry_finder[point.id]  # Remove from entry finder
-
-                self.succ[self.pred[point.id].id] = self.succ[
-                    point.id
-                ]  # Update successor of predecessor
-                self.pred[self.succ[point.id].id] = self.pred[
-                    point.id
-                ]  # Update predecessor of successor
-
-                del self.pred[point.id]  # Remove predecessor mapping
-                del self.succ[point.id]  # Remove successor mapping
-
-                return point, priority  # Return the point and its priority
-        raise KeyError("pop from empty queue")  # If heap is empty
+        if not self.heap:
+            raise KeyError("pop from empty queue")  # If heap is empty
+        priority, _, point, _ = self.heap[0]  # The smallest entry
+        if self.pred[point.id] is None or self.succ[point.id] is None:
+            raise RuntimeError("Cannot remove endpoint from priority queue")
+        self._delete(0)
+        del self.entry_finder[point.id]  # Remove from entry finder
+
+        self.succ[self.pred[point.id].id] = self.succ[
+            point.id
+        ]  # Update successor of predecessor
+        self.pred[self.succ[point.id].id] = self.pred[
+            point.id
+        ]  # Update predecessor of successor
+
+        del self.pred[point.id]  # Remove predecessor mapping
+        del self.succ[point.id]  # Remove successor mapping
+
+        return point, priority  # Return the point and its priority
 
     def min_priority(self):
         """Equivalent to 'min priority(Q)'."""
-        while self.heap:  # While there are entries in the heap
-            priority, _, point = self.heap[0]  # Peek at the smallest entry
-            if point == self.REMOVED:  # If it's a removed point
-                heapq.heappop(self.heap)  # Remove it from heap
-                continue  # Continue to next entry
-            return priority  # Return the priority
+        if self.heap:
+            return self.heap[0][0]  # Peek at the smallest entry
         return float('inf')  # If heap is empty
 
     def remove(self, point: VesselLog):
-        """Lazy removal helper."""
+        """Remove a point from the heap without touching its predecessor and successor."""
         entry = self.entry_finder.pop(point.id, None)  # Remove from entry finder
         if entry is not None:  # If entry exists
-            entry[2] = self.REMOVED  # Mark as removed
+            self._delete(entry[3])
 
     def size(self):
-        return len(self.entry_finder)  # Number of active entries
+        return len(self.heap)  # Number of entries, every entry in the heap is live
+
+    def _delete(self, index: int):
+        """Delete the entry at the given index of the heap by replacing it with the last entry."""
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            last[3] = index
+            self._sift_up(index)
+            self._sift_down(last[3])
+
+    @staticmethod
+    def _less(a: list, b: list) -> bool:
+        return a[0] < b[0] or (a[0] == b[0] and a[1] < b[1])
+
+    def _sift_up(self, index: int):
+        """Move the entry at the given index up until its parent is smaller."""
+        heap = self.heap
+        entry = heap[index]
+        while index > 0:
+            parent_index = (index - 1) >> 1
+            parent = heap[parent_index]
+            if not self._less(entry, parent):
+                break
+            heap[index] = parent
+            parent[3] = index
+            index = parent_index
+        heap[index] = entry
+        entry[3] = index
+
+    def _sift_down(self, index: int):
+        """Move the entry at the given index down until its children are larger."""
+        heap = self.heap
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child_index = 2 * index + 1
+            if child_index >= size:
+                break
+            right_index = child_index + 1
+            if right_index < size and self._less(heap[right_index], heap[child_index]):
+                child_index = right_index
+            child = heap[child_index]
+            if not self._less(child, entry):
+                break
+            heap[index] = child
+            child[3] = index
+            index = child_index
+        heap[index] = entry
+        entry[3] = index
 
     def to_list(self) -> list[VesselLog]:
         starts = [pid for pid, p in self.pred.items() if p is None]
@@ -1,9 +1,15 @@
 from abc import ABC
 
+import numpy as np
 
-# this is an abstract class with the job of holding a trajectory (which is a list of VesselLogs)
+from classes.trajectory_buffer import TrajectoryBuffer
+
+
+# this is an abstract class with the job of holding a trajectory (which is a TrajectoryBuffer of VesselLogs)
 # and providing a simplify()-method to be overridden by specific simplification algorithms
 class Simplifier(ABC):  # "ABC" means it's an abstract class
+    param_names: tuple[str, ...] = ()  # the keys of the params dictionary that from_params() uses
+
     def __init__(
             self,
             point_to_point_distance=None,
@@ -11,7 +17,7 @@ class Simplifier(ABC):  # "ABC" means it's an abstract class
             get_final_bearing=None,
             point_to_line_distance=None,
     ):
-        self.trajectory = []
+        self.trajectory = TrajectoryBuffer()
         self.point_to_point_distance = point_to_point_distance
         self.predict_sphere_movement = predict_sphere_movement
         self.get_final_bearing = get_final_bearing
@@ -26,6 +32,19 @@ class Simplifier(ABC):  # "ABC" means it's an abstract class
         """Append a point to the trajectory."""
         self.trajectory.append(point)
 
+    def changes_since(self, ids: np.ndarray) -> list | None:
+        """Describe how the trajectory changed since it held the logs with the given ids.
+        The description uses the format described at the bottom of this file. Removals come first, highest index first,
+        so every index is also the index in the old trajectory. Returns None if the trajectory can't be reached by
+        removing old points and appending new ones, e.g. when a batch algorithm keeps a point it dropped before."""
+        current = self.trajectory.ids
+        kept = np.isin(ids, current)
+        survivors = ids[kept]
+        if not np.array_equal(current[: len(survivors)], survivors):
+            return None
+        removed = np.flatnonzero(~kept)[::-1]
+        return [int(index) for index in removed] + self.trajectory[len(survivors):]
+
     @property  # this is a property so we don't waste memory by storing a name in every object
     def name(self):
         """Return the name of the algorithm the simplifier implements."""
@@ -36,6 +55,14 @@ class Simplifier(ABC):  # "ABC" means it's an abstract class
         """Create an instance of a derived class using only relevant values from dictionary of parameters."""
         raise NotImplementedError
 
+    @classmethod
+    def config_key(cls, params: dict[str, int], math: dict) -> tuple:
+        """Return a key that is equal for two sets of params and math exactly when from_params() would create
+        equivalent instances from them, so an existing instance can keep being used."""
+        return tuple(params[name] for name in cls.param_names), tuple(
+            math[name] for name in sorted(math)
+        )
+
 
 # The description needs to be as compact as possible, since we need to send one for each request for each route.
 # Conceptual description example:
@@ -51,3 +78,5 @@ class Simplifier(ABC):  # "ABC" means it's an abstract class
 # otherwise we know to append the point described by the pair)
 # We can pack the descriptions into a dictionary that maps the ID of the route to the description,
 # so we can deal with multiple routes at once.
+# changes_since() produces these descriptions by comparing the trajectory with the ids it held when it was last sent,
+# so it works the same for online algorithms and for batch algorithms that rebuild the trajectory from scratch.
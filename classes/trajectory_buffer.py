@@ -0,0 +1,273 @@
+import numpy as np
+
+from classes.vessel_log import CompactVesselLog, VesselLog
+
+
+class TrajectoryBuffer:
+    """Structure-of-arrays container for a trajectory.
+
+    Coordinates are stored once as contiguous float64 radians, timestamps as int64 epoch seconds
+    and ids as int64, so distance computations can read them directly instead of converting
+    every VesselLog on every call. The logs themselves are kept alongside the arrays,
+    so the buffer can still be used like the list of VesselLogs it replaces.
+
+    Logs can be discarded in O(1) by leaving a tombstone in their slot. The tombstones are compacted away
+    lazily, when the buffer is read or when they outnumber the live logs, so the ordered view is only
+    rebuilt when someone looks at it while memory stays proportional to the number of live logs.
+
+    A buffer can also be built straight from columns with from_arrays(). Its logs are then only created
+    if the buffer is used as a list of logs, so code that only needs the arrays never pays for them.
+    """
+
+    def __init__(self, logs: list[VesselLog] = None, capacity: int = 16):
+        capacity = max(capacity, len(logs) if logs else 0, 1)
+        self._latlon = np.empty((capacity, 2), dtype=np.float64)  # (lat, lon) in radians
+        self._ts = np.empty(capacity, dtype=np.int64)  # Epoch timestamps in seconds
+        self._ids = np.empty(capacity, dtype=np.int64)  # Ids of the logs in the database
+        self._logs: list[VesselLog | None] | None = []  # None marks a discarded log, or all logs if not created yet
+        self._imo: int | None = None  # IMO of the logs of a buffer built from arrays
+        self._size = 0  # Number of used slots, including discarded ones
+        self._discarded = 0  # Number of discarded slots not yet compacted away
+        self._slots: dict[int, int] | None = None  # Maps log id to slot, built on the first discard
+        if logs:
+            self.extend(logs)
+
+    @classmethod
+    def from_arrays(
+        cls, latlon: np.ndarray, timestamps: np.ndarray, ids: np.ndarray, imo: int | None = None
+    ) -> "TrajectoryBuffer":
+        """Build a buffer from (N, 2) radians, (N,) epoch seconds and (N,) ids, without creating any logs.
+        If the logs are needed later, they are created as CompactVesselLogs of the given IMO."""
+        size = len(ids)
+        buffer = cls(capacity=size)
+        buffer._latlon[:size] = latlon
+        buffer._ts[:size] = timestamps
+        buffer._ids[:size] = ids
+        buffer._logs = None
+        buffer._imo = imo
+        buffer._size = size
+        return buffer
+
+    def _materialize(self):
+        """Create the logs of a buffer built from arrays, the first time they are needed."""
+        if self._logs is not None:
+            return
+        self._logs = [
+            CompactVesselLog.from_radians(lat, lon, epoch, self._imo, id)
+            for (lat, lon), epoch, id in zip(
+                self._latlon[: self._size].tolist(),
+                self._ts[: self._size].tolist(),
+                self._ids[: self._size].tolist(),
+            )
+        ]
+
+    def _grow(self, minimum: int):
+        """Reallocate the arrays with at least the given capacity. Doubling keeps appends amortized O(1)."""
+        capacity = max(minimum, 2 * len(self._ts))
+        latlon = np.empty((capacity, 2), dtype=np.float64)
+        ts = np.empty(capacity, dtype=np.int64)
+        ids = np.empty(capacity, dtype=np.int64)
+        latlon[: self._size] = self._latlon[: self._size]
+        ts[: self._size] = self._ts[: self._size]
+        ids[: self._size] = self._ids[: self._size]
+        self._latlon, self._ts, self._ids = latlon, ts, ids
+
+    def _compact(self):
+        """Remove the slots of discarded logs, shifting the live logs to the front in order."""
+        keep = [i for i, log in enumerate(self._logs) if log is not None]
+        size = len(keep)
+        self._latlon[:size] = self._latlon[: self._size][keep]
+        self._ts[:size] = self._ts[: self._size][keep]
+        self._ids[:size] = self._ids[: self._size][keep]
+        self._logs = [self._logs[i] for i in keep]
+        self._size = size
+        self._discarded = 0
+        if self._slots is not None:
+            self._slots = {log.id: i for i, log in enumerate(self._logs)}
+
+    def _index(self, index: int) -> int:
+        """Normalize a (possibly negative) index and check that it is in range."""
+        if self._discarded:
+            self._compact()
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("trajectory index out of range")
+        return index
+
+    def append(self, log: VesselLog):
+        """Append a log to the end of the trajectory."""
+        self._materialize()
+        if self._size == len(self._ts):
+            self._grow(self._size + 1)
+        self._latlon[self._size, 0] = log.lat_rad
+        self._latlon[self._size, 1] = log.lon_rad
+        self._ts[self._size] = int(log.epoch)
+        self._ids[self._size] = log.id
+        self._logs.append(log)
+        if self._slots is not None:
+            self._slots[log.id] = self._size
+        self._size += 1
+
+    def extend(self, logs: list[VesselLog]):
+        """Append several logs at once, converting their fields in bulk."""
+        count = len(logs)
+        if count == 0:
+            return
+        self._materialize()
+        end = self._size + count
+        if end > len(self._ts):
+            self._grow(end)
+        self._latlon[self._size : end, 0] = np.fromiter(
+            (log.lat_rad for log in logs), dtype=np.float64, count=count
+        )
+        self._latlon[self._size : end, 1] = np.fromiter(
+            (log.lon_rad for log in logs), dtype=np.float64, count=count
+        )
+        self._ts[self._size : end] = np.fromiter(
+            (int(log.epoch) for log in logs), dtype=np.int64, count=count
+        )
+        self._ids[self._size : end] = np.fromiter(
+            (log.id for log in logs), dtype=np.int64, count=count
+        )
+        self._logs.extend(logs)
+        if self._slots is not None:
+            self._slots.update((log.id, self._size + i) for i, log in enumerate(logs))
+        self._size = end
+
+    def pop(self, index: int = -1) -> VesselLog:
+        """Remove the log at the given index and return it."""
+        index = self._index(index)
+        self._materialize()
+        log = self._logs[index]
+        del self[index]
+        return log
+
+    def remove(self, log: VesselLog):
+        """Remove the given log from the trajectory, looking it up by id."""
+        if self._discarded:
+            self._compact()
+        matches = np.flatnonzero(self._ids[: self._size] == log.id)
+        if len(matches) == 0:
+            raise ValueError(f"Log with id {log.id} is not in the trajectory")
+        del self[int(matches[0])]
+
+    def discard(self, log: VesselLog):
+        """Remove the given log from the trajectory in amortized O(1) by leaving a tombstone in its slot."""
+        self._materialize()
+        if self._slots is None:
+            self._slots = {
+                live.id: i for i, live in enumerate(self._logs) if live is not None
+            }
+        slot = self._slots.pop(log.id, None)
+        if slot is None:
+            raise ValueError(f"Log with id {log.id} is not in the trajectory")
+        self._logs[slot] = None
+        self._discarded += 1
+        if self._discarded > self._size - self._discarded:
+            self._compact()
+
+    def last(self) -> VesselLog:
+        """Get the newest log without compacting the buffer."""
+        self._materialize()
+        for slot in range(self._size - 1, -1, -1):
+            if self._logs[slot] is not None:
+                return self._logs[slot]
+        raise IndexError("last from empty trajectory")
+
+    def take(self, indices) -> "TrajectoryBuffer":
+        """Return a new buffer containing the logs at the given indices, in the given order."""
+        if self._discarded:
+            self._compact()
+        indices = np.asarray(indices, dtype=np.intp)
+        result = TrajectoryBuffer(capacity=len(indices))
+        result._latlon[: len(indices)] = self._latlon[: self._size][indices]
+        result._ts[: len(indices)] = self._ts[: self._size][indices]
+        result._ids[: len(indices)] = self._ids[: self._size][indices]
+        if self._logs is None:  # Leave the logs of the result to be created as well
+            result._logs = None
+            result._imo = self._imo
+        else:
+            result._logs = [self._logs[i] for i in indices]
+        result._size = len(indices)
+        return result
+
+    def coords(self, index: int) -> tuple[float, float]:
+        """Get the latitude and longitude of the log at the given index in radians."""
+        index = self._index(index)
+        return self._latlon[index, 0], self._latlon[index, 1]
+
+    def time(self, index: int) -> int:
+        """Get the epoch timestamp of the log at the given index in seconds."""
+        index = self._index(index)
+        return self._ts[index]
+
+    @property
+    def latlon(self) -> np.ndarray:
+        """(N, 2) view of the latitudes and longitudes in radians."""
+        if self._discarded:
+            self._compact()
+        return self._latlon[: self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """(N,) view of the epoch timestamps in seconds."""
+        if self._discarded:
+            self._compact()
+        return self._ts[: self._size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """(N,) view of the log ids."""
+        if self._discarded:
+            self._compact()
+        return self._ids[: self._size]
+
+    def __len__(self):
+        return self._size - self._discarded
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self._discarded:
+                self._compact()
+            self._materialize()
+            return self._logs[index]
+        index = self._index(index)  # May compact, so resolve it before reading the logs
+        self._materialize()
+        return self._logs[index]
+
+    def __delitem__(self, index: int):
+        index = self._index(index)
+        self._materialize()
+        # Shift the tail of the arrays one step to the left
+        self._latlon[index : self._size - 1] = self._latlon[index + 1 : self._size]
+        self._ts[index : self._size - 1] = self._ts[index + 1 : self._size]
+        self._ids[index : self._size - 1] = self._ids[index + 1 : self._size]
+        del self._logs[index]
+        self._size -= 1
+        self._slots = None  # Slots after the index have shifted, rebuild on the next discard
+
+    def __iter__(self):
+        if self._discarded:
+            self._compact()
+        self._materialize()
+        return iter(self._logs)
+
+    def __repr__(self):
+        if self._discarded:
+            self._compact()
+        self._materialize()
+        return f"TrajectoryBuffer({self._logs!r})"
+
+
+def trajectory_arrays(trajectory: TrajectoryBuffer | list[VesselLog]) -> tuple[np.ndarray, np.ndarray]:
+    """Get the (N, 2) coordinates in radians and the (N,) epoch timestamps of a trajectory.
+    A TrajectoryBuffer hands out its own arrays, so only plain lists of logs are converted."""
+    if isinstance(trajectory, TrajectoryBuffer):
+        return trajectory.latlon, trajectory.timestamps
+    count = len(trajectory)
+    latlon = np.empty((count, 2), dtype=np.float64)
+    latlon[:, 0] = np.fromiter((log.lat_rad for log in trajectory), dtype=np.float64, count=count)
+    latlon[:, 1] = np.fromiter((log.lon_rad for log in trajectory), dtype=np.float64, count=count)
+    timestamps = np.fromiter((log.epoch for log in trajectory), dtype=np.float64, count=count)
+    return latlon, timestamps
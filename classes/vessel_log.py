@@ -1,7 +1,22 @@
-from datetime import datetime
+import math
+from datetime import datetime, timezone, tzinfo
 import numpy as np
 
 
+def to_epoch(ts: datetime) -> float:
+    # Convert a timestamp to epoch seconds. Naive timestamps are read as UTC, so the conversion is exact and reversible.
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def from_epoch(epoch: float, tz: tzinfo | None = None) -> datetime:
+    # Convert epoch seconds back to a timestamp. Inverse of to_epoch, naive if no time zone is given.
+    if tz is None:
+        return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+    return datetime.fromtimestamp(epoch, tz)
+
+
 def from_dict(data: dict) -> 'VesselLog':
     #Create a VesselLog from a dictionary.
     return VesselLog(
@@ -21,6 +36,21 @@ class VesselLog:
         self.imo = imo # IMO number of the vessel
         self.id = id # Id of the log in the database (auto incremented)
 
+    @property
+    def lat_rad(self) -> float:
+        #Latitude of the log in radians.
+        return math.radians(self.lat)
+
+    @property
+    def lon_rad(self) -> float:
+        #Longitude of the log in radians.
+        return math.radians(self.lon)
+
+    @property
+    def epoch(self) -> float:
+        #Timestamp of the log in epoch seconds.
+        return to_epoch(self.ts)
+
     def get_coords(self) -> tuple[float, float]:
         #Get the latitude and longitude in radians.
         return np.radians(self.lat), np.radians(self.lon)
@@ -43,3 +73,67 @@ class VesselLog:
             'id': self.id,
         }
 
+
+
+class CompactVesselLog:
+    # Memory-compact variant of VesselLog for holding many logs at once.
+    # It has no __dict__, and it stores the coordinates in radians and the timestamp in epoch seconds,
+    # which is what the algorithms and error metrics use. Degrees and datetime are derived on access.
+    __slots__ = ('lat_rad', 'lon_rad', 'epoch', 'tz', 'imo', 'id')
+
+    def __init__(self, lat: float, lon: float, ts: datetime, imo: int, id: int):
+        self.lat_rad = math.radians(lat) # Latitude of the log in radians
+        self.lon_rad = math.radians(lon) # Longitude of the log in radians
+        self.epoch = to_epoch(ts) # Timestamp of the log in epoch seconds
+        self.tz = ts.tzinfo # Time zone of the timestamp (None if naive)
+        self.imo = imo # IMO number of the vessel
+        self.id = id # Id of the log in the database (auto incremented)
+
+    @classmethod
+    def from_radians(cls, lat_rad: float, lon_rad: float, epoch: float, imo: int, id: int, tz: tzinfo | None = None) -> 'CompactVesselLog':
+        #Create a log from coordinates in radians and a timestamp in epoch seconds, as they are stored, without converting them.
+        log = cls.__new__(cls)
+        log.lat_rad = lat_rad
+        log.lon_rad = lon_rad
+        log.epoch = epoch
+        log.tz = tz
+        log.imo = imo
+        log.id = id
+        return log
+
+    @property
+    def lat(self) -> float:
+        #Latitude of the log in degrees.
+        return math.degrees(self.lat_rad)
+
+    @property
+    def lon(self) -> float:
+        #Longitude of the log in degrees.
+        return math.degrees(self.lon_rad)
+
+    @property
+    def ts(self) -> datetime:
+        #Timestamp of the log in datetime.
+        return from_epoch(self.epoch, self.tz)
+
+    def get_coords(self) -> tuple[float, float]:
+        #Get the latitude and longitude in radians.
+        return self.lat_rad, self.lon_rad
+
+    def strip_imo(self):
+        #Delete the IMO from the VesselLog and free up the memory space.
+        del self.imo
+
+    def __repr__(self):
+        #String representation of the VesselLog.
+        return f"({self.lat}, {self.lon}) {self.ts}"
+
+    def to_dict(self) -> dict:
+        #Convert the VesselLog to a dictionary.
+        return {
+            'lat': self.lat,
+            'lon': self.lon,
+            'ts': self.ts.isoformat(),
+            'imo': self.imo,
+            'id': self.id,
+        }
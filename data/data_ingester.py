@@ -0,0 +1,179 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from classes.vessel import Vessel
+from data.database import (
+    VESSEL_LOG_TIMESTAMP_FORMAT,
+    copy_vessel_logs,
+    create_ingested_files_table,
+    delete_ingested_file_logs,
+    get_engine,
+    get_ingested_files,
+    lock_ingested_file,
+    open_connection,
+    record_ingested_file,
+    store_vessels,
+)
+
+# Columns read from the raw AIS files, with explicit types so pandas doesn't have to infer them.
+# IMO is read as a string, since the raw files mark missing IMO numbers with 'Unknown'
+RAW_FILE_DTYPES = {
+    '# Timestamp': 'string',
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+    'IMO': 'string',
+    'Name': 'string',
+    'Ship type': 'string',
+}
+
+
+'''Remove entries with missing or malformed IMO numbers and convert the rest to integers.'''
+def imo_entries(chunk: pd.DataFrame) -> pd.DataFrame:
+    imos = pd.to_numeric(chunk['IMO'], errors='coerce')
+    chunk = chunk[imos.notna() & (imos != 0)]
+    return chunk.assign(IMO=imos[chunk.index].astype(np.int64))
+
+
+'''Get the vessels of a chunk that have not been seen yet, described by the first row of each.'''
+def new_vessels(chunk: pd.DataFrame, seen: set[int]) -> list[Vessel]:
+    first_rows = chunk.drop_duplicates('IMO')
+    first_rows = first_rows[~first_rows['IMO'].isin(seen)]
+    seen.update(first_rows['IMO'].tolist())
+    # Missing names and ship types are stored as NULL
+    names = first_rows['Name'].astype(object).where(first_rows['Name'].notna(), None)
+    ship_types = first_rows['Ship type'].astype(object).where(first_rows['Ship type'].notna(), None)
+    return [
+        Vessel(imo, name, ship_type)
+        for imo, name, ship_type in zip(first_rows['IMO'].tolist(), names.tolist(), ship_types.tolist())
+    ]
+
+
+'''Store the vessels and vessel logs of a raw AIS file in a single pass over it, reading it in chunks of chunk_size rows.
+The vessel logs are stored in the current transaction of conn. The vessels of every chunk are committed right away on
+vessel_conn, in short transactions of their own, so a worker never holds on to the vessels it inserted while it
+copies the rest of its file, and workers storing the same vessels don't have to wait for each other's files.
+Every IMO of the file ends up in seen. Memory is bounded by the chunk size regardless of the size of the file.
+Returns the number of vessel logs stored and the first and last timestamp among them (None if there are none).'''
+def ingest_file(
+    conn, vessel_conn, file_path: str, chunk_size: int, seen: set[int]
+) -> tuple[int, datetime | None, datetime | None]:
+    stored = 0
+    first_ts = last_ts = None
+    for chunk in pd.read_csv(file_path, usecols=list(RAW_FILE_DTYPES), dtype=RAW_FILE_DTYPES, chunksize=chunk_size):
+        chunk = imo_entries(chunk)
+        with vessel_conn.begin():
+            store_vessels(vessel_conn, new_vessels(chunk, seen))
+        timestamps = pd.to_datetime(chunk['# Timestamp'], format=VESSEL_LOG_TIMESTAMP_FORMAT)
+        stored += copy_vessel_logs(conn, pd.DataFrame({
+            'imo': chunk['IMO'].to_numpy(),
+            'lat': chunk['Latitude'].to_numpy(),
+            'lon': chunk['Longitude'].to_numpy(),
+            'ts': timestamps.to_numpy(),
+        }))
+        if len(timestamps):
+            first_ts = timestamps.min() if first_ts is None else min(first_ts, timestamps.min())
+            last_ts = timestamps.max() if last_ts is None else max(last_ts, timestamps.max())
+    if first_ts is None:
+        return stored, None, None
+    return stored, first_ts.to_pydatetime(), last_ts.to_pydatetime()
+
+
+'''Store the vessel logs of a raw AIS file on a connection of its own, in one transaction, so a file that fails is rolled back
+as a whole. Its vessels are committed separately, see ingest_file(), and a vessel left behind by a failed file is harmless.
+The file is recorded in ingested_files in the same transaction, so it is recorded exactly when its logs are stored.
+A file that was recorded with another size or modification time has the logs stored for it before deleted first,
+and a file that is already recorded as it is now (e.g. by a concurrent run) is skipped.
+Runs in a worker process of ingest_run. Returns the path of the file, the number of vessel logs stored (None if it was skipped),
+the number of earlier logs of the file deleted and the seconds it took.'''
+def ingest_file_task(file_path: str, chunk_size: int) -> tuple[str, int | None, int, float]:
+    start = time.perf_counter()
+    path = os.path.abspath(file_path)
+    signature = file_signature(file_path)
+    with open_connection() as conn, open_connection() as vessel_conn:
+        with conn.begin():
+            recorded = lock_ingested_file(conn, path)
+            if recorded is not None and is_ingested(recorded, signature):
+                return file_path, None, 0, time.perf_counter() - start
+            deleted = 0 if recorded is None else delete_ingested_file_logs(conn, recorded)
+            seen = set()
+            stored, first_ts, last_ts = ingest_file(conn, vessel_conn, file_path, chunk_size, seen)
+            record_ingested_file(conn, path, signature, stored, list(seen), first_ts, last_ts)
+    return file_path, stored, deleted, time.perf_counter() - start
+
+
+'''Describe a file the way it is recorded in ingested_files. A file that changes size or modification time is ingested again.'''
+def file_signature(file_path: str) -> dict[str, int]:
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+'''Check whether a file was recorded in its current form.'''
+def is_ingested(recorded: dict | None, signature: dict[str, int]) -> bool:
+    return recorded is not None and all(recorded.get(field) == value for field, value in signature.items())
+
+
+'''Replaces running data_processor, data_splitter and data_uploader one after another, which reads every row three times
+and filters every day once per vessel. The raw files are read once, and the rows go straight into the database.
+The files are spread over a pool of worker processes (all cores by default). Every stored file is recorded in the
+ingested_files table, in the transaction that stores its logs, so an interrupted run can simply be started again and
+only ingests the files that weren't finished, or that changed since, replacing the logs stored for them before.
+The chunk size and number of workers default to INGESTCHUNK and INGESTWORKERS from the environment.'''
+def ingest_run(
+    path: str = 'raw_data/2024/*/*/*.csv',
+    chunk_size: int | None = None,
+    workers: int | None = None,
+) -> None:
+    load_dotenv()
+    if chunk_size is None:
+        chunk_size = int(os.getenv('INGESTCHUNK', 500000))
+    if workers is None:
+        workers = int(os.getenv('INGESTWORKERS', os.cpu_count() or 1))
+
+    with open_connection() as conn:
+        with conn.begin():
+            create_ingested_files_table(conn)
+            ingested = get_ingested_files(conn)
+    # Close the pooled connection before the workers are forked, or they would all inherit and share its socket
+    get_engine().dispose()
+    # Skip the files written by data_processor and data_splitter, in case they are in the same directories
+    files = sorted(f for f in glob.glob(path) if '-extracted' not in os.path.basename(f))
+    pending = [
+        file for file in files if not is_ingested(ingested.get(os.path.abspath(file)), file_signature(file))
+    ]
+    print(f'Ingesting {len(pending)} of {len(files)} files, {len(files) - len(pending)} were already ingested')
+
+    total_logs = 0
+    failed = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(ingest_file_task, file, chunk_size): file for file in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                file, stored_logs, deleted_logs, elapsed = future.result()
+            except Exception as e:
+                # The transaction of the file was rolled back, so it isn't recorded and is retried on the next run
+                failed.append(futures[future])
+                print(f'[{done}/{len(pending)}] Failed to ingest {futures[future]}: {e}')
+                continue
+            if stored_logs is None:
+                print(f'[{done}/{len(pending)}] Skipped {file}, it was ingested in the meantime')
+                continue
+            total_logs += stored_logs
+            total_elapsed = time.perf_counter() - start
+            replaced = f', replacing {deleted_logs} logs stored for an earlier version' if deleted_logs else ''
+            print(
+                f'[{done}/{len(pending)}] Stored {stored_logs} vessel logs of {file}{replaced} in {elapsed:.1f}s '
+                f'({stored_logs / max(elapsed, 1e-9):.0f} rows/sec), '
+                f'{total_logs} in total ({total_logs / max(total_elapsed, 1e-9):.0f} rows/sec)'
+            )
+    total_elapsed = time.perf_counter() - start
+    print(f'Stored {total_logs} vessel logs in {total_elapsed:.1f}s ({total_logs / max(total_elapsed, 1e-9):.0f} rows/sec)')
+    if failed:
+        print(f'Failed to ingest {len(failed)} files, run again to retry them: {failed}')
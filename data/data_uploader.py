@@ -1,26 +1,38 @@
 import glob
+import time
 
 from data.database import open_connection, store_vessel, store_vessel_logs
 
 
 def upload_run():
-    conn = open_connection()
-    days = ['06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '17', '18', '19', '20', '21', '22', '23',
-            '24', '25', '26', '27', '28', '29', '30', '31']
-    for day in days:
-        print(f'Processing day {day}')
-        vessel_info_files = glob.glob('raw_data/2024/01/' + day + '/aisdk-2024-*-*-extracted-*-info.txt')
-        vessel_log_files = glob.glob('raw_data/2024/01/' + day + '/aisdk-2024-*-*-extracted-*.csv')
-        processed_info_files = 0
-        processed_log_files = 0
-        for vessel_info_file in vessel_info_files:
-            store_vessel(conn, vessel_info_file)
-            processed_info_files += 1
-            if processed_info_files % 10 == 0:
-                print(f'Processed {processed_info_files} of {len(vessel_info_files)} vessel info files')
+    with open_connection() as conn:
+        days = ['06', '07', '08', '09', '10', '11', '12', '13', '14', '15', '16', '17', '18', '19', '20', '21', '22', '23',
+                '24', '25', '26', '27', '28', '29', '30', '31']
+        total_logs = 0
+        total_elapsed = 0.0
+        for day in days:
+            print(f'Processing day {day}')
+            vessel_info_files = glob.glob('raw_data/2024/01/' + day + '/aisdk-2024-*-*-extracted-*-info.txt')
+            vessel_log_files = glob.glob('raw_data/2024/01/' + day + '/aisdk-2024-*-*-extracted-*.csv')
+            processed_info_files = 0
+            processed_log_files = 0
+            stored_logs = 0
+            start = time.perf_counter()
+            # One transaction per day, so a day that fails is rolled back as a whole and can simply be uploaded again
+            with conn.begin():
+                for vessel_info_file in vessel_info_files:
+                    store_vessel(conn, vessel_info_file)
+                    processed_info_files += 1
+                    if processed_info_files % 10 == 0:
+                        print(f'Processed {processed_info_files} of {len(vessel_info_files)} vessel info files')
 
-        for vessel_log_file in vessel_log_files:
-            store_vessel_logs(conn, vessel_log_file)
-            processed_log_files += 1
-            if processed_log_files % 10 == 0:
-                print(f'Processed {processed_log_files} of {len(vessel_log_files)} vessel log files')
\ No newline at end of file
+                for vessel_log_file in vessel_log_files:
+                    stored_logs += store_vessel_logs(conn, vessel_log_file)
+                    processed_log_files += 1
+                    if processed_log_files % 10 == 0:
+                        print(f'Processed {processed_log_files} of {len(vessel_log_files)} vessel log files')
+            elapsed = time.perf_counter() - start
+            total_logs += stored_logs
+            total_elapsed += elapsed
+            print(f'Stored {stored_logs} vessel logs of day {day} in {elapsed:.1f}s ({stored_logs / max(elapsed, 1e-9):.0f} rows/sec)')
+        print(f'Stored {total_logs} vessel logs in {total_elapsed:.1f}s ({total_logs / max(total_elapsed, 1e-9):.0f} rows/sec)')
\ No newline at end of file
@@ -1,32 +1,100 @@
+from collections.abc import Iterator
 from datetime import datetime
+import io
 
+import numpy as np
 import pandas as pd
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, Connection, Sequence, Row
+from sqlalchemy import create_engine, text, Connection, Engine, Sequence, Row
 
+from classes.trajectory_buffer import TrajectoryBuffer
 from classes.vessel import Vessel
-from classes.vessel_log import VesselLog
+from classes.vessel_log import CompactVesselLog, VesselLog
+
+
+load_dotenv()  # once, at import time, so reading the settings on the request path doesn't parse .env every time
+engine: Engine | None = None  # shared by the whole process, created on first use
+
+# A row of (imo, lat, lon, epoch, id) in PostgreSQL's binary COPY format: a 16-bit field count,
+# then every field as a 32-bit length followed by its value, all big-endian.
+# Every field is a non-null 8-byte value, so every row has the same size and numpy can read them in one go
+LOG_ARRAYS_ROW = np.dtype([
+    ('fields', '>i2'),
+    ('imo_length', '>i4'), ('imo', '>i8'),
+    ('lat_length', '>i4'), ('lat', '>f8'),
+    ('lon_length', '>i4'), ('lon', '>f8'),
+    ('epoch_length', '>i4'), ('epoch', '>i8'),
+    ('id_length', '>i4'), ('id', '>i8'),
+])
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+COPY_HEADER_SIZE = len(COPY_SIGNATURE) + 8  # the signature, 32-bit flags and a 32-bit header extension length
+COPY_TRAILER_SIZE = 2  # a 16-bit field count of -1
+
+
+def get_engine() -> Engine:
+    """Return the engine shared by the whole process, creating it the first time.
+    The engine keeps a pool of connections, so requests don't pay for connecting and authenticating every time.
+    The pool is configured with DBPOOLSIZE, DBMAXOVERFLOW, DBPOOLTIMEOUT and DBPOOLRECYCLE from the environment."""
+    global engine
+    if engine is None:
+        engine = create_engine(
+            f'postgresql+psycopg2://{os.getenv("DBUSER")}:{os.getenv("DBPASS")}@{os.getenv("DBHOST")}/{os.getenv("DBNAME")}',
+            pool_size=int(os.getenv('DBPOOLSIZE', 5)),  # connections kept open in the pool
+            max_overflow=int(os.getenv('DBMAXOVERFLOW', 10)),  # extra connections allowed under load
+            pool_timeout=int(os.getenv('DBPOOLTIMEOUT', 30)),  # seconds to wait for a free connection
+            pool_recycle=int(os.getenv('DBPOOLRECYCLE', 1800)),  # seconds before a connection is replaced
+            pool_pre_ping=True,  # replace connections the server has dropped instead of failing the request
+        )
+    return engine
 
 
 def open_connection() -> Connection:
-    load_dotenv()
-    engine = create_engine(
-        f'postgresql+psycopg2://{os.getenv("DBUSER")}:{os.getenv("DBPASS")}@{os.getenv("DBHOST")}/{os.getenv("DBNAME")}'
-    )
-    return engine.connect()
+    """Check out a connection from the pool of the shared engine.
+    Use it as a context manager (with open_connection() as conn:) so it is returned to the pool afterwards."""
+    return get_engine().connect()
+
+
+# Columns read from the per-IMO log files, with explicit types so pandas doesn't have to infer them
+VESSEL_LOG_FILE_DTYPES = {'# Timestamp': 'string', 'Latitude': 'float64', 'Longitude': 'float64'}
+VESSEL_LOG_TIMESTAMP_FORMAT = '%d/%m/%Y %H:%M:%S'  # AIS timestamps are day first, e.g. 13/01/2024 00:00:01
+
+
+def store_vessel_logs(conn: Connection, file_path, chunk_size: int | None = None) -> int:
+    """Append the logs of a per-IMO file to vessel_logs with COPY, reading the file in chunks of chunk_size rows.
+    The chunk size defaults to DBCOPYCHUNK from the environment.
+    Runs in the current transaction of the connection. Returns the number of logs stored."""
+    if chunk_size is None:
+        chunk_size = int(os.getenv('DBCOPYCHUNK', 100000))
+    imo = int(os.path.basename(file_path).split('-')[5].split('.')[0])
+    stored = 0
+    for chunk in pd.read_csv(
+        file_path, usecols=list(VESSEL_LOG_FILE_DTYPES), dtype=VESSEL_LOG_FILE_DTYPES, chunksize=chunk_size
+    ):
+        df = pd.DataFrame({
+            'imo': np.full(len(chunk), imo, dtype=np.int64),
+            'lat': chunk['Latitude'].to_numpy(),
+            'lon': chunk['Longitude'].to_numpy(),
+            'ts': pd.to_datetime(chunk['# Timestamp'], format=VESSEL_LOG_TIMESTAMP_FORMAT).to_numpy(),
+        })
+        stored += copy_vessel_logs(conn, df)
+    return stored
 
 
-def store_vessel_logs(conn: Connection, file_path):
-    imo = os.path.basename(file_path).split('-')[5].split('.')[0]
-    df = pd.read_csv(file_path)
-    df['imo'] = int(imo)
-    df['ts'] = pd.to_datetime(df['# Timestamp'])
-    df['lat'] = df['Latitude'].astype(float)
-    df['lon'] = df['Longitude'].astype(float)
-    df = df[['imo', 'lat', 'lon', 'ts']]
-    df.to_sql('vessel_logs', con=conn, if_exists='append', index=False)
+def copy_vessel_logs(conn: Connection, df: pd.DataFrame) -> int:
+    """Append the rows of a DataFrame with the columns imo, lat, lon and ts to vessel_logs with COPY ... FROM STDIN.
+    The rows are sent as one CSV stream, which is much faster than the row-batched INSERTs of DataFrame.to_sql.
+    Missing positions are stored as NULL. Runs in the current transaction of the connection. Returns the number of rows copied."""
+    data = io.StringIO()
+    df[['imo', 'lat', 'lon', 'ts']].to_csv(data, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S')
+    data.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert('COPY vessel_logs (imo, lat, lon, ts) FROM STDIN WITH (FORMAT csv);', data)
+    finally:
+        cursor.close()
+    return len(df)
 
 
 def store_vessel(conn: Connection, file_path):
@@ -35,47 +103,204 @@ def store_vessel(conn: Connection, file_path):
         imo = lines[0].strip().split(': ')[1]
         name = lines[1].strip().split(': ')[1]
         ship_type = lines[2].strip().split(': ')[1]
-        statement = text(
-            'INSERT INTO vessels (imo, name, ship_type) VALUES (:imo, :name, :ship_type) ON CONFLICT (imo) DO NOTHING;'
-        )
-        conn.execute(statement, {'imo': imo, 'name': name, 'ship_type': ship_type})
+    store_vessels(conn, [Vessel(imo, name, ship_type)])
+
+
+def store_vessels(conn: Connection, vessels: list[Vessel]):
+    if not vessels:
+        return
+    # Inserted in the order of their IMO, so concurrent transactions lock the same vessels in the same order and can't deadlock
+    vessels = sorted(vessels, key=lambda vessel: int(vessel.imo))
+    statement = text(
+        'INSERT INTO vessels (imo, name, ship_type) VALUES (:imo, :name, :ship_type) ON CONFLICT (imo) DO NOTHING;'
+    )
+    conn.execute(
+        statement,
+        [{'imo': vessel.imo, 'name': vessel.name, 'ship_type': vessel.ship_type} for vessel in vessels],
+    )
+
+
+def create_ingested_files_table(conn: Connection):
+    """Create the table that records the raw AIS files stored by data_ingester, if it doesn't exist yet.
+    A file is recorded in the same transaction that stores its vessel logs, so it is recorded exactly when its logs are."""
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS ingested_files ('
+        'path text PRIMARY KEY, size bigint NOT NULL, mtime_ns bigint NOT NULL, logs bigint NOT NULL, '
+        'imos bigint[] NOT NULL, start_ts timestamp, end_ts timestamp);'
+    ))
+
+
+def get_ingested_files(conn: Connection) -> dict[str, dict[str, int]]:
+    """Get the size and modification time of every recorded raw AIS file, by path."""
+    result = conn.execute(text('SELECT path, size, mtime_ns FROM ingested_files;'))
+    return {path: {'size': size, 'mtime_ns': mtime_ns} for path, size, mtime_ns in result}
+
+
+def lock_ingested_file(conn: Connection, path: str) -> dict | None:
+    """Lock the given raw AIS file for the current transaction and get its record, or None if it isn't recorded.
+    Transactions that lock the same file wait for each other, so a file is never stored twice at the same time."""
+    conn.execute(text('SELECT pg_advisory_xact_lock(hashtext(:path));'), {'path': path})
+    row = conn.execute(
+        text('SELECT size, mtime_ns, imos, start_ts, end_ts FROM ingested_files WHERE path = :path;'), {'path': path}
+    ).mappings().first()
+    return None if row is None else dict(row)
+
+
+def delete_ingested_file_logs(conn: Connection, ingested_file: dict) -> int:
+    """Delete the vessel logs stored for a recorded raw AIS file: the logs of its vessels within its time range.
+    Raw files cover separate time ranges (one day each), so no other file stores logs there. Returns the number deleted."""
+    if ingested_file['start_ts'] is None:
+        return 0
+    result = conn.execute(
+        text('DELETE FROM vessel_logs WHERE imo = ANY(:imos) AND ts >= :start_ts AND ts <= :end_ts;'),
+        ingested_file,
+    )
+    return result.rowcount
+
+
+def record_ingested_file(
+    conn: Connection,
+    path: str,
+    signature: dict[str, int],
+    logs: int,
+    imos: list[int],
+    start_ts: datetime | None,
+    end_ts: datetime | None,
+):
+    """Record a raw AIS file as stored, replacing an earlier record of it. Runs in the current transaction of the connection."""
+    conn.execute(
+        text(
+            'INSERT INTO ingested_files (path, size, mtime_ns, logs, imos, start_ts, end_ts) '
+            'VALUES (:path, :size, :mtime_ns, :logs, :imos, :start_ts, :end_ts) '
+            'ON CONFLICT (path) DO UPDATE SET size = EXCLUDED.size, mtime_ns = EXCLUDED.mtime_ns, logs = EXCLUDED.logs, '
+            'imos = EXCLUDED.imos, start_ts = EXCLUDED.start_ts, end_ts = EXCLUDED.end_ts;'
+        ),
+        {
+            'path': path, **signature, 'logs': logs, 'imos': sorted(imos),
+            'start_ts': start_ts, 'end_ts': end_ts,
+        },
+    )
 
 
 def get_all_vessels() -> list[Vessel]:
-    conn = open_connection()
     statement = text('SELECT * FROM vessels;')
-    result = conn.execute(statement)
-    return hydrate_vessels(result.fetchall())
+    with open_connection() as conn:
+        result = conn.execute(statement)
+        return hydrate_vessels(result.fetchall())
+
+
+def get_latest_log_time(imo: int) -> datetime | None:
+    """Get the timestamp of the newest log of the given vessel, or None if it has none."""
+    with open_connection() as conn:
+        return conn.execute(text('SELECT max(ts) FROM vessel_logs WHERE imo = :imo;'), {'imo': imo}).scalar()
 
 
 def get_vessel_logs(
     imo: int | list[int], start_ts: datetime, end_ts: datetime
-) -> list[VesselLog]:
+) -> list[CompactVesselLog]:
+    return [
+        log
+        for batch in stream_vessel_logs(imo, start_ts, end_ts)
+        for log in batch
+    ]
+
+
+def stream_vessel_logs(
+    imo: int | list[int],
+    start_ts: datetime,
+    end_ts: datetime,
+    batch_size: int | None = None,
+) -> Iterator[list[CompactVesselLog]]:
+    """Yield the logs of the given vessel(s) between the given timestamps in batches, ordered by timestamp.
+    The rows are read through a server-side cursor, so only one batch is held in memory at a time
+    and the first batch can be processed before the rest has arrived.
+    The batch size defaults to DBSTREAMBATCH from the environment."""
+    if batch_size is None:
+        batch_size = int(os.getenv('DBSTREAMBATCH', 10000))
     start_time = start_ts.strftime('%Y-%m-%d %H:%M:%S')
     end_time = end_ts.strftime('%Y-%m-%d %H:%M:%S')
-    conn = open_connection()
     if isinstance(imo, int):
         # SECTION legacy code to keep compatibility with the cache
         statement = text(
             'SELECT imo, lat, lon, ts, id FROM vessel_logs WHERE imo = :imo AND ts >= :start_ts AND ts <= :end_ts ORDER BY ts;'
         )
-        result = conn.execute(
-            statement, {'imo': imo, 'start_ts': start_time, 'end_ts': end_time}
-        )
-        return hydrate_vessel_logs(result.fetchall())
+        parameters = {'imo': imo, 'start_ts': start_time, 'end_ts': end_time}
     else:
         # SECTION code to get logs from multiple vessels (assuming the argument imo is an iterable)
         statement = text(
             'SELECT imo, lat, lon, ts, id FROM vessel_logs WHERE imo IN :imos AND ts >= :start_ts AND ts <= :end_ts ORDER BY ts;'
         )
+        parameters = {'imos': tuple(imo), 'start_ts': start_time, 'end_ts': end_time}
+    # The connection is returned to the pool when the generator is exhausted or closed
+    with open_connection() as conn:
         result = conn.execute(
-            statement, {'imos': tuple(imo), 'start_ts': start_time, 'end_ts': end_time}
+            statement,
+            parameters,
+            execution_options={'stream_results': True, 'yield_per': batch_size},
         )
-        return hydrate_vessel_logs(result.fetchall())
+        for rows in result.partitions(batch_size):
+            yield hydrate_vessel_logs(rows)
+
+
+def get_vessel_log_arrays(
+    imo: int | list[int], start_ts: datetime, end_ts: datetime
+) -> dict[int, TrajectoryBuffer]:
+    """Get the logs of the given vessel(s) between the given timestamps as one TrajectoryBuffer per IMO, ordered by timestamp.
+    The rows are copied out of the database in binary and read with numpy, so no VesselLog is created per row.
+    Logs without a position are left out. Timestamps are truncated to whole epoch seconds, like in TrajectoryBuffer."""
+    imos = (imo,) if isinstance(imo, int) else tuple(imo)
+    with open_connection() as conn:
+        cursor = conn.connection.cursor()
+        try:
+            # COPY doesn't take parameters, so they are bound by the driver before sending it
+            statement = cursor.mogrify(
+                'COPY (SELECT imo::int8, lat::float8, lon::float8, floor(EXTRACT(EPOCH FROM ts))::int8, id::int8 '
+                'FROM vessel_logs WHERE imo IN %(imos)s AND ts >= %(start_ts)s AND ts <= %(end_ts)s '
+                'AND lat IS NOT NULL AND lon IS NOT NULL ORDER BY imo, ts) TO STDOUT WITH (FORMAT binary);',
+                {
+                    'imos': imos,
+                    'start_ts': start_ts.strftime('%Y-%m-%d %H:%M:%S'),
+                    'end_ts': end_ts.strftime('%Y-%m-%d %H:%M:%S'),
+                },
+            )
+            data = io.BytesIO()
+            cursor.copy_expert(statement.decode(), data)
+        finally:
+            cursor.close()
+    return hydrate_vessel_log_arrays(read_binary_copy(data.getbuffer()))
+
+
+def read_binary_copy(data) -> np.ndarray:
+    """Read the output of a binary COPY of (imo, lat, lon, epoch, id) rows into a structured array."""
+    if bytes(data[: len(COPY_SIGNATURE)]) != COPY_SIGNATURE:
+        raise ValueError('Not the output of a binary COPY')
+    extension_length = int.from_bytes(data[COPY_HEADER_SIZE - 4 : COPY_HEADER_SIZE], 'big')
+    start = COPY_HEADER_SIZE + extension_length
+    size = len(data) - start - COPY_TRAILER_SIZE
+    if size % LOG_ARRAYS_ROW.itemsize:
+        raise ValueError('Binary COPY rows are not all (imo, lat, lon, epoch, id)')
+    return np.frombuffer(data, dtype=LOG_ARRAYS_ROW, count=size // LOG_ARRAYS_ROW.itemsize, offset=start)
+
+
+def hydrate_vessel_log_arrays(rows: np.ndarray) -> dict[int, TrajectoryBuffer]:
+    # The rows are ordered by IMO, so each vessel is one contiguous run
+    starts = np.flatnonzero(np.diff(rows['imo'], prepend=np.int64(-1)))
+    ends = np.append(starts[1:], len(rows))
+    buffers = {}
+    for start, end in zip(starts, ends):
+        vessel = rows[start:end]
+        latlon = np.radians(np.column_stack((vessel['lat'], vessel['lon'])))
+        imo = int(vessel['imo'][0])
+        buffers[imo] = TrajectoryBuffer.from_arrays(latlon, vessel['epoch'], vessel['id'], imo)
+    return buffers
 
 
-def hydrate_vessel_logs(raw_logs: Sequence[Row]) -> list[VesselLog]:
-    return [VesselLog(lat, lon, ts, imo, id) for imo, lat, lon, ts, id in raw_logs]
+def hydrate_vessel_logs(raw_logs: Sequence[Row]) -> list[CompactVesselLog]:
+    imos = {}  # Share one int object per IMO instead of one per row
+    return [
+        CompactVesselLog(lat, lon, ts, imos.setdefault(imo, imo), id)
+        for imo, lat, lon, ts, id in raw_logs
+    ]
 
 
 def hydrate_vessels(raw_vessel: Sequence[Row]) -> list[Vessel]:
@@ -1,106 +1,112 @@
+import os
+import time
 from datetime import datetime
 
+from dotenv import load_dotenv
+
 from classes.cache_chunk import CacheChunk
-from classes.vessel_log import VesselLog
-from data.database import get_vessel_logs
+from classes.chunk_cache import ChunkCache
+from classes.vessel_log import VesselLog, from_epoch, to_epoch
+from data.database import get_latest_log_time, get_vessel_logs
+from data.vessel_disk_cache import is_enabled as disk_cache_enabled, read_range, write_days
 from classes.vessel import Vessel
 
 '''
 vessel_log_cache structure:
 {
-    imo1: [
+    imo1: ChunkIndex([
         cache_chunk1,
         cache_chunk2,
         ...
-    ],
+    ]),
     ...
+The chunks of every vessel are ordered by time and never overlap, so they can be looked up with bisect.
+The cache is bounded by the approximate memory use of the chunks, CACHEMAXBYTES from the environment (256 MB by default).
+When it grows past that, the least recently used chunks are evicted. See vessel_log_cache.stats() for its counters.
+Parts of a request that aren't in memory are read from the disk cache (see vessel_disk_cache.py) before querying the database,
+and complete days downloaded from the database are stored on disk.
+A day is complete once it ends before the newest log of the vessel in the database and more than CACHEINGESTLAG seconds
+(an hour by default) before now, so days that are still being ingested are never stored on disk.
 '''
-vessel_log_cache = {}
+load_dotenv()
+vessel_log_cache = ChunkCache(int(os.getenv('CACHEMAXBYTES', 256 * 1024 * 1024)))
+ingest_lag = int(os.getenv('CACHEINGESTLAG', 60 * 60))
 
 
 def get_data_from_cache(vessel: Vessel, start_time: datetime, end_time: datetime):
-    if vessel.imo not in vessel_log_cache:
-        data = get_data_from_db(vessel, start_time, end_time)
-        if len(data.vessel_logs) == 0:
-            return []
-        vessel_log_cache[vessel.imo] = [data]
-        chunk = vessel_log_cache[vessel.imo][0]
-    else:
-        try:
-            chunk = get_chunk(vessel, start_time, end_time)
-        except IndexError:
-            # IndexError will be thrown if chunk is empty (via call to chunk.from_date())
-            return []
-
+    chunk = get_chunk(vessel, start_time, end_time)
     return extract_segment_from_chunk(chunk, start_time, end_time)
 
 
 def get_data_from_db(vessel: Vessel, start_time: datetime, end_time: datetime):
     vessel_logs = get_vessel_logs(vessel.imo, start_time, end_time)
-    return CacheChunk(vessel_logs)
+    return CacheChunk(vessel_logs, to_epoch(start_time), to_epoch(end_time))
 
 
 def get_chunk(vessel: Vessel, start_time: datetime, end_time: datetime) -> CacheChunk:
-    chunks = vessel_log_cache[vessel.imo]  # type: list[CacheChunk]
-    left_chunk_idx = None
-    right_chunk_idx = None
-    for i, chunk in enumerate(chunks):  # type: (int, CacheChunk)
-        if chunk.from_date() <= start_time <= chunk.to_date():
-            left_chunk_idx = i
-        if chunk.from_date() <= end_time <= chunk.to_date():
-            right_chunk_idx = i
-        if (
-            left_chunk_idx is not None and right_chunk_idx is not None
-        ):  # No need to continue searching
-            break
-
-    if (
-        left_chunk_idx is None and right_chunk_idx is None
-    ):  # Both dates are outside cached chunks
-        chunks.append(get_data_from_db(vessel, start_time, end_time))
-        return chunks[-1]
-
-    elif left_chunk_idx == right_chunk_idx:  # Both dates are in the same chunk
+    chunks = vessel_log_cache.index(vessel.imo)
+    start, end = to_epoch(start_time), to_epoch(end_time)
+    left_chunk_idx = chunks.find(start)
+    if left_chunk_idx is not None and left_chunk_idx == chunks.find(end):
+        # Both dates are in the same chunk
+        vessel_log_cache.hits += 1
+        vessel_log_cache.touch(chunks[left_chunk_idx])
         return chunks[left_chunk_idx]
 
-    elif left_chunk_idx is None:  # Only right date is in a cached chunk
-        end_time = chunks[right_chunk_idx].to_date()
-        del chunks[
-            0 : right_chunk_idx + 1
-        ]  # Remove all chunks up to and including right_chunk_idx
-        chunks.insert(0, get_data_from_db(vessel, start_time, end_time))
-        return chunks[0]
-
-    elif right_chunk_idx is None:  # Only left date is in a cached chunk
-        start_time = chunks[left_chunk_idx].to_date()
-        del chunks[left_chunk_idx:]  # Remove all chunks from left_chunk_idx to end
-        chunks.append(get_data_from_db(vessel, start_time, end_time))
-        return chunks[-1]
-
-    else:  # Both dates are in different cached chunks
-        start_time = chunks[left_chunk_idx].from_date()
-        end_time = chunks[right_chunk_idx].to_date()
-        del chunks[
-            left_chunk_idx : right_chunk_idx + 1
-        ]  # Remove all chunks between left_chunk_idx and right_chunk_idx
-        chunks.insert(left_chunk_idx, get_data_from_db(vessel, start_time, end_time))
-        return chunks[left_chunk_idx]
+    # Otherwise, download only the parts of the requested range that no cached chunk covers,
+    # and stitch them together with the chunks the range overlaps into one chunk that replaces those chunks
+    lo, hi = chunks.overlapping(start, end)
+    pieces = []  # The cached chunks and the gaps, in order
+    gaps = []  # The gaps, as (pieces, whether the database was queried for them)
+    covered = start  # Everything before this has been handled
+    for chunk in chunks.chunks[lo:hi]:
+        if chunk.start > covered:
+            gaps.append(get_gap(vessel, covered, chunk.start))
+            pieces.extend(gaps[-1][0])
+        pieces.append(chunk)
+        covered = max(covered, chunk.end)
+    if covered < end:
+        gaps.append(get_gap(vessel, covered, end))
+        pieces.extend(gaps[-1][0])
+    downloaded = any(queried for _, queried in gaps)
+    if downloaded:
+        vessel_log_cache.misses += 1
+    elif gaps:  # The gaps were all on disk
+        vessel_log_cache.disk_hits += 1
+    else:
+        vessel_log_cache.hits += 1
+
+    chunk = CacheChunk.join(pieces)
+    vessel_log_cache.replace(vessel.imo, lo, hi, chunk)
+    if downloaded and disk_cache_enabled():
+        write_days(vessel.imo, chunk, complete_before(vessel.imo))
+    return chunk
+
+
+def complete_before(imo: int) -> float:
+    # Get the epoch time before which the database holds every log of the vessel, i.e. its newest log,
+    # at most now minus the ingest lag
+    latest = get_latest_log_time(imo)
+    if latest is None:
+        return float('-inf')
+    return min(to_epoch(latest), time.time() - ingest_lag)
+
+
+def get_gap(vessel: Vessel, start: float, end: float) -> tuple[list[CacheChunk], bool]:
+    # Get a part of the requested range that no cached chunk covers, from the disk cache where it has it
+    # and otherwise from the database. Also return whether the database was queried
+    pieces = []
+    queried = False
+    for part in read_range(vessel.imo, start, end):
+        if isinstance(part, CacheChunk):
+            pieces.append(part)
+        else:
+            pieces.append(get_data_from_db(vessel, from_epoch(part[0]), from_epoch(part[1])))
+            queried = True
+    return pieces, queried
 
 
 def extract_segment_from_chunk(
     chunk: CacheChunk, start_time: datetime, end_time: datetime
 ) -> list[VesselLog]:
-    left_index = None
-    right_index = None
-    for i, vessel_log in enumerate(chunk.vessel_logs[:-1]):
-        next_vessel_log = chunk.vessel_logs[i + 1]
-        if vessel_log.ts <= start_time <= next_vessel_log.ts:
-            left_index = i
-        if vessel_log.ts <= end_time <= next_vessel_log.ts:
-            right_index = i
-        if left_index is not None and right_index is not None:
-            break
-
-    start = 0 if left_index is None else left_index
-    end = right_index + 1 if right_index is not None else None
-    return chunk.vessel_logs[start:end]
+    return chunk.segment(start_time, end_time)
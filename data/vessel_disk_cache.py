@@ -0,0 +1,98 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+from classes.cache_chunk import CacheChunk
+
+'''
+Disk tier of the vessel log cache, which survives restarts and is shared by every process using the same directory.
+It is enabled by setting CACHEDIR in the environment. Every complete (UTC) day of logs of a vessel is stored as
+    CACHEDIR/imo/YYYY-MM-DD/latlon.npy, timestamps.npy and ids.npy
+The day directories are the index of the covered time ranges: a day directory exists if and only if the day is complete.
+A day is written to a temporary directory and renamed into place, so other processes never see a partial day.
+The files are read memory mapped, so reading a day doesn't copy it, and segments of it are views of the mapping.
+A day holds the logs from its midnight up to and including the next one, like the inclusive time ranges of the cache.
+'''
+load_dotenv()
+cache_directory = os.getenv('CACHEDIR')  # None disables the disk tier
+DAY_SECONDS = 24 * 60 * 60
+
+
+def is_enabled() -> bool:
+    return cache_directory is not None
+
+
+def day_directory(imo: int, day_start: float) -> str:
+    day = datetime.fromtimestamp(day_start, timezone.utc).strftime('%Y-%m-%d')
+    return os.path.join(cache_directory, str(imo), day)
+
+
+def read_day(imo: int, day_start: float) -> CacheChunk | None:
+    # Map the given day of the given vessel, or return None if it isn't on disk
+    directory = day_directory(imo, day_start)
+    if not os.path.isdir(directory):
+        return None
+    return CacheChunk.from_arrays(
+        np.load(os.path.join(directory, 'latlon.npy'), mmap_mode='r'),
+        np.load(os.path.join(directory, 'timestamps.npy'), mmap_mode='r'),
+        np.load(os.path.join(directory, 'ids.npy'), mmap_mode='r'),
+        imo,
+        day_start,
+        day_start + DAY_SECONDS,
+    )
+
+
+def read_range(imo: int, start: float, end: float) -> list[CacheChunk | tuple[float, float]]:
+    # Split the given epoch time range into the parts that are on disk, as chunks cut to the range,
+    # and the parts that aren't, as (start, end) tuples, in order
+    if cache_directory is None:
+        return [(start, end)]
+    parts = []
+    missing_start = start  # Start of the part not on disk that is being extended, if any
+    day_start = start - start % DAY_SECONDS  # Midnight at or before the start
+    while day_start < end:  # A day starting at the end adds nothing, the previous day holds its midnight
+        day = read_day(imo, day_start)
+        if day is not None:
+            part_start, part_end = max(start, day.start), min(end, day.end)
+            if missing_start is not None and missing_start < part_start:
+                parts.append((missing_start, part_start))
+            first = int(np.searchsorted(day.timestamps, part_start, side='left'))
+            last = int(np.searchsorted(day.timestamps, part_end, side='right'))
+            parts.append(CacheChunk.from_arrays(
+                day.latlon[first:last], day.timestamps[first:last], day.ids[first:last], imo, part_start, part_end
+            ))
+            missing_start = part_end if part_end < end else None
+        elif missing_start is None:
+            missing_start = day_start
+        day_start += DAY_SECONDS
+    if missing_start is not None:
+        parts.append((missing_start, end))
+    return parts
+
+
+def write_days(imo: int, chunk: CacheChunk, complete_before: float):
+    # Store every complete day covered by the chunk that isn't on disk yet. The range of a chunk is the requested one,
+    # not what the database had, so only days ending before complete_before are known to be complete, see vessel_cache
+    if cache_directory is None:
+        return
+    day_start = chunk.start + (-chunk.start) % DAY_SECONDS  # First midnight at or after the start of the chunk
+    while day_start + DAY_SECONDS <= chunk.end and day_start + DAY_SECONDS < complete_before:
+        directory = day_directory(imo, day_start)
+        if not os.path.isdir(directory):
+            first = int(np.searchsorted(chunk.timestamps, day_start, side='left'))
+            last = int(np.searchsorted(chunk.timestamps, day_start + DAY_SECONDS, side='right'))
+            os.makedirs(os.path.dirname(directory), exist_ok=True)
+            temporary = tempfile.mkdtemp(dir=os.path.dirname(directory))
+            np.save(os.path.join(temporary, 'latlon.npy'), chunk.latlon[first:last])
+            np.save(os.path.join(temporary, 'timestamps.npy'), chunk.timestamps[first:last])
+            np.save(os.path.join(temporary, 'ids.npy'), chunk.ids[first:last])
+            try:
+                os.rename(temporary, directory)
+            except OSError:  # Another process stored the day first
+                for name in os.listdir(temporary):
+                    os.remove(os.path.join(temporary, name))
+                os.rmdir(temporary)
+        day_start += DAY_SECONDS
@@ -0,0 +1,156 @@
+from concurrent.futures import Executor
+
+import numpy as np
+
+from classes.trajectory_buffer import TrajectoryBuffer, trajectory_arrays
+from classes.vessel_log import VesselLog
+from error_metrics.comp_ratio import comp_ratio
+from error_metrics.newped import latlon_to_ecef, ped_distances
+from error_metrics.newsed import sed_distances
+
+
+class RouteEvaluator:
+    """A raw route prepared for scoring simplified trajectories of it.
+
+    The coordinates, timestamps and ECEF vectors of the raw route are computed once, so scoring the trajectories
+    of several algorithms doesn't convert the raw route again for every one of them. The app keeps one per route,
+    shared by the running metrics of every algorithm, and update() only prepares the points appended since.
+    Scores are the same as those of newped.ped_single_route_vectorized() and newsed.sed_single_route_vectorized().
+    """
+
+    def __init__(self, raw_route: TrajectoryBuffer | list[VesselLog] | None = None):
+        self.count = 0  # Number of raw points prepared
+        self._latlon = np.empty((0, 2), dtype=np.float64)
+        self._times = np.empty(0, dtype=np.float64)
+        self._ecef = np.empty((0, 3), dtype=np.float64)
+        if raw_route is not None:
+            self.update(raw_route)
+
+    def update(self, raw_route: TrajectoryBuffer | list[VesselLog]):
+        """Prepare the points appended to the raw route since the last update. The raw route must only grow."""
+        if len(raw_route) <= self.count:
+            return
+        if isinstance(raw_route, TrajectoryBuffer):
+            latlon, times = raw_route.latlon[self.count :], raw_route.timestamps[self.count :]
+        else:
+            latlon, times = trajectory_arrays(raw_route[self.count :])
+        count = self.count + len(times)
+        if count > len(self._times):
+            # Doubling the capacity keeps updates amortized in the number of new points
+            capacity = max(count, 2 * len(self._times))
+            # Timestamps are kept as float64, whether they come from logs (float) or from a TrajectoryBuffer (int)
+            for name in ("_latlon", "_times", "_ecef"):
+                old = getattr(self, name)
+                new = np.empty((capacity, *old.shape[1:]), dtype=np.float64)
+                new[: self.count] = old[: self.count]
+                setattr(self, name, new)
+        self._latlon[self.count : count] = latlon
+        self._times[self.count : count] = times
+        self._ecef[self.count : count] = latlon_to_ecef(latlon[:, 0], latlon[:, 1])
+        self.count = count
+
+    @property
+    def latlon(self) -> np.ndarray:
+        """(N, 2) coordinates of the raw route, like trajectory_arrays() gives them."""
+        return self._latlon[: self.count]
+
+    @property
+    def times(self) -> np.ndarray:
+        """(N,) timestamps of the raw route, like trajectory_arrays() gives them."""
+        return self._times[: self.count]
+
+    @property
+    def ecef(self) -> np.ndarray:
+        """(N, 3) ECEF vectors of the raw route."""
+        return self._ecef[: self.count]
+
+    def __len__(self):
+        return self.count
+
+    def score(
+        self, simplified_route: TrajectoryBuffer | list[VesselLog]
+    ) -> tuple[tuple[float, float, int], tuple[float, float, int]]:
+        """Compute the PED and the SED of a simplified trajectory of the raw route in one pass.
+
+        Returns:
+            ((mean PED, max PED, number of raw points), (mean SED, max SED, number of raw points))
+        """
+        if len(self) == 0 or len(simplified_route) == 0:
+            return (0.0, 0.0, 0), (0.0, 0.0, 0)
+
+        simp_latlon, simp_times = trajectory_arrays(simplified_route)
+        simp_ecef = latlon_to_ecef(simp_latlon[:, 0], simp_latlon[:, 1])
+
+        ped = ped_distances(self.ecef, self.times, simp_latlon, simp_ecef, simp_times)
+        if len(ped) == 0:
+            ped_score = (0.0, 0.0, 0)
+        else:
+            ped_score = (float(np.mean(ped)), float(np.max(ped)), len(ped))
+
+        sed = sed_distances(self.ecef, self.times, simp_ecef, simp_times)
+        return ped_score, (np.mean(sed), np.max(sed), len(sed))
+
+
+def score_route(
+    raw_route: TrajectoryBuffer | list[VesselLog], simplified_routes: list[TrajectoryBuffer | list[VesselLog]]
+) -> list[tuple[tuple[float, float, int], tuple[float, float, int]]]:
+    """Prepare a raw route and score every given simplified route of it, see RouteEvaluator.score()."""
+    evaluator = RouteEvaluator(raw_route)
+    return [evaluator.score(simplified_route) for simplified_route in simplified_routes]
+
+
+def combine_route_scores(scores: list[tuple[float, float, int]]) -> tuple[float, float]:
+    """Combine the (mean, max, count) scores of several routes into the average and maximum over all of their raw points,
+    rounded like ped_results() and sed_results() do."""
+    # If no results were computed, return zeros, happens if no matching routes or all empty
+    if not scores:
+        return 0.0, 0.0
+
+    total_distance = sum(avg * count for avg, _, count in scores)
+    total_points = sum(count for _, _, count in scores)
+    max_distance = max(max_d for _, max_d, _ in scores)
+
+    avg_distance = total_distance / total_points if total_points > 0 else 0
+    return round(avg_distance, 2), round(max_distance, 2)
+
+
+def evaluate_error_metrics(
+    raw_routes: dict[int, TrajectoryBuffer | list[VesselLog]],
+    simplified_routes: dict[str, dict[int, TrajectoryBuffer | list[VesselLog]]],
+    executor: Executor | None = None,
+) -> dict[str, list[float]]:
+    """Score the simplified routes of any number of algorithms against the raw routes, preparing each raw route only once.
+    The simplified routes are given per algorithm name, each with the same keys as the raw routes.
+    executor: optional, the raw routes are scored on it in parallel, see parallel.map_routes().
+
+    Returns:
+        for each algorithm name, [ped_avg, ped_max, sed_avg, sed_max, comp_ratio], the same as
+        ped_results(), sed_results() and comp_ratio_results() give for its simplified routes.
+    """
+    names = list(simplified_routes)
+    # The simplified routes of every algorithm, per raw route
+    route_simplifications = [[simplified_routes[name].get(key, []) for name in names] for key in raw_routes]
+    mapper = map if executor is None else executor.map
+    route_scores = list(mapper(score_route, raw_routes.values(), route_simplifications))
+
+    ped_scores = {name: [] for name in names}
+    sed_scores = {name: [] for name in names}
+    simplified_points = {name: 0 for name in names}
+    raw_points = 0
+    # Combined in the order of the routes, so the results don't depend on the executor
+    for raw_route, simplifications, scores in zip(raw_routes.values(), route_simplifications, route_scores):
+        raw_points += len(raw_route)
+        for name, simplified_route, (ped_score, sed_score) in zip(names, simplifications, scores):
+            if ped_score[2] > 0:  # ignore empty/invalid routes, like ped_results()
+                ped_scores[name].append(ped_score)
+            sed_scores[name].append(sed_score)
+            simplified_points[name] += len(simplified_route)
+
+    return {
+        name: [
+            *combine_route_scores(ped_scores[name]),
+            *combine_route_scores(sed_scores[name]),
+            comp_ratio(raw_points, simplified_points[name]),
+        ]
+        for name in names
+    }
@@ -1,43 +1,49 @@
+from concurrent.futures import Executor
 from typing import Tuple
 import numpy as np
 from algorithms.great_circle_math import great_circle_distance, point_to_great_circle
+from classes.trajectory_buffer import TrajectoryBuffer, trajectory_arrays
 from classes.vessel_log import VesselLog
+from error_metrics.parallel import map_routes
 
 import numpy as np
 
 EARTH_RADIUS_M = 6371000  # mean Earth radius in meters
 
-def latlon_to_ecef(lat_deg: float, lon_deg: float):
-    """Convert lat/lon in degrees to ECEF (x,y,z)."""
+def latlon_to_ecef(lat_deg, lon_deg):
+    """Convert lat/lon in degrees to ECEF (x,y,z). Also takes arrays, giving an (N, 3) array."""
     lat = np.radians(lat_deg)
     lon = np.radians(lon_deg)
     x = EARTH_RADIUS_M * np.cos(lat) * np.cos(lon)
     y = EARTH_RADIUS_M * np.cos(lat) * np.sin(lon)
     z = EARTH_RADIUS_M * np.sin(lat)
-    return np.array([x, y, z])
+    return np.stack([x, y, z], axis=-1)
 
 def euclidean_point_to_point(p1_latlon, p2_latlon):
-    P1 = latlon_to_ecef(p1_latlon[0], p1_latlon[1])
-    P2 = latlon_to_ecef(p2_latlon[0], p2_latlon[1])
-    return np.linalg.norm(P1 - P2)
+    """Chord distance between points, or between the rows of (N, 2) arrays of points."""
+    P1 = latlon_to_ecef(p1_latlon[..., 0], p1_latlon[..., 1])
+    P2 = latlon_to_ecef(p2_latlon[..., 0], p2_latlon[..., 1])
+    return np.linalg.norm(P1 - P2, axis=-1)
 
 def euclidean_point_to_segment(A_latlon, B_latlon, P_latlon):
-    A = latlon_to_ecef(A_latlon[0], A_latlon[1])
-    B = latlon_to_ecef(B_latlon[0], B_latlon[1])
-    P = latlon_to_ecef(P_latlon[0], P_latlon[1])
-
+    """Chord distance from points to segments, or from the rows of (N, 2) arrays of points to the corresponding segments."""
+    A = latlon_to_ecef(A_latlon[..., 0], A_latlon[..., 1])
+    B = latlon_to_ecef(B_latlon[..., 0], B_latlon[..., 1])
+    P = latlon_to_ecef(P_latlon[..., 0], P_latlon[..., 1])
+    return ecef_point_to_segment(A, B, P)
+
+def ecef_point_to_segment(A, B, P):
+    """Like euclidean_point_to_segment(), for points already converted to ECEF."""
     AB = B - A
     AP = P - A
 
-    denom = np.dot(AB, AB)
-    if denom == 0:
-        return np.linalg.norm(P - A)  # A and B identical
-
-    t = np.dot(AP, AB) / denom
+    denom = np.sum(AB * AB, axis=-1)
+    # Where A and B are identical, t stays 0 so the distance is to A
+    t = np.divide(np.sum(AP * AB, axis=-1), denom, out=np.zeros_like(denom), where=denom != 0)
     t = np.clip(t, 0, 1)
 
-    closest = A + t * AB
-    return np.linalg.norm(P - closest)
+    closest = A + t[..., np.newaxis] * AB
+    return np.linalg.norm(P - closest, axis=-1)
 
 
 def find_nearest_simplified_idx_vectorized(
@@ -65,7 +71,9 @@ def find_nearest_simplified_idx_vectorized(
 
 
 def ped_single_route_vectorized(
-    raw_route: list[VesselLog], simplified_route: list[VesselLog], math: dict
+    raw_route: TrajectoryBuffer | list[VesselLog],
+    simplified_route: TrajectoryBuffer | list[VesselLog],
+    math: dict,
 ) -> tuple[float, float, int]:
     """PED: for each raw point, find the simplified point
     with the closest previous timestamp and compute the point to great-circle distance.
@@ -78,12 +86,9 @@ def ped_single_route_vectorized(
     if len(raw_route) == 0 or len(simplified_route) == 0:
         return 0.0, 0.0, 0
 
-    # Convert coords + times to arrays
-    raw_latlon = np.array([p.get_coords() for p in raw_route])
-    simp_latlon = np.array([p.get_coords() for p in simplified_route])
-
-    raw_times = np.array([p.ts.timestamp() for p in raw_route])
-    simp_times = np.array([p.ts.timestamp() for p in simplified_route])
+    # Get coords + times as arrays, TrajectoryBuffers already hold them
+    raw_latlon, raw_times = trajectory_arrays(raw_route)
+    simp_latlon, simp_times = trajectory_arrays(simplified_route)
 
     n_raw = len(raw_latlon)
     n_simp = len(simp_latlon)
@@ -91,71 +96,75 @@ def ped_single_route_vectorized(
     if n_raw == 0 or n_simp == 0:
         return 0.0, 0.0, 0
 
-    # Case: only one simplified point -> PED is point-to-point distance
-    if n_simp == 1:
-        distances = np.array(
-            [
-                euclidean_point_to_point(simp_latlon[0], raw_latlon[i])
-                for i in range(n_raw)
-            ]
-        )
-        if len(distances) == 0:
-            return 0.0, 0.0, 0
-        return float(np.mean(distances)), float(np.max(distances)), len(distances)
+    distances = ped_distances(
+        latlon_to_ecef(raw_latlon[:, 0], raw_latlon[:, 1]),
+        raw_times,
+        simp_latlon,
+        latlon_to_ecef(simp_latlon[:, 0], simp_latlon[:, 1]),
+        simp_times,
+    )
 
-    # Find nearest simplified time index for each raw point, finds the preceding point
-    left_idx, rigth_idx = find_nearest_simplified_idx_vectorized(raw_times, simp_times)
+    if len(distances) == 0:
+        return 0.0, 0.0, 0
 
-    # Collect matched simplified coords
-    left_points = simp_latlon[left_idx]
-    right_points = simp_latlon[rigth_idx]
+    return float(np.mean(distances)), float(np.max(distances)), len(distances)
 
-    # Compute distances vectorized
-    distances = []
-    for i in range(n_raw):
-        A = left_points[i]
-        B = right_points[i]
-        P = raw_latlon[i]
 
-        # Handle segment where (A == B)
-        if np.allclose(A, B):
-            d = euclidean_point_to_point(A, P)
-        else:
-            d = euclidean_point_to_segment(A, B, P)
+def ped_distances(
+    raw_ecef: np.ndarray,
+    raw_times: np.ndarray,
+    simp_latlon: np.ndarray,
+    simp_ecef: np.ndarray,
+    simp_times: np.ndarray,
+) -> np.ndarray:
+    """PED of every raw point, for routes already converted to ECEF. Gives the same distances as ped_single_route_vectorized(),
+    leaving out the invalid ones."""
 
-        if not np.isnan(d) and d >= 0:
-            distances.append(d)
+    # Case: only one simplified point -> PED is point-to-point distance
+    if len(simp_ecef) == 1:
+        return np.linalg.norm(simp_ecef[0] - raw_ecef, axis=-1)
 
-    if not distances:
-        return 0.0, 0.0, 0
+    # Find nearest simplified time index for each raw point, finds the preceding point
+    left_idx, rigth_idx = find_nearest_simplified_idx_vectorized(raw_times, simp_times)
 
-    distances = np.array(distances)
-    return float(np.mean(distances)), float(np.max(distances)), len(distances)
+    # Compute all distances at once, segments where (A == B) use the point to point distance
+    same = np.all(np.isclose(simp_latlon[left_idx], simp_latlon[rigth_idx]), axis=1)
+    left_points = simp_ecef[left_idx]
+    right_points = simp_ecef[rigth_idx]
+    distances = np.where(
+        same,
+        np.linalg.norm(left_points - raw_ecef, axis=-1),
+        ecef_point_to_segment(left_points, right_points, raw_ecef),
+    )
+    return distances[~np.isnan(distances) & (distances >= 0)]
 
 
 def ped_results(
-    raw_data_routes: dict[int, list[VesselLog]],
-    simplified_routes: dict[int, list[VesselLog]],
+    raw_data_routes: dict[int, TrajectoryBuffer | list[VesselLog]],
+    simplified_routes: dict[int, TrajectoryBuffer | list[VesselLog]],
     math: dict,
+    executor: Executor | None = None,
 ) -> tuple[float, float]:
     """Calculate the average Point to segment Euclidean distance between two trajectories and the maximum Point to segment Euclidean distance between two trajectories.
 
+    executor: optional, the routes are scored on it in parallel, see parallel.map_routes().
+
     Returns:
         tuple of floats: The average PED between the two trajectories and the max distance.
     """
 
     # Calculate PED for each (raw route, simplified route) pair
     # NOTE that raw_data_routes and simplified_routes will always have the same keys
-    results = []
-    for key in raw_data_routes:
-        raw_route = raw_data_routes[key]
-        # If simplified route is missing, use empty list
-        simp_route = simplified_routes.get(key, [])
-
-        avg_d, max_d, count = ped_single_route_vectorized(raw_route, simp_route, math)
-
-        if count > 0:  # ignore empty/invalid routes
-            results.append((avg_d, max_d, count))
+    # If simplified route is missing, use empty list
+    scores = map_routes(
+        executor,
+        ped_single_route_vectorized,
+        list(raw_data_routes.values()),
+        [simplified_routes.get(key, []) for key in raw_data_routes],
+        math,
+    )
+    # ignore empty/invalid routes
+    results = [(avg_d, max_d, count) for avg_d, max_d, count in scores if count > 0]
 
     # If no results were computed, return zeros, happens if no matching routes or all empty
     if not results:
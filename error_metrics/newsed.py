@@ -1,35 +1,52 @@
+from concurrent.futures import Executor
+
 import numpy as np
 
+from classes.trajectory_buffer import TrajectoryBuffer, trajectory_arrays
 from classes.vessel_log import VesselLog
+from error_metrics.parallel import map_routes
 
 EARTH_RADIUS_M = 6371000
 
 def latlon_to_ecef(lat_deg, lon_deg):
+    """Convert lat/lon in degrees to ECEF (x,y,z). Also takes arrays, giving an (N, 3) array."""
     lat = np.radians(lat_deg)
     lon = np.radians(lon_deg)
     x = EARTH_RADIUS_M * np.cos(lat) * np.cos(lon)
     y = EARTH_RADIUS_M * np.cos(lat) * np.sin(lon)
     z = EARTH_RADIUS_M * np.sin(lat)
-    return np.array([x, y, z])
+    return np.stack([x, y, z], axis=-1)
 
 def euclidean_point_to_point(P1_latlon, P2_latlon):
-    P1 = latlon_to_ecef(P1_latlon[0], P1_latlon[1])
-    P2 = latlon_to_ecef(P2_latlon[0], P2_latlon[1])
-    return np.linalg.norm(P1 - P2)
+    """Chord distance between points, or between the rows of (N, 2) arrays of points."""
+    P1 = latlon_to_ecef(P1_latlon[..., 0], P1_latlon[..., 1])
+    P2 = latlon_to_ecef(P2_latlon[..., 0], P2_latlon[..., 1])
+    return np.linalg.norm(P1 - P2, axis=-1)
 
 def interpolate_euclidean(A_latlon, B_latlon, alpha):
-    A = latlon_to_ecef(A_latlon[0], A_latlon[1])
-    B = latlon_to_ecef(B_latlon[0], B_latlon[1])
-
-    P = A + alpha * (B - A)  # linear interp in 3D
+    """Interpolate between points, or between the rows of (N, 2) arrays of points with an (N,) array of alphas."""
+    A = latlon_to_ecef(A_latlon[..., 0], A_latlon[..., 1])
+    B = latlon_to_ecef(B_latlon[..., 0], B_latlon[..., 1])
+    P = A + np.asarray(alpha)[..., np.newaxis] * (B - A)  # linear interp in 3D
 
     # convert back to lat/lon
-    x, y, z = P
+    x, y, z = P[..., 0], P[..., 1], P[..., 2]
     lat = np.degrees(np.arctan2(z, np.sqrt(x*x + y*y)))
     lon = np.degrees(np.arctan2(y, x))
-    return np.array([lat, lon])
+    return np.stack([lat, lon], axis=-1)
+
+def interpolate_ecef(A, B, alpha):
+    """Like interpolate_euclidean(), for points already in ECEF, giving the interpolated points in ECEF.
+    The point between A and B is projected onto the sphere, which is where converting it to lat/lon and back puts it."""
+    P = A + np.asarray(alpha)[..., np.newaxis] * (B - A)  # linear interp in 3D
+    return P * (EARTH_RADIUS_M / np.linalg.norm(P, axis=-1))[..., np.newaxis]
 
 def interpolate_simplified_points_vectorized(raw_times, simp_times, simp_latlon):
+    idx, alpha = segment_alphas(raw_times, simp_times)
+    return interpolate_euclidean(simp_latlon[idx], simp_latlon[idx + 1], alpha)
+
+def segment_alphas(raw_times, simp_times):
+    """For each raw timestamp, the index of the simplified segment it falls in and how far along that segment it is."""
     idx = np.searchsorted(simp_times, raw_times, side="right") - 1
     idx = np.clip(idx, 0, len(simp_times) - 2)
 
@@ -43,51 +60,51 @@ def interpolate_simplified_points_vectorized(raw_times, simp_times, simp_latlon)
     alpha[valid] = (raw_times[valid] - t0[valid]) / dt[valid]
     alpha = np.clip(alpha, 0.0, 1.0)
 
-    result = np.zeros((len(raw_times), 2))
-    for i in range(len(raw_times)):
-        result[i] = interpolate_euclidean(
-            simp_latlon[idx[i]],
-            simp_latlon[idx[i] + 1],
-            alpha[i],
-        )
+    return idx, alpha
 
-    return result
+def sed_distances(raw_ecef, raw_times, simp_ecef, simp_times):
+    """SED of every raw point, for routes already converted to ECEF. Gives the same distances as sed_single_route_vectorized()."""
+    idx, alpha = segment_alphas(raw_times, simp_times)
+    interp_ecef = interpolate_ecef(simp_ecef[idx], simp_ecef[idx + 1], alpha)
+    return np.linalg.norm(interp_ecef - raw_ecef, axis=-1)
 
 def sed_single_route_vectorized(raw_route, simplified_route, math):
     if len(raw_route) == 0 or len(simplified_route) == 0:
         return 0.0, 0.0, 0
 
-    raw_latlon = np.array([p.get_coords() for p in raw_route])
-    simp_latlon = np.array([p.get_coords() for p in simplified_route])
-    raw_times = np.array([p.ts.timestamp() for p in raw_route])
-    simp_times = np.array([p.ts.timestamp() for p in simplified_route])
+    raw_latlon, raw_times = trajectory_arrays(raw_route)
+    simp_latlon, simp_times = trajectory_arrays(simplified_route)
 
-    interp_points = interpolate_simplified_points_vectorized(
-        raw_times, simp_times, simp_latlon
+    distances = sed_distances(
+        latlon_to_ecef(raw_latlon[:, 0], raw_latlon[:, 1]),
+        raw_times,
+        latlon_to_ecef(simp_latlon[:, 0], simp_latlon[:, 1]),
+        simp_times,
     )
 
-    distances = [
-        euclidean_point_to_point(interp_points[i], raw_latlon[i])
-        for i in range(len(raw_latlon))
-    ]
-
     return np.mean(distances), np.max(distances), len(distances)
 
 def sed_results(
-    raw_data_routes: dict[int, list[VesselLog]],
-    simplified_routes: dict[int, list[VesselLog]],
+    raw_data_routes: dict[int, TrajectoryBuffer | list[VesselLog]],
+    simplified_routes: dict[int, TrajectoryBuffer | list[VesselLog]],
     math: dict,
+    executor: Executor | None = None,
 ) -> tuple[float, float]:
     """Calculate the average Point to simplified point Euclidean distance between two trajectories
     and the maximum Point to simplified point Euclidean distance between two trajectories.
 
+    executor: optional, the routes are scored on it in parallel, see parallel.map_routes().
+
     Returns:
         tuple with floats: The average SED between the two trajectories and the max distance.
     """
-    results = [
-        sed_single_route_vectorized(raw_data_routes[k], simplified_routes[k], math)
-        for k in raw_data_routes
-    ]
+    results = map_routes(
+        executor,
+        sed_single_route_vectorized,
+        list(raw_data_routes.values()),
+        [simplified_routes[k] for k in raw_data_routes],
+        math,
+    )
     # If no results were computed, return zeros, happens if no matching routes or all empty
     if not results:
         return 0.0, 0.0
@@ -0,0 +1,22 @@
+from concurrent.futures import Executor
+from itertools import repeat
+from typing import Callable
+
+
+def map_routes(
+    executor: Executor | None,
+    score: Callable,
+    raw_routes: list,
+    simplified_routes: list,
+    math: dict,
+) -> list:
+    """Score every pair of a raw route and its simplified route with score(raw_route, simplified_route, math).
+
+    The pairs are independent, so with an executor they are scored in parallel: a ThreadPoolExecutor runs the
+    NumPy kernels of several routes at once, since they release the GIL, and a ProcessPoolExecutor also runs
+    the Python parts at once, at the cost of pickling the routes. Without one they are scored one after another.
+    The scores are returned in the order of the routes either way, so whatever combines them gets the same result.
+    """
+    if executor is None:
+        return [score(raw, simplified, math) for raw, simplified in zip(raw_routes, simplified_routes)]
+    return list(executor.map(score, raw_routes, simplified_routes, repeat(math)))
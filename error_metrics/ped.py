@@ -1,7 +1,10 @@
+from concurrent.futures import Executor
 from typing import Tuple
 import numpy as np
 from algorithms.great_circle_math import great_circle_distance, point_to_great_circle
+from classes.trajectory_buffer import TrajectoryBuffer, trajectory_arrays
 from classes.vessel_log import VesselLog
+from error_metrics.parallel import map_routes
 
 
 def find_nearest_simplified_idx_vectorized(
@@ -29,7 +32,9 @@ def find_nearest_simplified_idx_vectorized(
 
 
 def ped_single_route_vectorized(
-    raw_route: list[VesselLog], simplified_route: list[VesselLog], math: dict
+    raw_route: TrajectoryBuffer | list[VesselLog],
+    simplified_route: TrajectoryBuffer | list[VesselLog],
+    math: dict,
 ) -> tuple[float, float, int]:
     """PED: for each raw point, find the simplified point
     with the closest previous timestamp and compute the point to great-circle distance.
@@ -42,12 +47,9 @@ def ped_single_route_vectorized(
     if len(raw_route) == 0 or len(simplified_route) == 0:
         return 0.0, 0.0, 0
 
-    # Convert coords + times to arrays
-    raw_latlon = np.array([p.get_coords() for p in raw_route])
-    simp_latlon = np.array([p.get_coords() for p in simplified_route])
-
-    raw_times = np.array([p.ts.timestamp() for p in raw_route])
-    simp_times = np.array([p.ts.timestamp() for p in simplified_route])
+    # Get coords + times as arrays, TrajectoryBuffers already hold them
+    raw_latlon, raw_times = trajectory_arrays(raw_route)
+    simp_latlon, simp_times = trajectory_arrays(simplified_route)
 
     n_raw = len(raw_latlon)
     n_simp = len(simp_latlon)
@@ -57,11 +59,8 @@ def ped_single_route_vectorized(
 
     # Case: only one simplified point -> PED is point-to-point distance
     if n_simp == 1:
-        distances = np.array(
-            [
-                math["point_to_point_distance"](simp_latlon[0], raw_latlon[i])
-                for i in range(n_raw)
-            ]
+        distances = point_to_point_distances(
+            np.broadcast_to(simp_latlon[0], raw_latlon.shape), raw_latlon, math
         )
         if len(distances) == 0:
             return 0.0, 0.0, 0
@@ -74,52 +73,61 @@ def ped_single_route_vectorized(
     left_points = simp_latlon[left_idx]
     right_points = simp_latlon[rigth_idx]
 
-    # Compute distances vectorized
-    distances = []
-    for i in range(n_raw):
-        A = left_points[i]
-        B = right_points[i]
-        P = raw_latlon[i]
-
-        # Handle segment where (A == B)
-        if np.allclose(A, B):
-            d = math["point_to_point_distance"](A, P)
-        else:
-            d = math["point_to_line_distance"](A, B, P)
+    # Compute all distances at once, segments where (A == B) use the point to point distance
+    same = np.all(np.isclose(left_points, right_points), axis=1)
+    distances = np.empty(n_raw)
+    distances[same] = point_to_point_distances(left_points[same], raw_latlon[same], math)
+    distances[~same] = point_to_line_distances(
+        left_points[~same], right_points[~same], raw_latlon[~same], math
+    )
+    distances = distances[~np.isnan(distances) & (distances >= 0)]
 
-        if not np.isnan(d) and d >= 0:
-            distances.append(d)
-
-    if not distances:
+    if len(distances) == 0:
         return 0.0, 0.0, 0
 
-    distances = np.array(distances)
     return float(np.mean(distances)), float(np.max(distances)), len(distances)
 
 
+def point_to_point_distances(A: np.ndarray, B: np.ndarray, math: dict) -> np.ndarray:
+    """Distances between the points of two (N, 2) arrays, with the batch function of the math if it has one."""
+    if "point_to_point_distance_batch" in math:
+        return math["point_to_point_distance_batch"](A, B)
+    return np.array([math["point_to_point_distance"](a, b) for a, b in zip(A, B)], dtype=np.float64)
+
+
+def point_to_line_distances(A: np.ndarray, B: np.ndarray, P: np.ndarray, math: dict) -> np.ndarray:
+    """Distances from the points of P to the lines through the points of A and B, with the batch function of the math if it has one."""
+    if "point_to_line_distance_batch" in math:
+        return math["point_to_line_distance_batch"](A, B, P)
+    return np.array([math["point_to_line_distance"](a, b, p) for a, b, p in zip(A, B, P)], dtype=np.float64)
+
+
 def ped_results(
     raw_data_routes: dict[int, list[VesselLog]],
     simplified_routes: dict[int, list[VesselLog]],
     math: dict,
+    executor: Executor | None = None,
 ) -> tuple[float, float]:
     """Calculate the average Point to segment Euclidean distance between two trajectories and the maximum Point to segment Euclidean distance between two trajectories.
 
+    executor: optional, the routes are scored on it in parallel, see parallel.map_routes().
+
     Returns:
         tuple of floats: The average PED between the two trajectories and the max distance.
     """
 
     # Calculate PED for each (raw route, simplified route) pair
     # NOTE that raw_data_routes and simplified_routes will always have the same keys
-    results = []
-    for key in raw_data_routes:
-        raw_route = raw_data_routes[key]
-        # If simplified route is missing, use empty list
-        simp_route = simplified_routes.get(key, [])
-
-        avg_d, max_d, count = ped_single_route_vectorized(raw_route, simp_route, math)
-
-        if count > 0:  # ignore empty/invalid routes
-            results.append((avg_d, max_d, count))
+    # If simplified route is missing, use empty list
+    scores = map_routes(
+        executor,
+        ped_single_route_vectorized,
+        list(raw_data_routes.values()),
+        [simplified_routes.get(key, []) for key in raw_data_routes],
+        math,
+    )
+    # ignore empty/invalid routes
+    results = [(avg_d, max_d, count) for avg_d, max_d, count in scores if count > 0]
 
     # If no results were computed, return zeros, happens if no matching routes or all empty
     if not results:
@@ -1,4 +1,4 @@
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import Executor, ProcessPoolExecutor
 import numpy as np
 from algorithms.great_circle_math import (
     get_final_bearing,
@@ -6,7 +6,10 @@ from algorithms.great_circle_math import (
     predict_sphere_movement,
 )
 from classes.route import Route
+from classes.trajectory_buffer import TrajectoryBuffer, trajectory_arrays
 from classes.vessel_log import VesselLog
+from error_metrics.parallel import map_routes
+from error_metrics.ped import point_to_point_distances
 
 
 def slerp(
@@ -41,6 +44,13 @@ def slerp(
     return math["predict_sphere_movement"](A, distance, bearing)
 
 
+def slerp_points(A: np.ndarray, B: np.ndarray, alpha: np.ndarray, math: dict) -> np.ndarray:
+    """Interpolate between the points of two (N, 2) arrays, with the batch function of the math if it has one."""
+    if "interpolate_batch" in math:
+        return math["interpolate_batch"](A, B, alpha)
+    return np.array([slerp(a, b, t, math) for a, b, t in zip(A, B, alpha)], dtype=np.float64).reshape(-1, 2)
+
+
 def interpolate_simplified_points_vectorized(raw_times, simp_times, simp_latlon, math):
     """For each raw timestamp, return the spherical interpolated point
     on the simplified trajectory at that timestamp.
@@ -71,22 +81,20 @@ def interpolate_simplified_points_vectorized(raw_times, simp_times, simp_latlon,
     # Clip to [0,1]
     alpha = np.clip(alpha, 0.0, 1.0)
 
-    # Allocate result
-    result = np.zeros((len(raw_times), 2))
+    # Clamp latitudes to the poles
+    simp_latlon = simp_latlon.copy()
+    simp_latlon[:, 0] = np.clip(simp_latlon[:, 0], -np.pi / 2, np.pi / 2)
 
-    # Interpolate each point with SLERP
-    for i in range(len(raw_times)):
-        p0 = simp_latlon[idx[i]]
-        p1 = simp_latlon[idx[i] + 1]
-        p0[0] = np.clip(p0[0], -np.pi / 2, np.pi / 2)
-        p1[0] = np.clip(p1[0], -np.pi / 2, np.pi / 2)
-        result[i] = slerp(p0, p1, alpha[i], math)
+    # Interpolate all points at once with SLERP
+    result = slerp_points(simp_latlon[idx], simp_latlon[idx + 1], alpha, math)
 
     return result
 
 
 def sed_single_route_vectorized(
-    raw_route: list[VesselLog], simplified_route: list[VesselLog], math: dict
+    raw_route: TrajectoryBuffer | list[VesselLog],
+    simplified_route: TrajectoryBuffer | list[VesselLog],
+    math: dict,
 ) -> tuple[float, float, int]:
     """Compute SED for a single route (vectorized).
     Using vectorized simplified point lookup and great-circle distance computation.
@@ -96,29 +104,17 @@ def sed_single_route_vectorized(
     if len(raw_route) == 0 or len(simplified_route) == 0:
         return 0.0, 0.0, 0
 
-    # Convert to numpy arrays for vectorized operations
-    raw_latlon = np.array([p.get_coords() for p in raw_route])
-    simplified_latlon = np.array([p.get_coords() for p in simplified_route])
-    raw_times = np.array([p.ts.timestamp() for p in raw_route])
-    simplified_times = np.array([p.ts.timestamp() for p in simplified_route])
+    # Get coords + times as arrays, TrajectoryBuffers already hold them
+    raw_latlon, raw_times = trajectory_arrays(raw_route)
+    simplified_latlon, simplified_times = trajectory_arrays(simplified_route)
 
     # Gets an array of simplified point indices for each raw point
     interp_points = interpolate_simplified_points_vectorized(
         raw_times, simplified_times, simplified_latlon, math
     )
 
-    # Compute distances using great_circle_distance
-    distances = []
-    for i in range(len(raw_latlon)):
-        distance = math["point_to_point_distance"](interp_points[i], raw_latlon[i])
-        distances.append(distance)
-
-    # distances = np.array(
-    #    [
-    #        math["point_to_point_distance"](interp_points[i], raw_latlon[i])
-    #        for i in range(len(raw_latlon))
-    #    ]
-    # )
+    # Compute all distances at once
+    distances = point_to_point_distances(interp_points, raw_latlon, math)
 
     return np.mean(distances), np.max(distances), len(distances)
 
@@ -127,17 +123,23 @@ def sed_results(
     raw_data_routes: dict[int, list[VesselLog]],
     simplified_routes: dict[int, list[VesselLog]],
     math: dict,
+    executor: Executor | None = None,
 ) -> tuple[float, float]:
     """Calculate the average Point to simplified point Euclidean distance between two trajectories
     and the maximum Point to simplified point Euclidean distance between two trajectories.
 
+    executor: optional, the routes are scored on it in parallel, see parallel.map_routes().
+
     Returns:
         tuple with floats: The average SED between the two trajectories and the max distance.
     """
-    results = [
-        sed_single_route_vectorized(raw_data_routes[k], simplified_routes[k], math)
-        for k in raw_data_routes
-    ]
+    results = map_routes(
+        executor,
+        sed_single_route_vectorized,
+        list(raw_data_routes.values()),
+        [simplified_routes[k] for k in raw_data_routes],
+        math,
+    )
     # If no results were computed, return zeros, happens if no matching routes or all empty
     if not results:
         return 0.0, 0.0
@@ -1,21 +1,23 @@
 import datetime
+import math
 import os
 
 from sqlalchemy import text
 
-from algorithms.isolate_routes import isolate_trajectories, is_vessel_static
-from classes.vessel_log import VesselLog
+from algorithms.isolate_routes import isolate_trajectory_bounds, is_static_latlon
+from classes.trajectory_buffer import TrajectoryBuffer
+from classes.vessel_log import CompactVesselLog, VesselLog, from_epoch
 import json
+import numpy as np
 from dateutil import parser
 
-from data.database import get_vessel_logs, open_connection
+from data.database import get_vessel_log_arrays, open_connection
 
 
 def download_trajectories_from_db(
     num_trajectories: int, data_directory: str, min_points: int, max_points: int
 ):
     print("Finding vessel IMOs with sufficient data points...")
-    conn = open_connection()
     statement = text(
         "SELECT imo, COUNT(*) as log_count "
         "FROM vessel_logs "
@@ -24,12 +26,13 @@ def download_trajectories_from_db(
         "HAVING COUNT(*) BETWEEN 20000 AND 500000 "
         "ORDER BY log_count ASC"
     )
-    result = conn.execute(statement)
+    with open_connection() as conn:
+        result = conn.execute(statement)
 
-    """
-    We get all vessel IMOs that have log counts between min_points and max_points.
-    """
-    vessel_imos = [imo for imo, log_count in result.fetchall()]
+        """
+        We get all vessel IMOs that have log counts between min_points and max_points.
+        """
+        vessel_imos = [imo for imo, log_count in result.fetchall()]
 
     print(f"Found {len(vessel_imos)} vessel IMOs with sufficient data points.")
 
@@ -40,33 +43,36 @@ def download_trajectories_from_db(
         if num_of_saved_trajectories == num_trajectories:
             break
 
-        """Download vessel logs for the given IMO"""
-        vessel_logs = get_vessel_logs(
+        """Download vessel logs for the given IMO as arrays, so vessels with invalid positions are skipped before any log is created"""
+        vessel_logs = get_vessel_log_arrays(
             imo=imo,
             start_ts=datetime.datetime(2024, 1, 1),
             end_ts=datetime.datetime(2024, 1, 31),
-        )
+        ).get(imo)
+        if vessel_logs is None:
+            continue
 
-        valid = True
-        for log in vessel_logs:
-            if not (-90 <= log.lat <= 90 and -180 <= log.lon <= 180):
-                valid = False
-                break
-        if not valid:
+        # Compare in radians, converting the bounds the same way as the coordinates so the bounds themselves are valid
+        latlon = vessel_logs.latlon
+        if not (
+            np.all(np.abs(latlon[:, 0]) <= np.radians(90))
+            and np.all(np.abs(latlon[:, 1]) <= np.radians(180))
+        ):
             continue
 
         """
-        Split vessel logs into isolated trajectories
+        Split vessel logs into isolated trajectories on the arrays, so only the saved trajectories are written row by row
         T = isolated trajectory
         """
-        for T in isolate_trajectories(vessel_logs):
-            if min_points <= len(T) <= max_points and not is_vessel_static(T):
+        for start, end in isolate_trajectory_bounds(vessel_logs.timestamps):
+            T = vessel_logs.take(np.arange(start, end))
+            if min_points <= len(T) <= max_points and not is_static_latlon(T.latlon):
                 """Save trajectory to file"""
                 data_file_name = (
-                    f"imo_{T[0].imo}_start_{T[0].ts.date()}_end_{T[-1].ts.date()}.json"
+                    f"imo_{imo}_start_{from_epoch(int(T.time(0))).date()}_end_{from_epoch(int(T.time(-1))).date()}.json"
                 )
-                write_trajectory_to_json(
-                    T, os.path.join(data_directory, data_file_name)
+                write_trajectory_arrays_to_json(
+                    imo, T, os.path.join(data_directory, data_file_name)
                 )
                 """Increment number of saved trajectories and check if we reached the limit"""
                 num_of_saved_trajectories += 1
@@ -97,11 +103,32 @@ def write_trajectory_to_json(trajectory: list[VesselLog], filepath: str):
         )
 
 
-def read_trajectory_from_json(filepath: str) -> list[VesselLog]:
+def write_trajectory_arrays_to_json(imo: int, trajectory: TrajectoryBuffer, filepath: str):
+    """Write a trajectory in the same format as write_trajectory_to_json(), straight from the arrays of the buffer."""
+    with open(filepath, "w+") as json_file:
+        json.dump(
+            [
+                {
+                    "imo": imo,
+                    "ts": from_epoch(epoch).isoformat(),
+                    "lat": math.degrees(lat),
+                    "lon": math.degrees(lon),
+                    "id": id,
+                }
+                for (lat, lon), epoch, id in zip(
+                    trajectory.latlon.tolist(), trajectory.timestamps.tolist(), trajectory.ids.tolist()
+                )
+            ],
+            json_file,
+            indent=4,
+        )
+
+
+def read_trajectory_from_json(filepath: str) -> list[CompactVesselLog]:
     with open(filepath, "r") as json_file:
         data = json.load(json_file)
     return [
-        VesselLog(
+        CompactVesselLog(
             imo=log["imo"],
             ts=parser.isoparse(log["ts"]),
             lat=log["lat"],
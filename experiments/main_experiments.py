@@ -15,7 +15,11 @@ from algorithms.great_circle_math import (
     get_final_bearing,
     predict_sphere_movement,
     point_to_great_circle,
+    point_to_great_circle_batch,
+    great_circle_distance_batch,
+    slerp_batch,
 )
+from algorithms import numba_math
 from algorithms.ellipsoid_math import (
     point_to_geodesic,
     geodesic_final_bearing,
@@ -23,8 +27,7 @@ from algorithms.ellipsoid_math import (
     geodesic_length,
 )
 from error_metrics.comp_ratio import comp_ratio
-from error_metrics.newped import ped_single_route_vectorized as ped
-from error_metrics.newsed import sed_single_route_vectorized as sed
+from error_metrics.evaluator import RouteEvaluator
 from experiments.experiment_data import read_trajectory_from_json
 
 if __name__ == "__main__":
@@ -35,7 +38,7 @@ if __name__ == "__main__":
     arg_parser.add_argument(
         "--params", required=True, type=str
     )  # Should be string to be parsed as dict
-    arg_parser.add_argument("--math", required=True, type=str)  # := circle | ellipsoid
+    arg_parser.add_argument("--math", required=True, type=str)  # := circle | numba | ellipsoid
 
     args = arg_parser.parse_args()
 
@@ -50,6 +53,16 @@ if __name__ == "__main__":
             "predict_sphere_movement": predict_sphere_movement,
             "get_final_bearing": get_final_bearing,
             "point_to_line_distance": point_to_great_circle,
+            "point_to_line_distance_batch": point_to_great_circle_batch,
+            "point_to_point_distance_batch": great_circle_distance_batch,
+            "interpolate_batch": slerp_batch,
+        }
+    elif math == "numba":  # compiled versions of the circle math
+        math_args = {
+            "point_to_point_distance": numba_math.great_circle_distance,
+            "predict_sphere_movement": numba_math.predict_sphere_movement,
+            "get_final_bearing": numba_math.get_final_bearing,
+            "point_to_line_distance": numba_math.point_to_great_circle,
         }
     else:  # ellipsoid
         math_args = {
@@ -84,8 +97,7 @@ if __name__ == "__main__":
     end_time = time.time()
     run_time = end_time - start_time
     run_time_pr_point = len(trajectory) / run_time
-    ped_avg, _, _ = ped(trajectory, simplifier.trajectory, math_args)
-    sed_avg, _, _ = sed(trajectory, simplifier.trajectory, math_args)
+    (ped_avg, _, _), (sed_avg, _, _) = RouteEvaluator(trajectory).score(simplifier.trajectory)
     compression_ratio = comp_ratio(len(trajectory), len(simplifier.trajectory))
 
     print(
@@ -1,3 +1,24 @@
+// The version of the last response, and the routes we hold for each trajectory name, by route id.
+// The server only sends what changed since the version we send back, keeping a baseline per client ID.
+const client_id = Math.random().toString(36).slice(2);
+let response_version = null;
+let held_routes = {};
+
+function apply_changes(name, entries) {
+    const previous = held_routes[name] || {};
+    const routes = {};
+    for (const entry of entries) {
+        const points = entry.reset ? [] : (previous[entry.route] || []);
+        for (const change of entry.changes) {
+            if (typeof change === "number") points.splice(change, 1); // remove point at index
+            else points.push(change); // append point
+        }
+        routes[entry.route] = points;
+    }
+    held_routes[name] = routes; // routes that aren't in the response are dropped
+    return Object.values(routes);
+}
+
 function algorithm_request(callback = null) {
     const algorithms = get_enabled_algorithms();
     const start_date = get_start_date();
@@ -7,7 +28,10 @@ function algorithm_request(callback = null) {
 
     if (algorithms.length < 1) return;
     
-    request("algorithm", {algorithms: algorithms, start_date: start_date, end_date: end_date, params: params}, (data) => {
+    request("algorithm", {algorithms: algorithms, start_date: start_date, end_date: end_date, params: params, version: response_version, client: client_id}, (data) => {
+        if (data.full) held_routes = {};
+        response_version = data.version;
+
         create_table({
             DP: data.DP_error_metrics,
             DR: data.DR_error_metrics,
@@ -19,13 +43,13 @@ function algorithm_request(callback = null) {
 
         console.log(data)
         clear_map();
-        plot_to_map(data.raw, "blue");
-        plot_to_map(data.DP, "red");
-        plot_to_map(data.DR, "yellow");
-        plot_to_map(data.SQUISH, "green");
-        plot_to_map(data.SQUISH_E, "cyan")
-        plot_to_map(data.UNIFORM_SAMPLING, "orange")
-        plot_to_map(data.SQUISH_RECKONING, 'magenta')
+        plot_to_map(apply_changes("raw", data.raw), "blue");
+        plot_to_map(apply_changes("DP", data.DP), "red");
+        plot_to_map(apply_changes("DR", data.DR), "yellow");
+        plot_to_map(apply_changes("SQUISH", data.SQUISH), "green");
+        plot_to_map(apply_changes("SQUISH_E", data.SQUISH_E), "cyan")
+        plot_to_map(apply_changes("UNIFORM_SAMPLING", data.UNIFORM_SAMPLING), "orange")
+        plot_to_map(apply_changes("SQUISH_RECKONING", data.SQUISH_RECKONING), 'magenta')
 
 
         if (callback && callback instanceof Function) callback();
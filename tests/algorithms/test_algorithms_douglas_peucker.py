@@ -4,6 +4,7 @@ from classes.route import Route
 from tests.algorithms.routes_basic_assertions import BasicAssertions
 from tests.test_mock_vessel_logs import mock_vessel_logs
 from algorithms.dp import run_dp, DouglasPeucker
+from algorithms.great_circle_math import point_to_great_circle, point_to_great_circle_batch
 
 
 class DouglasPeuckerTest(unittest.TestCase):
@@ -24,5 +25,21 @@ class DouglasPeuckerTest(unittest.TestCase):
 
         BasicAssertions(self.route, Route(dp.trajectory))
 
+    def test_douglas_peucker_batch_matches_single_point(self):
+        single = DouglasPeucker(epsilon=500, point_to_line_distance=point_to_great_circle)
+        batch = DouglasPeucker(
+            epsilon=500,
+            point_to_line_distance=point_to_great_circle,
+            point_to_line_distance_batch=point_to_great_circle_batch,
+        )
+        for dp in (single, batch):
+            for vessel_log in self.route.trajectory:
+                dp.append_point(vessel_log)
+            dp.simplify()
+
+        self.assertEqual(list(batch.trajectory), list(single.trajectory))
+        self.assertIs(single.trajectory[0], self.route.trajectory[0], "First point should be kept")
+        self.assertIs(single.trajectory[-1], self.route.trajectory[-1], "Last point should be kept")
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,7 +2,7 @@ import unittest
 
 import numpy as np
 
-from algorithms.ellipsoid_math import geodesic_length, geodesic_prediction, geodesic_final_bearing, point_to_geodesic
+from algorithms.ellipsoid_math import geodesic_length, geodesic_prediction, geodesic_final_bearing, point_to_geodesic, point_to_geodesic_golden
 
 class EllipsoidMathTest(unittest.TestCase):
     def setUp(self):
@@ -36,6 +36,19 @@ class EllipsoidMathTest(unittest.TestCase):
                 (np.radians(57.011476), np.radians(9.990813)),
             )
         )
+    def test_point_to_geodesic_matches_golden_section(self):
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            a = np.radians(rng.uniform([54, 7], [58, 13]))
+            b = a + np.radians(rng.normal(0, 0.5, 2))
+            p = a + np.radians(rng.normal(0, 0.75, 2))  # some points lie beyond the ends of the segment
+            a, b, p = tuple(a), tuple(b), tuple(p)
+            self.assertAlmostEqual(point_to_geodesic(a, b, p), point_to_geodesic_golden(a, b, p), delta=1e-4)
+
+        # degenerate segment
+        a = (np.radians(57.0), np.radians(10.0))
+        p = (np.radians(57.1), np.radians(10.1))
+        self.assertAlmostEqual(point_to_geodesic(a, a, p), geodesic_length(a, p), delta=1e-6)
 
 if __name__ == '__main__':
     unittest.main()
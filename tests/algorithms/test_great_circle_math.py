@@ -9,6 +9,12 @@ from algorithms.great_circle_math import (
     predict_sphere_movement,
     point_to_great_circle,
     get_final_bearing, EARTH_RADIUS_METERS,
+    latlon_to_vector_batch,
+    great_circle_distance_batch,
+    predict_sphere_movement_batch,
+    point_to_great_circle_batch,
+    get_final_bearing_batch,
+    slerp_batch,
 )
 
 class GreatCircleMathUnitTest(unittest.TestCase):
@@ -64,6 +70,61 @@ class GreatCircleMathUnitTest(unittest.TestCase):
             315,
             delta=1
         )
+    def test_batch_functions_match_single_point_functions(self):
+        rng = np.random.default_rng(0)
+        a = np.radians(rng.uniform([-80, -180], [80, 180], size=(50, 2)))
+        b = np.radians(rng.uniform([-80, -180], [80, 180], size=(50, 2)))
+        c = np.radians(rng.uniform([-80, -180], [80, 180], size=(50, 2)))
+        b[0] = a[0]  # degenerate segment, where the great circle is undefined
+        distance = rng.uniform(0, 1e6, size=50)
+        bearing = rng.uniform(0, 2 * np.pi, size=50)
+        rows = range(len(a))
+
+        np.testing.assert_allclose(
+            latlon_to_vector_batch(a), [latlon_to_vector(tuple(p)) for p in a]
+        )
+        np.testing.assert_allclose(
+            great_circle_distance_batch(a, b),
+            [great_circle_distance(tuple(a[i]), tuple(b[i])) for i in rows],
+        )
+        np.testing.assert_allclose(
+            point_to_great_circle_batch(a, b, c),
+            [point_to_great_circle(tuple(a[i]), tuple(b[i]), tuple(c[i])) for i in rows],
+            atol=1e-6,
+        )
+        np.testing.assert_allclose(
+            get_final_bearing_batch(a, b),
+            [get_final_bearing(tuple(a[i]), tuple(b[i])) for i in rows],
+        )
+        np.testing.assert_allclose(
+            predict_sphere_movement_batch(a, distance, bearing),
+            [predict_sphere_movement(tuple(a[i]), distance[i], bearing[i]) for i in rows],
+        )
+        # a single point is broadcast against many
+        np.testing.assert_allclose(
+            great_circle_distance_batch(a[0], b),
+            [great_circle_distance(tuple(a[0]), tuple(p)) for p in b],
+        )
+
+    def test_slerp_batch(self):
+        rng = np.random.default_rng(0)
+        a = np.radians(rng.uniform([-80, -180], [80, 180], size=(50, 2)))
+        b = np.radians(rng.uniform([-80, -180], [80, 180], size=(50, 2)))
+        alpha = rng.uniform(0, 1, size=50)
+        b[0] = a[0]  # identical points
+        alpha[1] = 0.0
+
+        result = slerp_batch(a, b, alpha)
+        np.testing.assert_array_equal(result[0], a[0], "Interpolating between identical points should return the point")
+        np.testing.assert_array_equal(result[1], a[1], "An alpha of 0 should return the first point")
+
+        # the points lie on the arc from A to B, the given fraction of the way
+        total = great_circle_distance_batch(a, b)
+        np.testing.assert_allclose(great_circle_distance_batch(a, result), alpha * total, atol=1e-3)
+        np.testing.assert_allclose(great_circle_distance_batch(result, b), (1 - alpha) * total, atol=1e-3)
+
+        np.testing.assert_allclose(slerp_batch(self.e0, self.e90, 0.5), self.e45, atol=1e-12)
+
 
 if __name__ == "__main__":
     unittest.main()
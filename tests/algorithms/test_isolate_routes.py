@@ -3,7 +3,8 @@ from datetime import datetime, timedelta
 
 from classes.route import Route
 from classes.vessel_log import VesselLog
-from algorithms.isolate_routes import isolate_routes
+from algorithms.isolate_routes import isolate_routes, isolate_trajectories, isolate_trajectory_bounds
+from classes.trajectory_buffer import TrajectoryBuffer
 
 
 class IsolateRoutesTest(unittest.TestCase):
@@ -50,5 +51,23 @@ class IsolateRoutesTest(unittest.TestCase):
         self.assertEqual(len(routes[0].trajectory), len(close_logs), "All logs should be included in one route.")
 
 
+    def test_isolate_trajectory_bounds(self):
+        self.assertEqual(isolate_trajectory_bounds(TrajectoryBuffer().timestamps), [], "Empty input has no trajectories.")
+
+        start_time = datetime(2024, 1, 1, 12, 0, 0)
+        logs = [
+            VesselLog(ts=start_time + offset, lon=10, lat=50, imo=1, id=i)
+            for i, offset in enumerate([
+                timedelta(0), timedelta(hours=1), timedelta(days=3), timedelta(days=3, hours=1), timedelta(days=6),
+            ])
+        ]
+        bounds = isolate_trajectory_bounds(TrajectoryBuffer(logs).timestamps)
+
+        self.assertEqual(bounds, [(0, 2), (2, 4), (4, 5)], "Should split at every time gap > 2 days.")
+        self.assertEqual(
+            [logs[start:end] for start, end in bounds], isolate_trajectories(logs),
+            "Should give the same trajectories as isolate_trajectories.",
+        )
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import math
+
+from algorithms import great_circle_math, numba_math
+
+
+class NumbaMathUnitTest(unittest.TestCase):
+    """The compiled functions should give the same results as the functions in great_circle_math."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.points = [
+            tuple(float(x) for x in np.radians(rng.uniform([-80, -180], [80, 180], size=2)))
+            for _ in range(60)
+        ]
+
+    def test_great_circle_distance(self):
+        for a, b in zip(self.points, self.points[1:]):
+            self.assertAlmostEqual(
+                numba_math.great_circle_distance(a, b),
+                great_circle_math.great_circle_distance(a, b),
+                delta=1e-6,
+            )
+
+    def test_point_to_great_circle(self):
+        for a, b, c in zip(self.points, self.points[1:], self.points[2:]):
+            self.assertAlmostEqual(
+                numba_math.point_to_great_circle(a, b, c),
+                great_circle_math.point_to_great_circle(a, b, c),
+                delta=1e-6,
+            )
+        # equal points, where the great circle is undefined
+        a, c = self.points[0], self.points[1]
+        self.assertEqual(
+            numba_math.point_to_great_circle(a, a, c),
+            great_circle_math.point_to_great_circle(a, a, c),
+        )
+
+    def test_get_final_bearing(self):
+        for a, b in zip(self.points, self.points[1:]):
+            self.assertAlmostEqual(
+                numba_math.get_final_bearing(a, b),
+                great_circle_math.get_final_bearing(a, b),
+                delta=1e-12,
+            )
+
+    def test_predict_sphere_movement(self):
+        for a in self.points:
+            np.testing.assert_allclose(
+                numba_math.predict_sphere_movement(a, 1e5, math.radians(30)),
+                great_circle_math.predict_sphere_movement(a, 1e5, math.radians(30)),
+            )
+
+    def test_array_points(self):
+        a, b = np.array(self.points[0]), np.array(self.points[1])
+        self.assertAlmostEqual(
+            numba_math.great_circle_distance(a, b),
+            great_circle_math.great_circle_distance(self.points[0], self.points[1]),
+            delta=1e-6,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
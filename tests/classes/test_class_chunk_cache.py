@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from classes.cache_chunk import CacheChunk
+from classes.chunk_cache import ChunkCache
+from tests.test_mock_vessel_logs import mock_vessel_logs
+
+
+class ChunkCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.chunks = [CacheChunk(mock_vessel_logs[i : i + 10]) for i in (0, 10, 20)]
+        # Room for two of the chunks, but not for three
+        self.cache = ChunkCache(max_bytes=2 * self.chunks[0].nbytes + self.chunks[0].nbytes // 2)
+
+    def test_resident_bytes(self):
+        self.cache.max_bytes = 10**9  # No evictions
+        self.cache.replace(1, 0, 0, self.chunks[0])
+        self.cache.replace(2, 0, 0, self.chunks[1])
+        self.assertEqual(self.cache.resident_bytes, self.chunks[0].nbytes + self.chunks[1].nbytes)
+
+        merged = CacheChunk.join(self.chunks[:2])
+        self.cache.replace(1, 0, 1, merged)
+        self.assertEqual(
+            self.cache.resident_bytes, self.chunks[1].nbytes + merged.nbytes,
+            "Replaced chunks should no longer be counted",
+        )
+
+    def test_evicts_least_recently_used(self):
+        self.cache.replace(1, 0, 0, self.chunks[0])
+        self.cache.replace(2, 0, 0, self.chunks[1])
+        self.cache.touch(self.chunks[0])
+        self.cache.replace(3, 0, 0, self.chunks[2])
+
+        self.assertNotIn(2, self.cache, "The least recently used chunk should be evicted")
+        self.assertIn(1, self.cache, "A touched chunk should be kept")
+        self.assertIn(3, self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertLessEqual(self.cache.resident_bytes, self.cache.max_bytes)
+        self.assertEqual(len(self.cache.index(2)), 0, "An evicted vessel should have no chunks")
+
+    def test_memory_mapped_chunks_are_not_resident(self):
+        source = self.chunks[0]
+        with tempfile.TemporaryDirectory() as directory:
+            arrays = []
+            for name, array in (('latlon', source.latlon), ('timestamps', source.timestamps), ('ids', source.ids)):
+                np.save(os.path.join(directory, name + '.npy'), array)
+                arrays.append(np.load(os.path.join(directory, name + '.npy'), mmap_mode='r'))
+            mapped = CacheChunk.from_arrays(*[array[2:8] for array in arrays], 1, source.start, source.end)
+
+            self.assertEqual(mapped.nbytes, 0, "Memory mapped arrays should not count as resident")
+            self.cache.replace(1, 0, 0, mapped)
+            self.assertEqual(self.cache.resident_bytes, 0)
+            joined = CacheChunk.join([mapped, self.chunks[1]])
+            self.assertGreater(joined.nbytes, 0, "Joining copies the arrays into memory")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from classes.cache_chunk import CacheChunk
+from classes.chunk_index import ChunkIndex
+from tests.test_mock_vessel_logs import mock_vessel_logs
+
+
+class ChunkIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ChunkIndex()
+        self.index.replace(0, 0, CacheChunk(mock_vessel_logs[0:10]))
+        self.index.replace(1, 1, CacheChunk(mock_vessel_logs[20:30]))
+
+    def test_find(self):
+        self.assertEqual(self.index.find(mock_vessel_logs[0].epoch), 0, "First timestamp of a chunk is in it")
+        self.assertEqual(self.index.find(mock_vessel_logs[9].epoch), 0, "Last timestamp of a chunk is in it")
+        self.assertEqual(self.index.find(mock_vessel_logs[25].epoch), 1)
+        self.assertIsNone(self.index.find(mock_vessel_logs[15].epoch), "Timestamps between chunks are in no chunk")
+        self.assertIsNone(self.index.find(mock_vessel_logs[40].epoch), "Timestamps after all chunks are in no chunk")
+
+    def test_overlapping_and_replace(self):
+        lo, hi = self.index.overlapping(mock_vessel_logs[5].epoch, mock_vessel_logs[25].epoch)
+        self.assertEqual((lo, hi), (0, 2), "Both chunks overlap the range")
+        self.assertEqual(
+            self.index.overlapping(mock_vessel_logs[12].epoch, mock_vessel_logs[15].epoch), (1, 1),
+            "No chunk overlaps a range between chunks",
+        )
+
+        self.index.replace(lo, hi, CacheChunk(mock_vessel_logs[0:30]))
+        self.assertEqual(len(self.index), 1, "The merged chunk replaces both chunks")
+        self.assertEqual(self.index.find(mock_vessel_logs[15].epoch), 0)
+
+        empty = CacheChunk([], mock_vessel_logs[40].epoch, mock_vessel_logs[45].epoch)
+        self.index.replace(1, 1, empty)
+        self.assertEqual(self.index.find(mock_vessel_logs[42].epoch), 1, "Empty chunks still cover their time range")
+
+    def test_join(self):
+        # The pieces share the logs on their boundaries
+        pieces = [
+            CacheChunk(mock_vessel_logs[0:10]),
+            CacheChunk(mock_vessel_logs[9:20]),
+            CacheChunk([], mock_vessel_logs[19].epoch, mock_vessel_logs[19].epoch),
+            CacheChunk(mock_vessel_logs[19:30]),
+        ]
+        chunk = CacheChunk.join(pieces)
+
+        self.assertEqual(chunk.vessel_logs, mock_vessel_logs[0:30], "Logs on the boundaries should only be kept once")
+        self.assertEqual(list(chunk.ids), [log.id for log in mock_vessel_logs[0:30]])
+        self.assertEqual((chunk.start, chunk.end), (mock_vessel_logs[0].epoch, mock_vessel_logs[29].epoch))
+
+    def test_join_arrays(self):
+        source = CacheChunk(mock_vessel_logs[10:20])
+        from_arrays = CacheChunk.from_arrays(
+            source.latlon, source.timestamps, source.ids, 1, source.start, source.end
+        )
+        chunk = CacheChunk.join([CacheChunk(mock_vessel_logs[0:11]), from_arrays])
+
+        self.assertIsNone(chunk.vessel_logs, "Chunks joined with a chunk built from arrays should only have arrays")
+        segment = chunk.segment(mock_vessel_logs[5].ts, mock_vessel_logs[15].ts)
+        self.assertEqual([log.id for log in segment], [log.id for log in mock_vessel_logs[5:16]])
+        self.assertEqual([log.ts for log in segment], [log.ts for log in mock_vessel_logs[5:16]])
+        self.assertEqual(segment[-1].get_coords(), mock_vessel_logs[15].get_coords())
+
+    def test_segment(self):
+        chunk = self.index[0]
+        self.assertEqual(chunk.segment(mock_vessel_logs[2].ts, mock_vessel_logs[5].ts), mock_vessel_logs[2:6])
+        self.assertEqual(chunk.segment(mock_vessel_logs[0].ts, mock_vessel_logs[40].ts), mock_vessel_logs[0:10])
+        self.assertEqual(chunk.segment(mock_vessel_logs[12].ts, mock_vessel_logs[15].ts), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
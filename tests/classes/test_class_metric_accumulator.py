@@ -0,0 +1,92 @@
+import unittest
+
+from algorithms.dp import DouglasPeucker
+from algorithms.great_circle_math import great_circle_distance, point_to_great_circle
+from algorithms.squish import Squish
+from algorithms.uniform_sampling import UniformSampling
+from classes.metric_accumulator import MetricAccumulator
+from classes.trajectory_buffer import TrajectoryBuffer
+from classes.vessel_log import VesselLog
+from error_metrics.evaluator import RouteEvaluator
+from error_metrics.newped import ped_single_route_vectorized
+from error_metrics.newsed import sed_single_route_vectorized
+from tests.test_mock_vessel_logs import mock_vessel_logs
+
+
+class MetricAccumulatorTest(unittest.TestCase):
+    def assertMatchesMetrics(self, accumulator, raw, simplifier):
+        for running, computed in (
+            (accumulator.ped(), ped_single_route_vectorized(raw, simplifier.trajectory, {})),
+            (accumulator.sed(), sed_single_route_vectorized(raw, simplifier.trajectory, {})),
+        ):
+            self.assertAlmostEqual(running[0], computed[0], places=6, msg="Mean should match the metric")
+            self.assertAlmostEqual(running[1], computed[1], places=6, msg="Maximum should match the metric")
+            self.assertEqual(running[2], computed[2], "Count should match the metric")
+
+    def test_follows_online_simplifier(self):
+        raw = TrajectoryBuffer()
+        squish = Squish(8, great_circle_distance)
+        accumulator = MetricAccumulator()
+        for start in range(0, len(mock_vessel_logs), 7):
+            for log in mock_vessel_logs[start : start + 7]:
+                raw.append(log)
+                squish.append_point(log)
+                squish.simplify()
+            accumulator.update(raw, squish)
+            self.assertMatchesMetrics(accumulator, raw, squish)
+
+        self.assertGreater(accumulator.ped()[1], 0, "Removed points should leave an error behind")
+
+    def test_follows_rebuilt_trajectory(self):
+        raw = TrajectoryBuffer()
+        dp = DouglasPeucker(100, point_to_great_circle)
+        accumulator = MetricAccumulator()
+        for start in range(0, len(mock_vessel_logs), 30):
+            for log in mock_vessel_logs[start : start + 30]:
+                raw.append(log)
+                dp.append_point(log)
+            dp.simplify()
+            accumulator.update(raw, dp)
+            self.assertMatchesMetrics(accumulator, raw, dp)
+
+    def test_shared_evaluator(self):
+        raw = TrajectoryBuffer()
+        evaluator = RouteEvaluator()
+        simplifiers = [Squish(8, great_circle_distance), DouglasPeucker(100, point_to_great_circle)]
+        accumulators = [MetricAccumulator() for _ in simplifiers]
+        for start in range(0, len(mock_vessel_logs), 10):
+            for log in mock_vessel_logs[start : start + 10]:
+                raw.append(log)
+                for simplifier in simplifiers:
+                    simplifier.append_point(log)
+            for simplifier, accumulator in zip(simplifiers, accumulators):
+                simplifier.simplify()
+                accumulator.update(raw, simplifier, evaluator)
+                self.assertMatchesMetrics(accumulator, raw, simplifier)
+        self.assertEqual(len(evaluator), len(raw), "The shared evaluator should follow the raw route")
+
+    def test_repeated_timestamps(self):
+        # Every third log has the timestamp of the log before it, as logs truncated to whole seconds can
+        logs = [
+            VesselLog(log.lat, log.lon, mock_vessel_logs[i - 1].ts if i % 3 == 2 else log.ts, log.imo, log.id)
+            for i, log in enumerate(mock_vessel_logs)
+        ]
+        for simplifier in (UniformSampling(3), Squish(8, great_circle_distance)):
+            raw = TrajectoryBuffer()
+            accumulator = MetricAccumulator()
+            for start in range(0, len(logs), 4):
+                for log in logs[start : start + 4]:
+                    raw.append(log)
+                    simplifier.append_point(log)
+                    simplifier.simplify()
+                accumulator.update(raw, simplifier)
+                self.assertMatchesMetrics(accumulator, raw, simplifier)
+
+    def test_empty(self):
+        accumulator = MetricAccumulator()
+        self.assertEqual(accumulator.ped(), (0.0, 0.0, 0))
+        self.assertEqual(accumulator.sed(), (0.0, 0.0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
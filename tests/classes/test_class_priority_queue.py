@@ -30,5 +30,29 @@ class RouteTest(unittest.TestCase):
 
         self.assertEqual(self.heap.min_priority(), mock_vessel_logs[3].id*10, "Minimum priority should be that of the fifth log after removing the fourth")
 
+    def test_update_priority_in_place(self):
+        heap = PriorityQueue()
+        for log in mock_vessel_logs:
+            heap.insert(log)
+
+        # Reprioritize every interior point many times, alternating between increasing and decreasing keys
+        for round in range(10):
+            for i, log in enumerate(mock_vessel_logs[1:-1], start=1):
+                heap.insert(log, float((i * 7 + round * 13) % 50))
+            self.assertEqual(len(heap.heap), len(mock_vessel_logs), "Updating priorities should not grow the heap")
+
+        expected = sorted(
+            (entry[0], entry[1]) for entry in heap.entry_finder.values() if entry[0] != float('inf')
+        )
+        for priority, _ in expected:
+            self.assertEqual(heap.min_priority(), priority, "Minimum priority should follow the updated priorities")
+            _, removed_priority = heap.remove_min()
+            self.assertEqual(removed_priority, priority)
+        self.assertEqual(heap.size(), 2, "Only the endpoints should remain")
+        self.assertEqual(heap.to_list(), [mock_vessel_logs[0], mock_vessel_logs[-1]])
+
+        with self.assertRaises(RuntimeError):
+            heap.remove_min()  # Endpoints cannot be removed
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+
+from classes.trajectory_buffer import TrajectoryBuffer
+from tests.test_mock_vessel_logs import mock_vessel_logs
+
+
+class TrajectoryBufferTest(unittest.TestCase):
+    def test_append_and_arrays(self):
+        buffer = TrajectoryBuffer(capacity=1)
+        for log in mock_vessel_logs:
+            buffer.append(log)
+
+        self.assertEqual(len(buffer), len(mock_vessel_logs), "Buffer should hold every appended log")
+        self.assertEqual(buffer.latlon.shape, (len(mock_vessel_logs), 2), "Coordinates should be an (N, 2) array")
+        self.assertEqual(buffer.timestamps.dtype, np.int64, "Timestamps should be int64")
+        self.assertEqual(buffer.ids.dtype, np.int64, "Ids should be int64")
+
+        for i, log in enumerate(mock_vessel_logs):
+            self.assertIs(buffer[i], log, "Indexing should return the original log")
+            np.testing.assert_allclose(buffer.coords(i), log.get_coords())
+            self.assertEqual(buffer.time(i), int(log.ts.timestamp()))
+            self.assertEqual(buffer.ids[i], log.id)
+
+    def test_extend_matches_append(self):
+        appended = TrajectoryBuffer()
+        for log in mock_vessel_logs:
+            appended.append(log)
+        extended = TrajectoryBuffer(mock_vessel_logs)
+
+        np.testing.assert_array_equal(appended.latlon, extended.latlon)
+        np.testing.assert_array_equal(appended.timestamps, extended.timestamps)
+        np.testing.assert_array_equal(appended.ids, extended.ids)
+        self.assertEqual(list(appended), list(extended), "Both buffers should hold the same logs")
+
+    def test_delete_pop_and_remove(self):
+        buffer = TrajectoryBuffer(mock_vessel_logs)
+
+        del buffer[-2]
+        self.assertEqual(len(buffer), len(mock_vessel_logs) - 1)
+        self.assertIs(buffer[-2], mock_vessel_logs[-3], "Deleting should shift the remaining logs")
+        self.assertEqual(buffer.ids[-2], mock_vessel_logs[-3].id, "Deleting should shift the arrays as well")
+
+        popped = buffer.pop(0)
+        self.assertIs(popped, mock_vessel_logs[0])
+        self.assertIs(buffer[0], mock_vessel_logs[1])
+
+        buffer.remove(mock_vessel_logs[5])
+        self.assertNotIn(mock_vessel_logs[5].id, buffer.ids, "Removed log should not be in the arrays")
+        self.assertNotIn(mock_vessel_logs[5], list(buffer), "Removed log should not be in the buffer")
+
+        with self.assertRaises(ValueError):
+            buffer.remove(mock_vessel_logs[5])
+        with self.assertRaises(IndexError):
+            buffer.coords(len(buffer))
+
+    def test_discard(self):
+        buffer = TrajectoryBuffer(mock_vessel_logs[:4])
+        buffer.discard(mock_vessel_logs[1])
+        buffer.append(mock_vessel_logs[4])
+        buffer.discard(mock_vessel_logs[4])
+
+        self.assertEqual(len(buffer), 3, "Discarded logs should not be counted")
+        self.assertIs(buffer.last(), mock_vessel_logs[3], "Last should skip discarded logs")
+        self.assertEqual(
+            list(buffer), [mock_vessel_logs[0], mock_vessel_logs[2], mock_vessel_logs[3]],
+            "Reading the buffer should compact away discarded logs in order",
+        )
+        np.testing.assert_array_equal(buffer.ids, [log.id for log in buffer])
+
+        buffer.discard(mock_vessel_logs[0])
+        self.assertIs(buffer[0], mock_vessel_logs[2], "Indexing should see the compacted buffer")
+        with self.assertRaises(ValueError):
+            buffer.discard(mock_vessel_logs[0])
+
+    def test_take(self):
+        buffer = TrajectoryBuffer(mock_vessel_logs)
+        taken = buffer.take([0, 3, len(mock_vessel_logs) - 1])
+
+        self.assertEqual(list(taken), [mock_vessel_logs[0], mock_vessel_logs[3], mock_vessel_logs[-1]])
+        np.testing.assert_array_equal(taken.latlon, buffer.latlon[[0, 3, -1]])
+
+    def test_from_arrays(self):
+        source = TrajectoryBuffer(mock_vessel_logs)
+        buffer = TrajectoryBuffer.from_arrays(source.latlon, source.timestamps, source.ids, imo=1)
+
+        self.assertIsNone(buffer._logs, "Logs should not be created until they are needed")
+        self.assertEqual(len(buffer), len(mock_vessel_logs))
+        np.testing.assert_array_equal(buffer.latlon, source.latlon)
+        self.assertIsNone(buffer.take([0, 1])._logs, "Taking should not create the logs either")
+
+        for log, original in zip(buffer, mock_vessel_logs):
+            self.assertEqual(log.id, original.id)
+            self.assertEqual(log.imo, 1)
+            self.assertEqual(log.get_coords(), original.get_coords())
+            self.assertEqual(log.ts, original.ts)
+
+        buffer.append(mock_vessel_logs[0])
+        self.assertIs(buffer[-1], mock_vessel_logs[0], "Appending should work on a buffer built from arrays")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from classes.cache_chunk import CacheChunk
+from data import vessel_disk_cache
+from data.vessel_disk_cache import DAY_SECONDS, read_range, write_days
+
+DAY = 1704067200  # Midnight of 2024-01-01 UTC
+HOUR = 60 * 60
+
+
+class VesselDiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(vessel_disk_cache, 'cache_directory', directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = directory.name
+        # A log every hour for four days, including every midnight
+        self.timestamps = np.arange(DAY, DAY + 4 * DAY_SECONDS + 1, HOUR, dtype=np.float64)
+        self.ids = np.arange(len(self.timestamps), dtype=np.int64) + 1
+        self.latlon = np.column_stack((self.ids * 1e-4, self.ids * 2e-4))
+
+    def source(self, start: float, end: float) -> CacheChunk:
+        # The logs between the given times (inclusive), as the database would give them
+        first = int(np.searchsorted(self.timestamps, start, side='left'))
+        last = int(np.searchsorted(self.timestamps, end, side='right'))
+        return CacheChunk.from_arrays(
+            self.latlon[first:last], self.timestamps[first:last], self.ids[first:last], 1, start, end
+        )
+
+    def days_on_disk(self) -> list[str]:
+        return sorted(os.listdir(os.path.join(self.directory, '1')))
+
+    def test_write_days(self):
+        write_days(1, self.source(DAY + 6 * HOUR, DAY + 3 * DAY_SECONDS + 6 * HOUR), float('inf'))
+        self.assertEqual(self.days_on_disk(), ['2024-01-02', '2024-01-03'], "Only whole days should be written")
+
+        day = vessel_disk_cache.read_day(1, DAY + DAY_SECONDS)
+        self.assertEqual(len(day), 25, "A day holds the logs from its midnight up to and including the next one")
+        self.assertEqual((day.timestamps[0], day.timestamps[-1]), (DAY + DAY_SECONDS, DAY + 2 * DAY_SECONDS))
+        self.assertIsInstance(day.timestamps, np.memmap)
+
+    def test_write_days_before_cutoff(self):
+        write_days(1, self.source(DAY, DAY + 4 * DAY_SECONDS), DAY + 2 * DAY_SECONDS + 1)
+        self.assertEqual(self.days_on_disk(), ['2024-01-01', '2024-01-02'])
+        write_days(1, self.source(DAY, DAY + 4 * DAY_SECONDS), DAY + 3 * DAY_SECONDS)
+        self.assertEqual(
+            self.days_on_disk(), ['2024-01-01', '2024-01-02'], "A day ending at the cutoff isn't known to be complete"
+        )
+
+    def test_write_days_race(self):
+        write_days(1, self.source(DAY, DAY + DAY_SECONDS), float('inf'))
+        # Another process stored the day between the check and the rename
+        isdir = os.path.isdir
+        day_directory = vessel_disk_cache.day_directory(1, DAY)
+        with mock.patch.object(
+            vessel_disk_cache.os.path, 'isdir', side_effect=lambda path: path != day_directory and isdir(path)
+        ):
+            write_days(1, self.source(DAY, DAY + DAY_SECONDS), float('inf'))
+        self.assertEqual(self.days_on_disk(), ['2024-01-01'], "The temporary directory should be removed")
+        self.assertEqual(len(vessel_disk_cache.read_day(1, DAY)), 25)
+
+    def test_read_range(self):
+        write_days(1, self.source(DAY + DAY_SECONDS, DAY + 3 * DAY_SECONDS), float('inf'))
+        start, end = DAY + 12 * HOUR, DAY + 3 * DAY_SECONDS + 12 * HOUR
+        parts = read_range(1, start, end)
+
+        self.assertEqual(parts[0], (start, DAY + DAY_SECONDS), "The part before the days on disk is missing")
+        self.assertEqual(parts[-1], (DAY + 3 * DAY_SECONDS, end), "The part after the days on disk is missing")
+        self.assertEqual(
+            [(part.start, part.end) for part in parts[1:-1]],
+            [(DAY + DAY_SECONDS, DAY + 2 * DAY_SECONDS), (DAY + 2 * DAY_SECONDS, DAY + 3 * DAY_SECONDS)],
+        )
+
+        # Filling the missing parts from the source and joining everything gives every log of the range once
+        chunk = CacheChunk.join([self.source(*part) if isinstance(part, tuple) else part for part in parts])
+        expected = self.source(start, end)
+        self.assertEqual(list(chunk.ids), list(expected.ids), "Logs on shared midnights should only be kept once")
+        self.assertEqual((chunk.start, chunk.end), (start, end))
+
+    def test_read_range_within_days(self):
+        write_days(1, self.source(DAY, DAY + 2 * DAY_SECONDS), float('inf'))
+        start, end = DAY + 6 * HOUR, DAY + DAY_SECONDS + 6 * HOUR
+        parts = read_range(1, start, end)
+
+        self.assertEqual(
+            [(part.start, part.end) for part in parts],
+            [(start, DAY + DAY_SECONDS), (DAY + DAY_SECONDS, end)],
+            "Both days should be cut to the range, without missing parts",
+        )
+        self.assertEqual((parts[0].timestamps[0], parts[1].timestamps[-1]), (start, end))
+        chunk = CacheChunk.join(parts)
+        self.assertEqual(list(chunk.ids), list(self.source(start, end).ids))
+
+    def test_read_range_disabled(self):
+        with mock.patch.object(vessel_disk_cache, 'cache_directory', None):
+            self.assertEqual(read_range(1, DAY, DAY + DAY_SECONDS), [(DAY, DAY + DAY_SECONDS)])
+            write_days(1, self.source(DAY, DAY + 2 * DAY_SECONDS), float('inf'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
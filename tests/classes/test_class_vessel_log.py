@@ -1,5 +1,7 @@
 import unittest
+from datetime import datetime, timezone
 
+from classes.vessel_log import CompactVesselLog
 from tests.test_mock_vessel_logs import mock_vessel_logs
 
 class VesselLogTest(unittest.TestCase):
@@ -19,6 +21,31 @@ class VesselLogTest(unittest.TestCase):
             self.assertIsInstance(coords[0], float)
             self.assertIsInstance(coords[1], float)
 
+    def test_compact_vessel_logs(self):
+        for log in self.vessel_logs:
+            compact = CompactVesselLog(log.lat, log.lon, log.ts, log.imo, log.id)
+            self.assertFalse(hasattr(compact, '__dict__'), "Compact logs should not have a __dict__")
+
+            self.assertAlmostEqual(compact.lat, log.lat, places=12)
+            self.assertAlmostEqual(compact.lon, log.lon, places=12)
+            self.assertEqual(compact.ts, log.ts, "Timestamp should survive the epoch round trip")
+            self.assertEqual(compact.epoch, log.epoch)
+            self.assertEqual(compact.imo, log.imo)
+            self.assertEqual(compact.id, log.id)
+
+            coords = compact.get_coords()
+            self.assertIsInstance(coords, tuple)
+            self.assertEqual(coords, (compact.lat_rad, compact.lon_rad))
+            self.assertAlmostEqual(coords[0], log.get_coords()[0], places=15)
+            self.assertAlmostEqual(coords[1], log.get_coords()[1], places=15)
+
+    def test_compact_vessel_log_timestamps(self):
+        naive = datetime(2024, 3, 31, 2, 30, 0, 123456)
+        self.assertEqual(CompactVesselLog(55.0, 10.0, naive, 1, 1).ts, naive, "Naive timestamps should be kept exactly")
+
+        aware = datetime(2024, 3, 31, 2, 30, 0, tzinfo=timezone.utc)
+        self.assertEqual(CompactVesselLog(55.0, 10.0, aware, 1, 1).ts, aware, "Aware timestamps should be kept exactly")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tests.test_mock_vessel_logs import mock_vessel_logs, mock_vessel_logs_second_route
+
+from classes.trajectory_buffer import TrajectoryBuffer
+from error_metrics.comp_ratio import comp_ratio_results
+from error_metrics.evaluator import RouteEvaluator, evaluate_error_metrics
+from error_metrics.newped import ped_results, ped_single_route_vectorized
+from error_metrics.newsed import sed_results, sed_single_route_vectorized
+
+
+class TestEvaluator(unittest.TestCase):
+
+    def test_score_matches_single_route_metrics(self):
+        """
+        Scoring with a prepared raw route gives the same PED and SED as computing them separately.
+        """
+        evaluator = RouteEvaluator(mock_vessel_logs)
+        for simplified in (mock_vessel_logs[::3], mock_vessel_logs[::20], mock_vessel_logs[:1], []):
+            ped, sed = evaluator.score(simplified)
+            self.assertEqual(ped, ped_single_route_vectorized(mock_vessel_logs, simplified, {}))
+            self.assertEqual(sed, sed_single_route_vectorized(mock_vessel_logs, simplified, {}))
+
+    def test_update_prepares_appended_points(self):
+        """
+        Preparing a raw route piece by piece gives the same arrays and scores as preparing it at once.
+        """
+        evaluator = RouteEvaluator()
+        for end in (1, 2, 17, 18, len(mock_vessel_logs)):
+            evaluator.update(mock_vessel_logs[:end])
+        prepared = RouteEvaluator(mock_vessel_logs)
+        self.assertEqual(len(evaluator), len(mock_vessel_logs))
+        self.assertTrue((evaluator.ecef == prepared.ecef).all())
+        self.assertTrue((evaluator.times == prepared.times).all())
+        self.assertEqual(evaluator.score(mock_vessel_logs[::3]), prepared.score(mock_vessel_logs[::3]))
+
+    def test_update_from_logs_then_buffer(self):
+        """
+        Timestamps prepared from logs are kept exactly when later points come from a TrajectoryBuffer.
+        """
+        evaluator = RouteEvaluator(mock_vessel_logs[:3])
+        evaluator.update(TrajectoryBuffer(mock_vessel_logs))
+        self.assertEqual(evaluator.times.dtype, np.float64)
+        self.assertTrue((evaluator.times == RouteEvaluator(mock_vessel_logs).times).all())
+
+    def test_evaluate_several_algorithms(self):
+        """
+        Every algorithm gets the same metrics as ped_results(), sed_results() and comp_ratio_results() give it.
+        """
+        raw = {1: mock_vessel_logs, 2: mock_vessel_logs_second_route}
+        simplified = {
+            "half": {key: route[::2] for key, route in raw.items()},
+            "ends": {key: [route[0], route[-1]] for key, route in raw.items()},
+            "same": raw,
+        }
+
+        metrics = evaluate_error_metrics(raw, simplified)
+
+        for name, routes in simplified.items():
+            expected = [*ped_results(raw, routes, {}), *sed_results(raw, routes, {}), comp_ratio_results(raw, routes)]
+            self.assertEqual(metrics[name], expected)
+        self.assertEqual(metrics["same"], [0.0, 0.0, 0.0, 0.0, 1.0])
+
+    def test_executor_gives_same_results(self):
+        """
+        Scoring the routes in parallel combines them exactly like scoring them one after another.
+        """
+        raw = {1: mock_vessel_logs, 2: mock_vessel_logs_second_route, 3: []}
+        simplified = {key: route[::4] for key, route in raw.items()}
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(ped_results(raw, simplified, {}, executor), ped_results(raw, simplified, {}))
+            self.assertEqual(sed_results(raw, simplified, {}, executor), sed_results(raw, simplified, {}))
+            self.assertEqual(
+                evaluate_error_metrics(raw, {"quarter": simplified}, executor),
+                evaluate_error_metrics(raw, {"quarter": simplified}),
+            )
+
+    def test_evaluate_empty(self):
+        self.assertEqual(evaluate_error_metrics({}, {"empty": {}}), {"empty": [0.0, 0.0, 0.0, 0.0, 0.0]})
+
+
+if __name__ == "__main__":
+    unittest.main()
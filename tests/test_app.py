@@ -8,10 +8,18 @@ from app import (
     get_error_metrics,
     process_trajectories,
     run_algorithms,
+    reset_state,
     simplifiers,
     raw_routes,
 )
 
+from algorithms.dead_reckoning import DeadReckoning
+from algorithms.great_circle_math import (
+    great_circle_distance,
+    get_final_bearing,
+    predict_sphere_movement,
+    point_to_great_circle,
+)
 from classes.route import Route
 from classes.vessel_log import VesselLog
 
@@ -35,8 +43,7 @@ class AppTest(unittest.TestCase):
         Runs before every test.
         Clears global state to ensure test isolation.
         """
-        simplifiers.clear()
-        raw_routes.clear()
+        reset_state()
 
     def test_get_error_metrics(self):
         """
@@ -102,8 +109,50 @@ class AppTest(unittest.TestCase):
             "raw_routes not updated correctly",
         )
 
+    def test_process_trajectories_keeps_simplifiers(self):
+        """
+        Ensures process_trajectories keeps simplifiers between calls, only gives them the new logs,
+        and only recreates the simplifiers whose params changed.
+        """
+        math = {
+            "point_to_point_distance": great_circle_distance,
+            "get_final_bearing": get_final_bearing,
+            "predict_sphere_movement": predict_sphere_movement,
+            "point_to_line_distance": point_to_great_circle,
+        }
+        half = len(mock_vessel_logs) // 2
+        algorithms = ["DR", "SQUISH"]
+        params = {"tolerance": 5, "buff_size": 4}
+
+        process_trajectories({1: mock_vessel_logs[:half]}, algorithms, params, math)
+        dr, squish = simplifiers[1]["DR"], simplifiers[1]["SQUISH"]
+        with patch.object(dr, "append_point", wraps=dr.append_point) as append_mock:
+            process_trajectories({1: mock_vessel_logs[half:]}, algorithms, params, math)
+        self.assertIs(simplifiers[1]["DR"], dr, "Simplifier should be kept between calls")
+        self.assertEqual(
+            append_mock.call_count,
+            len(mock_vessel_logs) - half,
+            "Only the new logs should be appended to a kept simplifier",
+        )
+
+        fresh = DeadReckoning.from_params(params, math)
+        for log in mock_vessel_logs:
+            fresh.append_point(log)
+            fresh.simplify()
+        self.assertEqual(
+            list(dr.trajectory), list(fresh.trajectory),
+            "Feeding the logs over several calls should give the same result as feeding them at once",
+        )
+
+        process_trajectories({}, algorithms, {"tolerance": 10, "buff_size": 4}, math)
+        self.assertIsNot(simplifiers[1]["DR"], dr, "Changing its params should recreate the simplifier")
+        self.assertIs(simplifiers[1]["SQUISH"], squish, "Unaffected simplifiers should be kept")
+        self.assertGreater(
+            len(simplifiers[1]["DR"].trajectory), 0, "A recreated simplifier should get the whole raw route"
+        )
+
     @patch("app.get_all_vessels")
-    @patch("app.get_vessel_logs")
+    @patch("app.stream_vessel_logs")
     @patch("app.assign_routes")
     def test_run_algorithms(self, mock_assign, mock_get_logs, mock_get_all):
         """
@@ -125,7 +174,7 @@ class AppTest(unittest.TestCase):
         mock_get_all.return_value = {100: mock_vessel, 125: mock_vessel}
 
         # Mock returned logs from DB
-        mock_get_logs.return_value = mock_vessel_logs
+        mock_get_logs.return_value = [mock_vessel_logs]
 
         # Mock assign_routes → single route
         mock_assign.return_value = {1: mock_vessel_logs}
@@ -209,7 +258,7 @@ class AppTest(unittest.TestCase):
         )
 
     @patch("app.get_all_vessels")
-    @patch("app.get_vessel_logs")
+    @patch("app.stream_vessel_logs")
     @patch("app.assign_routes")
     def test_algorithm_endpoint(self, mock_assign, mock_get_logs, mock_get_all):
         """
@@ -222,7 +271,7 @@ class AppTest(unittest.TestCase):
         mock_vessel.imo = 1234567
         mock_get_all.return_value = {100: mock_vessel, 125: mock_vessel}
 
-        mock_get_logs.return_value = mock_vessel_logs
+        mock_get_logs.return_value = [mock_vessel_logs]
         mock_assign.return_value = {1: mock_vessel_logs}
 
         app.testing = True
@@ -260,6 +309,114 @@ class AppTest(unittest.TestCase):
                 self.assertIsInstance(log[1], float)  # lon
                 self.assertIsInstance(log[2], str)  # ts
 
+    @patch("app.get_all_vessels")
+    @patch("app.stream_vessel_logs")
+    @patch("app.assign_routes")
+    def test_algorithm_endpoint_changes(self, mock_assign, mock_get_logs, mock_get_all):
+        """
+        Ensures that a client sending back the version of its last response only receives changes,
+        and that applying them yields the same trajectories as a full response.
+        """
+        mock_vessel = MagicMock()
+        mock_vessel.imo = 1234567
+        mock_get_all.return_value = {100: mock_vessel, 125: mock_vessel}
+
+        half = len(mock_vessel_logs) // 2
+        three_quarters = len(mock_vessel_logs) * 3 // 4
+        # the second request streams its logs in two batches
+        mock_get_logs.side_effect = [
+            [mock_vessel_logs[:half]],
+            [mock_vessel_logs[half:three_quarters], mock_vessel_logs[three_quarters:]],
+        ]
+        mock_assign.side_effect = lambda logs: {1: logs}
+
+        app.testing = True
+        client = app.test_client()
+
+        payload = {
+            "params": {"tolerance": 10, "epsilon": 10, "buff_size": 4},
+            "start_date": "2024-01-01",
+            "end_date": "2024-01-01 12:00:00",
+            "algorithms": ["DR", "DP", "SQUISH"],
+            "version": None,
+        }
+        held = {}
+        for end_date in ["2024-01-01 12:00:00", "2024-01-02 12:00:00"]:
+            payload["end_date"] = end_date
+            data = client.post("/algorithm", json=payload).get_json()
+            payload["version"] = data["version"]
+            for name in ["DR", "DP", "SQUISH", "raw"]:
+                for entry in data[name]:
+                    points = [] if entry["reset"] else held[(name, entry["route"])]
+                    for change in entry["changes"]:
+                        if isinstance(change, int):
+                            del points[change]
+                        else:
+                            points.append(change)
+                    held[(name, entry["route"])] = points
+
+        self.assertFalse(data["full"], "Second response should only describe changes")
+        self.assertEqual(
+            len(held[("raw", 1)]), len(mock_vessel_logs), "Raw route should hold every log"
+        )
+        for name in ["DR", "DP", "SQUISH"]:
+            self.assertEqual(
+                [tuple(point[:2]) for point in held[(name, 1)]],
+                [(log.lat, log.lon) for log in simplifiers[1][name].trajectory],
+                f"Applying the changes for {name} should yield the simplified trajectory",
+            )
+
+
+    @patch("app.get_all_vessels")
+    @patch("app.stream_vessel_logs")
+    @patch("app.assign_routes")
+    def test_algorithm_endpoint_changes_per_client(self, mock_assign, mock_get_logs, mock_get_all):
+        """
+        Ensures that two clients polling alternately each keep receiving only changes,
+        instead of invalidating each other's version.
+        """
+        mock_vessel = MagicMock()
+        mock_vessel.imo = 1234567
+        mock_get_all.return_value = {100: mock_vessel, 125: mock_vessel}
+
+        half = len(mock_vessel_logs) // 2
+        mock_get_logs.side_effect = [
+            [mock_vessel_logs[:half]],
+            [mock_vessel_logs[half:]],
+            [],
+            [],
+        ]
+        mock_assign.side_effect = lambda logs: {1: logs}
+
+        app.testing = True
+        client = app.test_client()
+
+        versions = {"first": None, "second": None}
+        fulls = []
+        for end_date, client_id in [
+            ("2024-01-01 12:00:00", "first"),
+            ("2024-01-02 12:00:00", "second"),
+            ("2024-01-02 12:00:00", "first"),
+            ("2024-01-02 12:00:00", "second"),
+        ]:
+            payload = {
+                "params": {"tolerance": 10, "epsilon": 10},
+                "start_date": "2024-01-01",
+                "end_date": end_date,
+                "algorithms": ["DR", "DP"],
+                "version": versions[client_id],
+                "client": client_id,
+            }
+            data = client.post("/algorithm", json=payload).get_json()
+            versions[client_id] = data["version"]
+            fulls.append(data["full"])
+
+        self.assertEqual(
+            fulls,
+            [True, True, False, False],
+            "Only the first response to each client should be full",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()